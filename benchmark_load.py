@@ -0,0 +1,316 @@
+"""
+End-to-end load benchmark: throughput and latency percentiles of
+process_image_logic under concurrency.
+
+    python benchmark_load.py                                   # default grid
+    python benchmark_load.py --workers 1,2,4 --batch 1,4,8 --images 60
+    python benchmark_load.py --sizes 1024x768,4000x3000 --output load.json
+    python benchmark_load.py --threads 4                       # + threads per image
+    python benchmark_load.py --adversarial --max-regions 50000 # + pathological inputs
+    python benchmark_load.py --presets fast,balanced,thorough  # speed / quality presets
+
+Workload: a mix of synthetic crack / corrosion / damp / healthy / invalid
+images at the given resolutions (deterministic per seed). --adversarial adds
+pathological inputs that pass the validity check but explode the region
+count (1-px checkerboard band, dense dust speckle), to check that the
+per-image guard (core.budget) keeps their latency bounded. Every worker
+process generates the workload once at start-up, so the timed part is only
+the analysis (no pixel arrays are pickled).
+
+For every (workers, batch size) pair, `workers` processes run batches of
+`batch size` images; one batch per worker is in flight at a time (closed
+loop, like service.http_server). Reported per run:
+    throughput_ips   images per second over the whole run
+    latency          per-image latency (batch submitted -> batch done), p50/p95/p99
+    service_time     per-image analysis time inside the worker, p50/p95/p99
+    by_kind          p50 latency per image kind
+    degraded         images degraded by the per-image guard, per action
+With --presets every (workers, batch size) pair runs once per preset, and a
+markdown table per preset (throughput, latency, label agreement) goes to
+stderr after the runs.
+Output is JSON (stdout, or --output).
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+
+from core.image_logic import process_image_logic
+from core.budget import DEGRADE_ACTIONS
+from config import ANALYSIS_PRESETS, DEFAULT_PRESET
+from service.http_server import latency_percentiles
+
+KINDS = ("crack", "corrosion", "damp", "healthy", "invalid")
+EXPECTED = {"crack": "CRACK", "corrosion": "CORROSION", "damp": "DAMP", "healthy": "HEALTHY", "invalid": "INVALID"}
+# No expected label: what matters is that they are degraded, not stuck
+ADVERSARIAL_KINDS = ("checkerboard", "speckle")
+
+
+# =========================================================
+# SYNTHETIC WORKLOAD
+# =========================================================
+
+def _base_pipe(width, height, rng):
+    # Horizontal pipe: bright center highlight, dark edges, sensor noise
+    profile = np.sin(np.linspace(0, np.pi, height)) * 120 + 60
+    pixels = np.repeat(np.repeat(profile[:, None, None], width, 1), 3, 2)
+    return pixels + rng.normal(0, 6, pixels.shape)
+
+
+def synthetic_image(kind, width, height, seed=0):
+    """(H, W, 3) uint8 image of the given kind (see KINDS)."""
+    rng = np.random.default_rng(seed)
+    if kind == "invalid":
+        # Document-like: white page with rows of small dark "words"
+        pixels = np.full((height, width, 3), 245.0)
+        for top in range(height // 20, height - height // 20, max(4, height // 25)):
+            for left in range(width // 20, width - width // 10, max(6, width // 30)):
+                if rng.random() < 0.7:
+                    pixels[top:top + max(2, height // 80), left:left + max(3, width // 50)] = 20
+        return pixels.astype(np.uint8)
+
+    pixels = _base_pipe(width, height, rng)
+    if kind == "checkerboard":
+        # 1-px checkerboard band across the pipe: every dark pixel is its own region
+        yy, xx = np.indices((height, width))
+        band = (yy > height * 0.3) & (yy < height * 0.7) & ((yy + xx) % 2 == 0)
+        pixels[band] *= 0.2
+    elif kind == "speckle":
+        # Dense dust: 10% of the pixels are isolated dark specks
+        pixels[rng.random((height, width)) < 0.1] = 10
+    elif kind == "crack":
+        # Thin dark line, random slope
+        x0 = int(width * rng.uniform(0.1, 0.3))
+        y0 = int(height * rng.uniform(0.25, 0.4))
+        slope = rng.uniform(-0.3, 0.3)
+        thickness = max(2, height // 250)
+        for i in range(width // 2):
+            r = int(y0 + i * slope)
+            pixels[r:r + thickness, x0 + i] = 15
+    elif kind == "corrosion":
+        # Rust-colored blobs
+        yy, xx = np.ogrid[:height, :width]
+        for _ in range(3):
+            cy, cx = height * rng.uniform(0.3, 0.7), width * rng.uniform(0.2, 0.8)
+            blob = ((yy - cy) / (height / 12)) ** 2 + ((xx - cx) / (width / 14)) ** 2 < 1
+            pixels[blob] = (170, 70, 35) + rng.normal(0, 8, (int(blob.sum()), 3))
+    elif kind == "damp":
+        # Irregular soft stain: a chain of darkened spots
+        yy, xx = np.ogrid[:height, :width]
+        stain = np.zeros((height, width))
+        cy, cx = height * rng.uniform(0.4, 0.6), width * rng.uniform(0.3, 0.7)
+        for _ in range(5):
+            stain = np.maximum(stain, np.exp(-(((yy - cy) / (height / 14)) ** 2 + ((xx - cx) / (width / 14)) ** 2)))
+            cy += height * rng.uniform(-0.08, 0.08)
+            cx += width * rng.uniform(0.04, 0.08)
+        pixels *= (1 - 0.7 * stain)[:, :, None]
+    return np.clip(pixels, 0, 255).astype(np.uint8)
+
+
+def build_workload(images, sizes, mix=None, seed=0):
+    """List of (kind, width, height, seed) specs, kinds drawn from mix (weights per kind)."""
+    rng = np.random.default_rng(seed)
+    kinds = list(mix or {kind: 1 for kind in KINDS})
+    weights = np.array([(mix or {}).get(kind, 1) for kind in kinds], dtype=float)
+    picks = rng.choice(len(kinds), size=images, p=weights / weights.sum())
+    return [(kinds[k], *sizes[i % len(sizes)], seed + i) for i, k in enumerate(picks)]
+
+
+# =========================================================
+# WORKER SIDE
+# =========================================================
+
+_WORKLOAD = []
+_THREADS = 1
+_GUARD = {}
+_PRESET = None
+
+
+def _init_worker(specs, threads=1, guard=None, preset=None):
+    global _WORKLOAD, _THREADS, _GUARD, _PRESET
+    _WORKLOAD = [synthetic_image(*spec) for spec in specs]
+    _THREADS = threads
+    _GUARD = guard or {}
+    _PRESET = preset
+
+
+def _run_batch(indices):
+    """Analyzes a batch. Returns [(index, final_defect, analysis seconds, degrade action or None)]."""
+    out = []
+    for i in indices:
+        pixels = _WORKLOAD[i]
+        height, width = pixels.shape[:2]
+        start = time.perf_counter()
+        result = process_image_logic(pixels, width, height, f"LOAD_{i:05d}", workers=_THREADS, config=_PRESET,
+                                     **_GUARD)
+        degraded = result.get("degraded")
+        out.append((i, result["final_defect"], time.perf_counter() - start, degraded and degraded["action"]))
+    return out
+
+
+# =========================================================
+# DRIVER
+# =========================================================
+
+def run_load(specs, workers, batch_size, rounds=1, threads=1, guard=None, preset=None):
+    """
+    One (workers, batch size) measurement over `rounds` passes of the workload.
+    threads: process_image_logic workers (threads per image) inside each process.
+    guard: time_budget / max_regions / degrade for process_image_logic (None = config).
+    preset: analysis preset (config.ANALYSIS_PRESETS, None = default).
+    """
+    order = [i for _ in range(rounds) for i in range(len(specs))]
+    batches = [order[i:i + batch_size] for i in range(0, len(order), batch_size)]
+
+    latencies, service_times, by_kind, agree, labeled, degraded = [], [], {}, 0, 0, {}
+    with ProcessPoolExecutor(workers, initializer=_init_worker, initargs=(specs, threads, guard, preset)) as pool:
+        # Warm-up: one batch per worker (imports, first-call allocations)
+        list(pool.map(_run_batch, [[0]] * workers))
+
+        start = time.perf_counter()
+        pending = {}
+        next_batch = 0
+        while next_batch < len(batches) or pending:
+            # Closed loop: keep one batch per worker in flight
+            while next_batch < len(batches) and len(pending) < workers:
+                pending[pool.submit(_run_batch, batches[next_batch])] = time.perf_counter()
+                next_batch += 1
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            now = time.perf_counter()
+            for future in done:
+                submitted = pending.pop(future)
+                for i, final_defect, seconds, action in future.result():
+                    kind = specs[i][0]
+                    latencies.append(now - submitted)
+                    service_times.append(seconds)
+                    by_kind.setdefault(kind, []).append(now - submitted)
+                    if kind in EXPECTED:
+                        labeled += 1
+                        agree += final_defect == EXPECTED[kind]
+                    if action:
+                        degraded[action] = degraded.get(action, 0) + 1
+        elapsed = time.perf_counter() - start
+
+    return {
+        "preset": preset or DEFAULT_PRESET,
+        "workers": workers,
+        "batch_size": batch_size,
+        "threads_per_image": threads,
+        "images": len(order),
+        "seconds": round(elapsed, 3),
+        "throughput_ips": round(len(order) / elapsed, 3),
+        "latency": latency_percentiles(latencies),
+        "service_time": latency_percentiles(service_times),
+        "by_kind": {kind: latency_percentiles(values)["p50_ms"] for kind, values in sorted(by_kind.items())},
+        # Sanity check that the synthetic kinds still come out as intended (adversarial kinds excluded)
+        "expected_label_rate": round(agree / labeled, 3) if labeled else None,
+        "degraded": degraded,
+    }
+
+
+def preset_table(runs, preset):
+    """Markdown table of one preset's runs."""
+    lines = [
+        f"### {preset}",
+        "",
+        "| workers | batch | img/s | p50 ms | p95 ms | service p50 ms | expected label rate |",
+        "|---:|---:|---:|---:|---:|---:|---:|",
+    ]
+    for run in runs:
+        if run["preset"] == preset:
+            lines.append(f"| {run['workers']} | {run['batch_size']} | {run['throughput_ips']} | "
+                         f"{run['latency']['p50_ms']} | {run['latency']['p95_ms']} | "
+                         f"{run['service_time']['p50_ms']} | {run['expected_label_rate']} |")
+    return "\n".join(lines)
+
+
+def parse_list(text, cast=int):
+    return [cast(v) for v in text.split(",") if v.strip()]
+
+
+def parse_size(text):
+    width, height = (int(v) for v in text.lower().split("x"))
+    return width, height
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Throughput / latency load benchmark of process_image_logic")
+    parser.add_argument("--workers", default=None, help="comma-separated worker counts (default 1,2,...,CPUs)")
+    parser.add_argument("--batch", default="1,4", help="comma-separated batch sizes")
+    parser.add_argument("--images", type=int, default=40, help="images in the workload")
+    parser.add_argument("--rounds", type=int, default=1, help="passes over the workload per run")
+    parser.add_argument("--threads", type=int, default=1, help="threads per image (process_image_logic workers)")
+    parser.add_argument("--sizes", default="640x480,1024x768,1600x1200", help="comma-separated WIDTHxHEIGHT")
+    parser.add_argument("--mix", default=None, help="kind weights, e.g. crack=1,healthy=4 (default: equal)")
+    parser.add_argument("--adversarial", action="store_true",
+                        help=f"add the pathological kinds ({', '.join(ADVERSARIAL_KINDS)}) to the default mix")
+    parser.add_argument("--time-budget", type=float, default=None, help="per-image time budget, s (0 = off; default: config)")
+    parser.add_argument("--max-regions", type=int, default=None, help="per-image region ceiling (0 = off; default: config)")
+    parser.add_argument("--degrade", choices=DEGRADE_ACTIONS, default=None, help="action past a limit (default: config)")
+    parser.add_argument("--presets", default=DEFAULT_PRESET,
+                        help=f"comma-separated analysis presets ({', '.join(ANALYSIS_PRESETS)})")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", default=None, help="write the JSON report here (default: stdout)")
+    args = parser.parse_args()
+
+    cpus = os.cpu_count() or 1
+    worker_counts = parse_list(args.workers) if args.workers else sorted({1, *range(2, cpus + 1, 2), cpus})
+    sizes = [parse_size(s) for s in args.sizes.split(",")]
+    kinds = KINDS + ADVERSARIAL_KINDS
+    mix = {kind: 1 for kind in kinds} if args.adversarial else None
+    if args.mix:
+        mix = {k: float(v) for k, v in (item.split("=") for item in args.mix.split(","))}
+        unknown = set(mix) - set(kinds)
+        if unknown:
+            parser.error(f"unknown kinds in --mix: {', '.join(sorted(unknown))}")
+
+    presets = parse_list(args.presets, str)
+    unknown = set(presets) - set(ANALYSIS_PRESETS)
+    if unknown:
+        parser.error(f"unknown presets: {', '.join(sorted(unknown))}")
+
+    specs = build_workload(args.images, sizes, mix, args.seed)
+    guard = {key: value for key, value in (("time_budget", args.time_budget), ("max_regions", args.max_regions),
+                                           ("degrade", args.degrade)) if value is not None}
+    report = {
+        "host": {
+            "cpus": cpus,
+            "platform": platform.platform(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+        },
+        "workload": {
+            "images": len(specs),
+            "rounds": args.rounds,
+            "sizes": [f"{w}x{h}" for w, h in sizes],
+            "kinds": {kind: n for kind in kinds if (n := sum(1 for s in specs if s[0] == kind))},
+            "seed": args.seed,
+            "guard": guard,
+        },
+        "runs": [],
+    }
+    for preset in presets:
+        for workers in worker_counts:
+            for batch_size in parse_list(args.batch):
+                run = run_load(specs, workers, batch_size, args.rounds, args.threads, guard, preset)
+                report["runs"].append(run)
+                print(f"{preset} workers={workers} batch={batch_size}: {run['throughput_ips']} img/s, "
+                      f"p50 {run['latency']['p50_ms']} ms, p99 {run['latency']['p99_ms']} ms", file=sys.stderr)
+    if len(presets) > 1:
+        print("\n\n".join(preset_table(report["runs"], preset) for preset in presets), file=sys.stderr)
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+
+if __name__ == "__main__":
+    main()
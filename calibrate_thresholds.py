@@ -0,0 +1,260 @@
+"""
+Offline threshold-sweep calibration over cached region features.
+
+    python calibrate_thresholds.py labeled_images/ --grid sharp_gradient=20,25,30 --grid linear_aspect=3,3.5,4
+
+Labels come from sub-folder names (labeled_images/CRACK/img1.jpg, ...) or a
+CSV file (--labels labels.csv with columns file,label). Valid labels are the
+final_defect values: CRACK, CORROSION, DAMP, HEALTHY (or NORMAL), INVALID.
+
+Step 1 (once): process_image_logic runs on every image and the region table
+  + image totals are cached in a .npz file. Images already in the cache
+  (same path, size, mtime) are not processed again.
+Step 2 (per setting): classification + the global consistency check are
+  evaluated vectorized over ALL regions of ALL images at once
+  (one classify_regions call per setting, no per-image Python).
+
+Output: CSV with accuracy per setting (best first).
+"""
+import argparse
+import csv
+import itertools
+import os
+import time
+
+import numpy as np
+
+from classification import classify_regions, resolve_thresholds, DEFECT_CODES
+from config import CLASSIFY_THRESHOLDS
+from core.image_logic import process_image_logic
+from core.region_table import REGION_DTYPE, analyzed_area
+from input_module import load_image_array
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png")
+
+# Image-level outcome codes used by the sweep
+OUTCOMES = ("INVALID", "HEALTHY", "DAMP", "CORROSION", "CRACK")
+OUTCOME_CODES = {name: code for code, name in enumerate(OUTCOMES)}
+OUTCOME_CODES["NORMAL"] = OUTCOME_CODES["HEALTHY"]
+
+
+# =========================================================
+# STEP 1: FEATURE EXTRACTION + CACHE
+# =========================================================
+
+def find_images(directory):
+    paths = []
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                paths.append(os.path.join(root, name))
+    return sorted(paths)
+
+
+def image_key(path):
+    stat = os.stat(path)
+    return f"{os.path.abspath(path)}|{stat.st_size}|{int(stat.st_mtime)}"
+
+
+def load_cache(cache_path):
+    """Returns {key: (region_table, suspicious_pixels, total_pixels, is_invalid)}."""
+    if not os.path.exists(cache_path):
+        return {}
+    data = np.load(cache_path)
+    if data["regions"].dtype != REGION_DTYPE:
+        return {} # Written by an older region table layout: re-extract everything
+    entries = {}
+    offsets = data["offsets"]
+    for i, key in enumerate(data["keys"].tolist()):
+        table = data["regions"][offsets[i]:offsets[i + 1]]
+        entries[key] = (table, int(data["suspicious"][i]), int(data["total"][i]), bool(data["invalid"][i]))
+    return entries
+
+
+def save_cache(cache_path, entries):
+    keys = list(entries.keys())
+    tables = [entries[k][0] for k in keys]
+    offsets = np.zeros(len(keys) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(t) for t in tables])
+    np.savez(
+        cache_path,
+        keys=np.array(keys),
+        offsets=offsets,
+        regions=np.concatenate(tables) if tables else np.zeros(0, dtype=REGION_DTYPE),
+        suspicious=np.array([entries[k][1] for k in keys], dtype=np.int64),
+        total=np.array([entries[k][2] for k in keys], dtype=np.int64),
+        invalid=np.array([entries[k][3] for k in keys], dtype=bool),
+    )
+
+
+def extract_features(paths, cache_path, target_size=None):
+    """Runs the full pipeline only for images missing from the cache."""
+    cache = load_cache(cache_path)
+    entries = {}
+    missing = 0
+    for path in paths:
+        key = image_key(path)
+        if key in cache:
+            entries[key] = cache[key]
+            continue
+        missing += 1
+        pixels, width, height, _ = load_image_array(path, target_size)
+        # Features of every region are needed: no time budget / region ceiling
+        result = process_image_logic(pixels, width, height, os.path.basename(path), time_budget=0, max_regions=0)
+        entries[key] = (
+            result["region_table"],
+            result["suspicious_pixels"],
+            result["total_pixels"],
+            result["final_defect"] == "INVALID",
+        )
+        print(f"  extracted {os.path.basename(path)} ({len(result['region_table'])} regions)")
+    if missing:
+        save_cache(cache_path, entries)
+    print(f"Features: {len(paths)} images ({missing} extracted, {len(paths) - missing} cached)")
+    return [entries[image_key(p)] for p in paths]
+
+
+# =========================================================
+# STEP 2: VECTORIZED SWEEP
+# =========================================================
+
+class FeatureSet:
+    """All regions of all images, flattened once into float64 columns."""
+
+    def __init__(self, entries):
+        tables = [e[0] for e in entries]
+        regions = np.concatenate(tables) if tables else np.zeros(0, dtype=REGION_DTYPE)
+        self.n_images = len(entries)
+        self.image_index = np.repeat(np.arange(self.n_images), [len(t) for t in tables])
+
+        self.area = analyzed_area(regions)
+        self.bbox_w = (regions["max_col"] - regions["min_col"] + 1).astype(np.float64)
+        self.bbox_h = (regions["max_row"] - regions["min_row"] + 1).astype(np.float64)
+        self.colors = np.stack([regions["mean_r"], regions["mean_g"], regions["mean_b"]], axis=1).astype(np.float64)
+        self.rect = regions["rectangularity"].astype(np.float64)
+        self.grad = regions["gradient"].astype(np.float64)
+        self.is_joint = regions["is_joint"]
+
+        self.suspicious = np.array([e[1] for e in entries], dtype=np.float64)
+        self.total = np.array([e[2] for e in entries], dtype=np.float64)
+        self.invalid = np.array([e[3] for e in entries], dtype=bool)
+
+    def predict(self, thresholds):
+        """Image-level outcome codes (OUTCOMES) for one threshold setting."""
+        t = resolve_thresholds(thresholds)
+        codes = classify_regions(self.area, self.bbox_w, self.bbox_h, self.colors, self.rect, self.grad, t)
+        counted = ~self.is_joint & (self.area > t["min_defect_area"])
+
+        idx = self.image_index[counted]
+        n_classes = len(DEFECT_CODES)
+        counts = np.bincount(idx * n_classes + codes[counted], minlength=self.n_images * n_classes)
+        counts = counts.reshape(self.n_images, n_classes)
+        max_area = np.zeros(self.n_images)
+        np.maximum.at(max_area, idx, self.area[counted])
+
+        # Same order as core.image_logic.global_consistency
+        is_noise = (self.suspicious < self.total * t["noise_fraction"]) & (max_area < t["min_defect_area"])
+        return np.select(
+            [
+                self.invalid,
+                is_noise,
+                counts[:, DEFECT_CODES["CRACK"]] > 0,
+                counts[:, DEFECT_CODES["CORROSION"]] > 0,
+                counts[:, DEFECT_CODES["DAMP"]] > 0,
+            ],
+            [
+                OUTCOME_CODES["INVALID"],
+                OUTCOME_CODES["HEALTHY"],
+                OUTCOME_CODES["CRACK"],
+                OUTCOME_CODES["CORROSION"],
+                OUTCOME_CODES["DAMP"],
+            ],
+            default=OUTCOME_CODES["HEALTHY"],
+        )
+
+
+def parse_grid(grid_args):
+    """['sharp_gradient=20,25,30', ...] -> {'sharp_gradient': [20.0, 25.0, 30.0], ...}"""
+    grid = {}
+    for arg in grid_args:
+        key, _, values = arg.partition("=")
+        if key not in CLASSIFY_THRESHOLDS:
+            raise ValueError(f"Unknown threshold '{key}'. Known: {', '.join(CLASSIFY_THRESHOLDS)}")
+        grid[key] = [float(v) for v in values.split(",") if v.strip()]
+    return grid
+
+
+def sweep(features, labels, grid):
+    """Yields (setting, accuracy, per-class accuracy dict) for every grid combination."""
+    keys = list(grid.keys())
+    for values in itertools.product(*(grid[k] for k in keys)):
+        setting = dict(zip(keys, values))
+        predicted = features.predict(setting)
+        correct = predicted == labels
+        per_class = {}
+        for name in OUTCOMES:
+            mask = labels == OUTCOME_CODES[name]
+            if mask.any():
+                per_class[name] = float(correct[mask].mean())
+        yield setting, float(correct.mean()), per_class
+
+
+def read_labels(paths, directory, labels_csv):
+    if labels_csv:
+        with open(labels_csv, newline="", encoding="utf-8") as f:
+            by_file = {row["file"]: row["label"].strip().upper() for row in csv.DictReader(f)}
+        names = [by_file.get(os.path.relpath(p, directory), by_file.get(os.path.basename(p))) for p in paths]
+    else:
+        names = [os.path.basename(os.path.dirname(p)).upper() for p in paths]
+
+    labels = np.array([OUTCOME_CODES.get(name, -1) if name else -1 for name in names])
+    unlabeled = int(np.sum(labels < 0))
+    if unlabeled:
+        print(f"Warning: {unlabeled} images without a valid label are ignored")
+    return labels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sweep classification thresholds over cached region features")
+    parser.add_argument("directory", help="labeled image folder")
+    parser.add_argument("--labels", default=None, help="CSV with columns file,label (default: sub-folder names)")
+    parser.add_argument("--grid", action="append", default=[], help="threshold=v1,v2,... (repeatable)")
+    parser.add_argument("--cache", default=None, help="feature cache .npz (default: <directory>/.features.npz)")
+    parser.add_argument("--max-side", type=int, default=None, help="reduced-size decode while extracting")
+    parser.add_argument("--output", default="calibration_results.csv")
+    parser.add_argument("--top", type=int, default=10, help="settings to print")
+    args = parser.parse_args()
+
+    paths = find_images(args.directory)
+    labels = read_labels(paths, args.directory, args.labels)
+    keep = labels >= 0
+    paths = [p for p, k in zip(paths, keep) if k]
+    labels = labels[keep]
+
+    target_size = (args.max_side, args.max_side * 3 // 4) if args.max_side else None
+    cache_path = args.cache or os.path.join(args.directory, ".features.npz")
+    features = FeatureSet(extract_features(paths, cache_path, target_size))
+
+    grid = parse_grid(args.grid) or {"sharp_gradient": [float(CLASSIFY_THRESHOLDS["sharp_gradient"])]}
+    start = time.perf_counter()
+    rows = list(sweep(features, labels, grid))
+    elapsed = time.perf_counter() - start
+    rows.sort(key=lambda row: row[1], reverse=True)
+
+    with open(args.output, "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(list(grid.keys()) + ["accuracy"] + [f"acc_{name}" for name in OUTCOMES])
+        for setting, accuracy, per_class in rows:
+            writer.writerow(
+                [setting[k] for k in grid] + [round(accuracy, 4)]
+                + [round(per_class[n], 4) if n in per_class else "" for n in OUTCOMES]
+            )
+
+    print(f"Evaluated {len(rows)} settings over {len(features.area)} regions / {features.n_images} images in {elapsed:.2f}s")
+    for setting, accuracy, _ in rows[:args.top]:
+        print(f"  {accuracy:.3f}  {setting}")
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
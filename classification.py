@@ -1,4 +1,22 @@
-def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, avg_gradient=20):
+import numpy as np
+
+from config import CLASSIFY_THRESHOLDS
+
+# Region class codes (ordered by severity, same order as the UI sample score)
+# Used wherever regions are stored in arrays instead of strings.
+DEFECT_NAMES = ("NORMAL", "DAMP", "CORROSION", "CRACK")
+DEFECT_CODES = {name: code for code, name in enumerate(DEFECT_NAMES)}
+
+
+def resolve_thresholds(thresholds=None):
+    """Defaults from config.CLASSIFY_THRESHOLDS, overridden by any given keys."""
+    if not thresholds:
+        return CLASSIFY_THRESHOLDS
+    return {**CLASSIFY_THRESHOLDS, **thresholds}
+
+
+def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, avg_gradient=20, thresholds=None):
+    t = resolve_thresholds(thresholds)
     r, g, b = avg_color
     
     # ============================
@@ -11,7 +29,7 @@ def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, av
     # ============================
     # Green is dominant and significantly brighter than Red/Blue
     # This overrides everything as Algae = DAMP/BIO
-    if g > r + 15 and g > b + 15 and g > 60:
+    if g > r + t["green_margin"] and g > b + t["green_margin"] and g > 60:
          return "DAMP" 
 
     # ============================
@@ -19,26 +37,26 @@ def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, av
     # ============================
     # Soft edges (Low Gradient) indicate Shadows, Dampness, or Out-of-focus background.
     
-    is_soft = avg_gradient < 15
+    is_soft = avg_gradient < t["soft_gradient"]
     
     if is_soft:
         # EXCEPTION 1: If it is RED/RUSTY/ORANGE
         # Relaxed for Internal Corrosion (Orange/Yellow)
         # Old: (r > g + 10 and r > b + 10)
         # New: Warm colors (R likely max, or R~G for yellow)
-        is_warm = (r > b + 20) and (r > 50)
+        is_warm = (r > b + t["warm_margin"]) and (r > 50)
         
         if is_warm:
              # If it is LINEAR (Aspect Ratio > 3.0), it's likely a Rusty Crack even if softish.
              # Only call it "Corrosion Stain" if it is VERY soft (< 10) OR Not Linear.
-             if aspect_ratio > 3.0:
-                 if avg_gradient < 8: return "CORROSION" # Very soft streak
+             if aspect_ratio > t["soft_linear_aspect"]:
+                 if avg_gradient < t["very_soft_gradient"]: return "CORROSION" # Very soft streak
                  return "CRACK" # Rusty Linear Crack (Soft but not too soft)
              else:
                  return "CORROSION" # Blobby soft stain
              
         # EXCEPTION 2: Straight Soft Line -> Shadow/Joint -> Normal
-        if rectangularity > 0.60:
+        if rectangularity > t["shadow_rectangularity"]:
             return "NORMAL"
         # EXCEPTION 3: Irregular -> Damp
         return "DAMP"
@@ -50,14 +68,14 @@ def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, av
     # 1. LINEARITY
     # Standard: High Aspect Ratio (> 3.5)
     # Diagonal: Low Rectangularity/Solidity (< 0.22) because a diagonal line fills little of its square bbox.
-    is_linear = (aspect_ratio > 3.5) or (rectangularity < 0.22)
+    is_linear = (aspect_ratio > t["linear_aspect"]) or (rectangularity < t["diagonal_rectangularity"])
     
     # 2. SHARPNESS
     # Cracks have sharp edges (High Gradient).
     # Damp streaks have soft edges (Low Gradient).
     # Corrosion is rough (High Texture) but often irregular.
     # Raised to 25 to reject soft damp/dust streaks.
-    is_sharp = avg_gradient > 25
+    is_sharp = avg_gradient > t["sharp_gradient"]
     
     # ============================
     # 3. CLASSIFICATION LOGIC
@@ -70,7 +88,7 @@ def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, av
          
     # CORROSION check
     r, g, b = avg_color
-    is_red_dominant = (r > g + 15) and (r > b + 15)
+    is_red_dominant = (r > g + t["red_margin"]) and (r > b + t["red_margin"])
     
     # Internal Corrosion: Bright Orange/Yellow (R~G > B)
     # e.g. R=200, G=180, B=50
@@ -81,11 +99,11 @@ def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, av
     s = (c_max - c_min) / c_max if c_max != 0 else 0
     avg_brightness = (r + g + b) / 3
 
-    if area > 20 and avg_brightness > 40:
+    if area > t["min_color_area"] and avg_brightness > 40:
         # Strict Color Check for Rust
         if is_red_dominant or is_yellow_corrosion:
             return "CORROSION"
-        if s > 0.35 and r > 90: # High Saturation Orange/Yellow/Red
+        if s > t["rust_saturation"] and r > 90: # High Saturation Orange/Yellow/Red
             return "CORROSION"
             
     # DAMP: Default
@@ -93,3 +111,71 @@ def classify_region(area, bbox_width, bbox_height, avg_color, rectangularity, av
     return "DAMP"
             
     return "NORMAL"
+
+
+def classify_regions(area, bbox_width, bbox_height, avg_color, rectangularity, avg_gradient, thresholds=None):
+    """
+    Vectorized classify_region: same rule cascade, evaluated with NumPy masks
+    over ALL regions at once (one call per image instead of one per region).
+
+    Inputs are 1-D arrays of length N (avg_color is N x 3).
+    thresholds: optional overrides of config.CLASSIFY_THRESHOLDS.
+    Returns an int8 array of class codes (see DEFECT_NAMES).
+    """
+    t = resolve_thresholds(thresholds)
+    area = np.asarray(area, dtype=np.float64)
+    bbox_width = np.asarray(bbox_width, dtype=np.float64)
+    bbox_height = np.asarray(bbox_height, dtype=np.float64)
+    color = np.asarray(avg_color, dtype=np.float64).reshape(-1, 3)
+    rect = np.asarray(rectangularity, dtype=np.float64)
+    grad = np.asarray(avg_gradient, dtype=np.float64)
+    r, g, b = color[:, 0], color[:, 1], color[:, 2]
+
+    aspect_ratio = np.maximum(bbox_width, bbox_height) / np.maximum(1, np.minimum(bbox_width, bbox_height))
+
+    # 0. BIO/ALGAE CHECK
+    is_green = (g > r + t["green_margin"]) & (g > b + t["green_margin"]) & (g > 60)
+
+    # 1. GLOBAL SOFTNESS CHECK
+    is_soft = grad < t["soft_gradient"]
+    is_warm = (r > b + t["warm_margin"]) & (r > 50)
+    warm_linear = is_warm & (aspect_ratio > t["soft_linear_aspect"])
+
+    # 2. GEOMETRY & SHARPNESS CHECK
+    is_linear = (aspect_ratio > t["linear_aspect"]) | (rect < t["diagonal_rectangularity"])
+    is_sharp = grad > t["sharp_gradient"]
+
+    # 3. COLOR (CORROSION)
+    is_red_dominant = (r > g + t["red_margin"]) & (r > b + t["red_margin"])
+    # int() truncation, as in the scalar version
+    is_yellow_corrosion = (r > 100) & (g > 80) & (b < 100) & (np.abs(np.trunc(r) - np.trunc(g)) < 40)
+    c_max = np.maximum(np.maximum(r, g), b)
+    c_min = np.minimum(np.minimum(r, g), b)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s = np.where(c_max != 0, (c_max - c_min) / c_max, 0)
+    avg_brightness = (r + g + b) / 3
+    color_ok = (area > t["min_color_area"]) & (avg_brightness > 40)
+    is_corrosion_color = color_ok & ((is_red_dominant | is_yellow_corrosion) | ((s > t["rust_saturation"]) & (r > 90)))
+
+    # Rule cascade (first match wins, same order as classify_region)
+    conditions = [
+        is_green,
+        is_soft & warm_linear & (grad < t["very_soft_gradient"]),
+        is_soft & warm_linear,
+        is_soft & is_warm,
+        is_soft & (rect > t["shadow_rectangularity"]),
+        is_soft,
+        is_linear & is_sharp,
+        is_corrosion_color,
+    ]
+    choices = [
+        DEFECT_CODES["DAMP"],
+        DEFECT_CODES["CORROSION"],
+        DEFECT_CODES["CRACK"],
+        DEFECT_CODES["CORROSION"],
+        DEFECT_CODES["NORMAL"],
+        DEFECT_CODES["DAMP"],
+        DEFECT_CODES["CRACK"],
+        DEFECT_CODES["CORROSION"],
+    ]
+    return np.select(conditions, choices, default=DEFECT_CODES["DAMP"]).astype(np.int8)
@@ -10,3 +10,83 @@ SEVERITY_BASE = {
     "DAMP": 30,
     "NORMAL": 0
 }
+
+# Region classification thresholds (classification.classify_region / classify_regions)
+# and the image-level decision (core.image_logic.global_consistency).
+# Only depend on per-region features, so they can be changed at runtime
+# (live controls in the app) without re-running detection.
+CLASSIFY_THRESHOLDS = {
+    "soft_gradient": 15,               # gradient below this = soft edge (shadow / damp)
+    "very_soft_gradient": 8,           # soft warm streak below this = corrosion stain
+    "sharp_gradient": 25,              # gradient above this = sharp edge (crack)
+    "soft_linear_aspect": 3.0,         # soft + warm + aspect above this = rusty crack
+    "linear_aspect": 3.5,              # aspect ratio above this = linear
+    "diagonal_rectangularity": 0.22,   # rectangularity below this = diagonal line
+    "shadow_rectangularity": 0.60,     # soft + rectangularity above this = shadow / joint
+    "green_margin": 15,                # algae: G above R and B by this much
+    "warm_margin": 20,                 # warm: R above B by this much
+    "red_margin": 15,                  # rust: R above G and B by this much
+    "rust_saturation": 0.35,           # saturation above this (and R > 90) = rust
+    "min_color_area": 20,              # color rules need more pixels than this
+    "min_defect_area": 50,             # regions up to this size are noise specs
+    "noise_fraction": 0.005,           # suspicious area below this fraction = healthy
+}
+
+# Low-memory mode: whole-image stages run on row bands of at most this many
+# rows, and at most 1/LOW_MEMORY_BAND_FRACTION of the image height, so band
+# temporaries stay a small fraction of the frame.
+LOW_MEMORY_BAND_ROWS = 256
+LOW_MEMORY_BAND_FRACTION = 16
+
+# Quick-look triage (core.quick_look): pixels sampled per frame, and the
+# affected % (upper confidence bound) at which the full analysis is run.
+QUICK_LOOK_SAMPLES = 4096
+QUICK_LOOK_MIN_AFFECTED = 0.5
+
+# Change detection against a prior inspection (core.change_detection):
+# tile size (px) of the change grid, fraction of a tile's pixels that must
+# differ (aligned binary masks) to re-analyze it, area growth that makes a
+# defect "grown", the registration quality needed to trust the prior, and
+# the share of the frame past which the re-analysis is one full analysis
+# instead of crops.
+CHANGE_TILE = 64
+CHANGE_MIN_FRACTION = 0.01
+CHANGE_GROWTH = 0.2
+CHANGE_MIN_CORRELATION = 0.5
+CHANGE_MAX_FRACTION = 0.6
+
+# Color rule lookup table (defect_detection.compile_color_mask): bits per
+# channel of the quantized RGB cube (6 -> 64^3 cells, 256 KB per table).
+COLOR_LUT_BITS = 6
+
+# Per-image guard (core.budget): analysis time budget (s) and region-count
+# ceiling of one image (0 = unlimited), and what happens past them:
+# "downsample" (re-analyze a block-averaged copy), "partial" (stop early,
+# partial result) or "offline" (return DEFERRED: marked for offline processing,
+# which the caller re-runs with the guard off).
+IMAGE_TIME_BUDGET = 60.0
+MAX_REGIONS = 50000
+DEGRADE_ACTION = "downsample"
+
+# Speed / quality presets (core.analysis_config.AnalysisConfig), chosen per
+# deployment or per call: process_image_logic(..., config="fast").
+# "balanced" is the reference pipeline. Knobs:
+#   pyramid_levels     analyze at 1 / 2^levels resolution (decimated; levels
+#                      stop at a 320 px short side), counts and region
+#                      table mapped back to full size
+#   roi_stride         ROI search: every n-th row / column is a start point
+#   edge_stride        validity texture check: every n-th pixel is sampled
+#   gradient_min_area  regions up to this area skip the edge-gradient pass
+#                      (gradient 0); 50 = the default min_defect_area, so
+#                      only never-counted noise specks are skipped
+#   sample_search      radius (px) searched for the binary sample window
+#   crack_metrics      thin every crack to its centerline (length / width / branches)
+ANALYSIS_PRESETS = {
+    "fast": {"pyramid_levels": 1, "roi_stride": 8, "edge_stride": 8,
+             "gradient_min_area": 50, "sample_search": 0, "crack_metrics": False},
+    "balanced": {"pyramid_levels": 0, "roi_stride": 4, "edge_stride": 4,
+                 "gradient_min_area": 0, "sample_search": 60, "crack_metrics": True},
+    "thorough": {"pyramid_levels": 0, "roi_stride": 1, "edge_stride": 2,
+                 "gradient_min_area": 0, "sample_search": 120, "crack_metrics": True},
+}
+DEFAULT_PRESET = "balanced"
@@ -0,0 +1,83 @@
+import numpy as np
+
+from config import ANALYSIS_PRESETS, DEFAULT_PRESET
+
+# =========================================================
+# RUNTIME ANALYSIS CONFIGURATION (Named Presets)
+# =========================================================
+# One object carries the speed / quality knobs of an analysis through the
+# pipeline (ROI search, validity sampling, region gradients, crack metrics,
+# pyramid level), so each deployment or call can trade accuracy for time:
+#     process_image_logic(..., config="fast")
+#     process_image_logic(..., config=AnalysisConfig("thorough", edge_stride=4))
+# Presets and the meaning of every knob: config.ANALYSIS_PRESETS.
+
+FIELDS = tuple(ANALYSIS_PRESETS[DEFAULT_PRESET])
+
+# Pyramid levels stop before the analyzed copy's short side gets below this
+# (px): small frames are analyzed at full size, thin cracks need the pixels
+MIN_PYRAMID_SIDE = 320
+
+
+class AnalysisConfig:
+    """A preset's knobs, with optional per-knob overrides."""
+
+    def __init__(self, preset=DEFAULT_PRESET, **overrides):
+        if preset not in ANALYSIS_PRESETS:
+            raise ValueError(f"unknown preset {preset!r} (expected one of {', '.join(ANALYSIS_PRESETS)})")
+        unknown = set(overrides) - set(FIELDS)
+        if unknown:
+            raise ValueError(f"unknown analysis settings: {', '.join(sorted(unknown))}")
+        self.preset = preset
+        for name, value in {**ANALYSIS_PRESETS[preset], **overrides}.items():
+            setattr(self, name, value)
+
+    def replace(self, **overrides):
+        """Copy with some knobs changed."""
+        return AnalysisConfig(self.preset, **{**self.as_dict(), **overrides})
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in FIELDS}
+
+    def __eq__(self, other):
+        return isinstance(other, AnalysisConfig) and self.as_dict() == other.as_dict()
+
+    def __repr__(self):
+        changed = {k: v for k, v in self.as_dict().items() if v != ANALYSIS_PRESETS[self.preset][k]}
+        extra = "".join(f", {k}={v!r}" for k, v in changed.items())
+        return f"AnalysisConfig({self.preset!r}{extra})"
+
+
+def resolve_config(config=None):
+    """
+    AnalysisConfig from None (config.DEFAULT_PRESET), a preset name, a dict
+    of knobs (on top of the default preset, "preset" key optional) or an
+    AnalysisConfig (returned as is).
+    """
+    if isinstance(config, AnalysisConfig):
+        return config
+    if config is None:
+        return AnalysisConfig()
+    if isinstance(config, str):
+        return AnalysisConfig(config)
+    config = dict(config)
+    return AnalysisConfig(config.pop("preset", DEFAULT_PRESET), **config)
+
+
+def pyramid_factor(config, width, height):
+    """Downsampling factor of the config's pyramid level for a width x height frame (1 = full size)."""
+    factor = 1 << config.pyramid_levels
+    while factor > 1 and min(width, height) // factor < MIN_PYRAMID_SIDE:
+        factor //= 2
+    return factor
+
+
+def pyramid_level(pixels, factor):
+    """
+    Every factor-th pixel of every factor-th row (trailing partial blocks
+    dropped, as in core.budget.block_downsample). Decimated rather than
+    block-averaged: averaging smooths the surface texture that ROI extraction
+    and the validity checks measure, so big frames would come out INVALID.
+    """
+    height, width = pixels.shape[0] // factor, pixels.shape[1] // factor
+    return np.ascontiguousarray(pixels[:height * factor:factor, :width * factor:factor, :3])
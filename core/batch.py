@@ -0,0 +1,166 @@
+import numpy as np
+
+from core.analysis_config import resolve_config, pyramid_factor, pyramid_level
+from core.band_labeling import label_runs, component_sizes
+from core.image_logic import process_image_logic, upscaled_result
+from defect_detection import binary_map_rules, color_mask, global_dark_limit
+
+# =========================================================
+# BATCHED ANALYSIS (N Same-Sized Frames as One Array)
+# =========================================================
+# Crawler frames share one resolution. Instead of N calls that each walk the
+# frame-level stages on one image, the frames are stacked into one
+# (N, H, W, 3) array and every frame-level stage runs ONCE over the stack:
+#   - grayscale, structure gradient + dilation (ROI), brightness sums
+#   - ROI components: one band labeling of all N masks, stacked vertically
+#     with an empty row between frames (so frames never touch)
+#   - validity statistics: center color means, gray profiles, sampled edges,
+#     gray histograms (one bincount), saturation and gradient edge counts
+#   - thresholding: one color-table gather per frame into a (N, H, W) map
+#     (the dark limit depends on each frame's own brightness)
+# Only the region stage (labeling, features, classification) runs per frame,
+# through process_image_logic(stages=...). Results match N single calls.
+
+
+def _roi_results(gray32, height, width, stride=4):
+    """(roi_mask, is_valid_roi, reason) of every frame (same as extract_pipe_roi)."""
+    n = gray32.shape[0]
+    grad_mag = np.zeros(gray32.shape, dtype=np.uint8)
+    grad_mag[:, :, :-1] += np.abs(gray32[:, :, 1:] - gray32[:, :, :-1]).astype(np.uint8)
+    grad_mag[:, :-1, :] += np.abs(gray32[:, 1:, :] - gray32[:, :-1, :]).astype(np.uint8)
+    structure_mask = grad_mag > 5
+    del grad_mag
+
+    # Dilated masks, one empty separator row below every frame
+    dilated = np.zeros((n, height + 1, width), dtype=bool)
+    dilated[:, :height] = structure_mask
+    dilated[:, :height - 1] |= structure_mask[:, 1:] # From Down
+    dilated[:, 1:height] |= structure_mask[:, :-1] # From Up
+    dilated[:, :height, :-1] |= structure_mask[:, :, 1:] # From Right
+    dilated[:, :height, 1:] |= structure_mask[:, :, :-1] # From Left
+    del structure_mask
+
+    rows, starts, ends, labels, n_regions = label_runs(dilated.reshape(n * (height + 1), width))
+    max_sizes = np.zeros(n, dtype=np.int64)
+    if n_regions:
+        # Only components holding a subsampled DFS start point are measured
+        seeded = ((rows % (height + 1)) % stride == 0) & (-(-starts // stride) * stride < ends)
+        sizes = component_sizes(labels, starts, ends, n_regions)
+        np.maximum.at(max_sizes, rows[seeded] // (height + 1), sizes[labels[seeded]])
+
+    results = []
+    for max_component_size in max_sizes.tolist():
+        coverage = max_component_size / (width * height)
+        if coverage < 0.10:
+            results.append((None, False, f"INVALID: No Pipe Detected. Largest Object is only {coverage*100:.1f}% of image (Threshold 10%)."))
+        else:
+            results.append((None, True, f"Valid Pipe ROI Detected ({coverage*100:.1f}% coverage)."))
+    return results
+
+
+def frame_statistics(stack, gray, binary_maps, edge_stride=4):
+    """Per-frame validity statistics (core.validity_check.is_valid_pipe(stats=...)) of a stack."""
+    n, height, width = gray.shape
+    defect_pixels = np.count_nonzero(binary_maps.reshape(n, -1), axis=1)
+
+    # Exact integer sums, so the means equal np.mean of each channel
+    center = stack[:, height//4:3*height//4, width//4:3*width//4]
+    center_mean = center.sum(axis=(1, 2), dtype=np.int64) / max(1, center.shape[1] * center.shape[2])
+
+    col_profiles = gray.mean(axis=1)
+    row_profiles = gray.mean(axis=2)
+
+    # Sampled edge check (every edge_stride-th pixel): channel sums of the pixel, its right and lower neighbor
+    rr, cc = np.arange(1, height - 1, edge_stride), np.arange(1, width - 1, edge_stride)
+    sums = stack.sum(axis=3, dtype=np.int32)
+    p_center = sums[:, rr[:, None], cc]
+    horizontal = np.count_nonzero((np.abs(sums[:, rr[:, None], cc + 1] - p_center) > 40).reshape(n, -1), axis=1)
+    vertical = np.count_nonzero((np.abs(sums[:, rr[:, None] + 1, cc] - p_center) > 40).reshape(n, -1), axis=1)
+    del sums
+
+    # One bincount for all N gray histograms (frame k owns bins 256k .. 256k + 255)
+    gray_int = gray.astype(np.uint8).reshape(n, -1)
+    histograms = np.bincount((gray_int + np.arange(n, dtype=np.int64)[:, None] * 256).ravel(),
+                             minlength=n * 256).reshape(n, 256)
+    del gray_int
+
+    px_float = stack.astype(np.float32)
+    c_max = px_float.max(axis=3)
+    c_min = px_float.min(axis=3)
+    del px_float
+    with np.errstate(divide='ignore', invalid='ignore'):
+        s_map = (c_max - c_min) / c_max
+    s_map[c_max == 0] = 0
+    high_saturation = np.count_nonzero((s_map > 0.85).reshape(n, -1), axis=1)
+    del c_max, c_min, s_map
+
+    gy, gx = np.gradient(gray, axis=(1, 2))
+    gx **= 2
+    gy **= 2
+    gx += gy
+    del gy
+    np.sqrt(gx, out=gx)
+    gradient_edges = np.count_nonzero((gx > 10).reshape(n, -1), axis=1)
+
+    return [{
+        "defect_pixels": int(defect_pixels[k]),
+        "center_mean": tuple(center_mean[k]),
+        "profiles": (col_profiles[k], row_profiles[k]),
+        "sampled_edges": (int(horizontal[k]), int(vertical[k])),
+        "histogram": histograms[k],
+        "high_saturation": int(high_saturation[k]),
+        "gradient_edges": int(gradient_edges[k]),
+    } for k in range(n)]
+
+
+def frame_stages(stack, config=None):
+    """ROI, binary map and validity statistics of every frame of an (N, H, W, 3) uint8 stack."""
+    config = resolve_config(config)
+    n, height, width = stack.shape[:3]
+    gray = stack.mean(axis=3)
+    rois = _roi_results(gray.astype(np.float32), height, width, config.roi_stride)
+
+    # Global brightness per frame (exact integer sums) -> one dark limit per frame
+    totals = stack.reshape(n, -1).sum(axis=1, dtype=np.int64)
+    binary_maps = np.zeros((n, height, width), dtype=np.uint8)
+    for k in range(n):
+        color_mask(stack[k], binary_map_rules(global_dark_limit(int(totals[k]), width, height)), out=binary_maps[k])
+
+    statistics = frame_statistics(stack, gray, binary_maps, config.edge_stride)
+    return [{"roi": rois[k], "binary_map": binary_maps[k], "statistics": statistics[k]} for k in range(n)]
+
+
+def process_batch(frames, pipe_ids, thresholds=None, workers=1, return_mask=False, config=None, **options):
+    """
+    process_image_logic for N frames of the same size, given as an
+    (N, H, W, 3) uint8 array or a list of (H, W, 3) arrays. pipe_ids: one id
+    per frame. Returns the N results, in frame order.
+
+    The frame-level stages run once over the whole stack (frame_stages);
+    peak memory is a few float copies of the stack, so callers bound N
+    (e.g. the HTTP micro-batch size). config: speed / quality preset (see
+    process_image_logic); a pyramid level downsamples the whole stack first.
+    options: time_budget / max_regions / degrade, passed to every frame.
+    """
+    stack = np.asarray(frames if isinstance(frames, np.ndarray) else np.stack(frames), dtype=np.uint8)
+    if stack.ndim != 4 or stack.shape[3] != 3:
+        raise ValueError(f"expected an (N, H, W, 3) stack of frames, got shape {stack.shape}")
+    if len(pipe_ids) != stack.shape[0]:
+        raise ValueError(f"{len(pipe_ids)} pipe ids for {stack.shape[0]} frames")
+    height, width = stack.shape[1:3]
+    config = resolve_config(config)
+
+    factor = pyramid_factor(config, width, height)
+    if factor > 1:
+        stack = np.stack([pyramid_level(frame, factor) for frame in stack])
+        config = config.replace(pyramid_levels=0)
+    stages = frame_stages(stack, config)
+    results = []
+    for k, pipe_id in enumerate(pipe_ids):
+        result = process_image_logic(stack[k], stack.shape[2], stack.shape[1], pipe_id, thresholds, workers=workers,
+                                     return_mask=return_mask, stages=stages[k], config=config, **options)
+        if factor > 1:
+            result = upscaled_result(result, factor, width, height, thresholds)
+            result["pyramid_factor"] = factor
+        results.append(result)
+    return results
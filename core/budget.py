@@ -0,0 +1,147 @@
+import math
+import time
+
+import numpy as np
+
+from config import IMAGE_TIME_BUDGET, MAX_REGIONS, DEGRADE_ACTION
+from core.region_table import empty_region_table
+
+# =========================================================
+# PER-IMAGE GUARD (Time Budget + Region Ceiling)
+# =========================================================
+# The region stage costs O(regions): a 1-px checkerboard or a frame full of
+# dust specks turns into hundreds of thousands of regions and can hold a
+# worker for minutes. Two limits per image:
+#   - region ceiling: estimated up front from the binary map (root runs,
+#     core.band_labeling.estimate_region_count), before any region is walked
+#   - time budget: checked while the regions are walked and before every
+#     crack centerline measurement (core.skeleton.measure_cracks)
+# Past a limit the image is degraded instead of blocking the queue:
+#   "downsample"  re-analyze a block-averaged copy (factor from the estimate)
+#   "partial"     stop early, classify the regions analyzed so far
+#   "offline"     return DEFERRED right away; nothing is queued here, the
+#                 caller re-runs DEFERRED images offline (guard off)
+# The result says what happened in result["degraded"]:
+#     {"reason": "region_limit" | "time_budget",
+#      "action": "downsampled" | "partial" | "offline", ...details}
+
+DEGRADE_ACTIONS = ("downsample", "partial", "offline")
+
+# Regions walked between two clock reads in the region loop
+CHECK_EVERY = 256
+
+
+class ImageBudget:
+    """Limits of one image analysis. None = config default, 0 = unlimited."""
+
+    def __init__(self, seconds=None, max_regions=None, action=None):
+        self.seconds = IMAGE_TIME_BUDGET if seconds is None else seconds
+        self.max_regions = MAX_REGIONS if max_regions is None else max_regions
+        self.action = action or DEGRADE_ACTION
+        if self.action not in DEGRADE_ACTIONS:
+            raise ValueError(f"unknown degrade action {self.action!r} (expected one of {DEGRADE_ACTIONS})")
+        self.started = time.perf_counter()
+
+    def elapsed(self):
+        return time.perf_counter() - self.started
+
+    def expired(self):
+        return bool(self.seconds) and self.elapsed() > self.seconds
+
+    def remaining(self):
+        """Seconds left (None = unlimited). Never 0, which would mean unlimited."""
+        if not self.seconds:
+            return None
+        return max(1e-3, self.seconds - self.elapsed())
+
+    def over_region_limit(self, estimate):
+        return bool(self.max_regions) and estimate > self.max_regions
+
+
+def downsample_factor(estimate, max_regions):
+    """Block size that brings ~estimate regions under max_regions (regions scale with the area)."""
+    return max(2, math.ceil(math.sqrt(estimate / max_regions)))
+
+
+def block_downsample(pixels, factor, band_rows=256):
+    """
+    Block-mean (factor x factor) of an (H, W, 3) uint8 array; the last
+    partial row / column of blocks is dropped. Row bands, so a memory-mapped
+    frame is read a band at a time.
+    """
+    height, width = pixels.shape[0] // factor, pixels.shape[1] // factor
+    out = np.empty((height, width, pixels.shape[2]), dtype=np.uint8)
+    for top in range(0, height, band_rows):
+        bottom = min(height, top + band_rows)
+        band = np.asarray(pixels[top * factor:bottom * factor, :width * factor], dtype=np.float32)
+        blocks = band.reshape(bottom - top, factor, width, factor, -1).mean(axis=(1, 3))
+        out[top:bottom] = np.round(blocks)
+    return out
+
+
+def upscale_region_table(table, factor):
+    """Region table of a downsampled frame, in full-frame coordinates (in place)."""
+    table["area"] *= factor * factor
+    table["min_row"] *= factor
+    table["min_col"] *= factor
+    table["max_row"] = table["max_row"] * factor + factor - 1
+    table["max_col"] = table["max_col"] * factor + factor - 1
+    table["centroid_row"] = table["centroid_row"] * factor + (factor - 1) / 2
+    table["centroid_col"] = table["centroid_col"] * factor + (factor - 1) / 2
+    table["length"] *= factor
+    table["skeleton_length"] *= factor
+    table["mean_width"] *= factor
+    table["scale"] *= factor # Area thresholds keep applying in analyzed pixels (region_table.analyzed_area)
+    return table
+
+
+def upscale_mask(mask, factor, height, width):
+    """(height, width) mask from a downsampled one (uncovered border = 0)."""
+    full = np.zeros((height, width), dtype=np.uint8)
+    grown = np.repeat(np.repeat(mask, factor, axis=0), factor, axis=1)
+    full[:grown.shape[0], :grown.shape[1]] = grown
+    return full
+
+
+def upscale_result(result, factor, width, height):
+    """Result of a downsampled frame, in width x height full-frame terms (in place)."""
+    result["total_pixels"] = width * height
+    result["suspicious_pixels"] *= factor * factor
+    upscale_region_table(result["region_table"], factor)
+    if "binary_map" in result:
+        result["binary_map"] = upscale_mask(result["binary_map"], factor, height, width)
+    return result
+
+
+def describe(degraded):
+    """One-line note for the result explanation."""
+    reason = degraded["reason"]
+    if reason == "region_limit":
+        why = f"~{degraded['regions_estimate']} regions > limit {degraded['max_regions']}"
+    else:
+        why = f"time budget of {degraded['budget_seconds']:g} s exceeded"
+    action = degraded["action"]
+    if action == "downsampled":
+        what = f"analyzed at 1/{degraded['factor']} resolution"
+    elif action == "partial":
+        what = f"partial result, {degraded['regions_analyzed']} regions analyzed"
+        if degraded.get("cracks_unmeasured"):
+            what += f", {degraded['cracks_unmeasured']} crack(s) without centerline metrics"
+    else:
+        what = "not analyzed, marked for offline processing"
+    return f"Degraded ({why}): {what}."
+
+
+def deferred_result(degraded, suspicious_pixels, total_pixels):
+    """Result for an image marked for offline processing (no region analysis, priority 0)."""
+    return {
+        "final_defect": "DEFERRED",
+        "explanation": describe(degraded),
+        "binary_sample": np.zeros((20, 50), dtype=np.uint8),
+        "total_pixels": total_pixels,
+        "suspicious_pixels": suspicious_pixels,
+        "affected_percentage": (suspicious_pixels / total_pixels) * 100 if total_pixels else 0.0,
+        "priority_score": 0,
+        "region_table": empty_region_table(),
+        "degraded": degraded,
+    }
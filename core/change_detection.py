@@ -0,0 +1,324 @@
+import json
+
+import numpy as np
+
+from config import CHANGE_TILE, CHANGE_MIN_FRACTION, CHANGE_GROWTH, CHANGE_MIN_CORRELATION, CHANGE_MAX_FRACTION
+from classification import DEFECT_CODES
+from defect_detection import frame_dark_limit, rgb_to_binary_map_compact
+from core.band_labeling import label_runs
+from core.exporters import decode_mask
+from core.image_logic import process_image_logic, count_defects, global_consistency
+from core.region_table import classify_region_table, empty_region_table, region_table_from_records
+from core.segments import REGISTRATION_SIDE, register_translation, overlap_views, new_area_rects, shift_region_table
+from input_module import as_pixel_array
+
+# =========================================================
+# CHANGE DETECTION (Repeat Inspection of the Same Pipe)
+# =========================================================
+# A pipe re-inspected every quarter mostly looks like last time. Given the
+# prior inspection's binary mask + region table:
+#   1. Binary map of the new image (vectorized, the cheap stage). Its dark
+#      threshold is also used for every crop, so crops see the same map.
+#   2. Coarse registration of the two masks: phase correlation on block-density
+#      thumbnails (core.segments), refined to 1 px with row / column profiles.
+#   3. Tile grid over the aligned masks: tiles whose suspicious pixel count
+#      changed (+ 1 tile of margin) and the strips the prior did not cover are
+#      grouped into rectangles, grown to cover the prior regions they cut.
+#   4. Only those rectangles get the full region analysis (trusted crops, like
+#      the new strips of a segment). Prior regions outside them are kept as-is.
+#      If the rectangles cover most of the frame (CHANGE_MAX_FRACTION), the
+#      whole frame is analyzed once instead.
+#   5. Every defect region is reported as new / grown / unchanged; prior
+#      defects that are gone from a re-analyzed area are counted as resolved.
+
+CHANGE_STATUSES = ("new", "grown", "unchanged")
+
+
+def load_prior(export_path, pipe_id):
+    """
+    Latest inspection of pipe_id in a JSONL export (core.exporters) written
+    with regions and mask. Returns (binary_map, region_table) or None.
+    """
+    prior = None
+    with open(export_path, encoding="utf-8") as f:
+        for line in f:
+            if not line.endswith("\n"):
+                break # Torn last line
+            record = json.loads(line)
+            if record.get("pipe_id") == pipe_id and record.get("mask") and "regions" in record:
+                prior = record
+    if prior is None:
+        return None
+    return decode_mask(prior["mask"]), region_table_from_records(prior["regions"])
+
+
+def mask_thumbnail(binary_map, step):
+    """Block density (fraction of 1-pixels per step x step block), float32."""
+    height, width = binary_map.shape
+    h, w = height // step, width // step
+    blocks = np.asarray(binary_map[:h * step, :w * step], dtype=np.float32)
+    return blocks.reshape(h, step, w, step).mean(axis=(1, 3))
+
+
+def _refine_profile(prior_profile, new_profile, coarse, radius):
+    """Shift in [coarse - radius, coarse + radius] that best aligns two 1-D profiles."""
+    n = new_profile.size
+    best, best_score = coarse, -np.inf
+    for shift in range(coarse - radius, coarse + radius + 1):
+        lo, hi = max(0, -shift), min(n, prior_profile.size - shift)
+        if hi - lo < n // 4:
+            continue
+        a = prior_profile[lo + shift:hi + shift] - prior_profile[lo + shift:hi + shift].mean()
+        b = new_profile[lo:hi] - new_profile[lo:hi].mean()
+        denom = np.sqrt(np.sum(a * a) * np.sum(b * b))
+        score = np.sum(a * b) / denom if denom > 0 else 0.0
+        if score > best_score:
+            best, best_score = shift, score
+    return best
+
+
+def register_masks(prior_map, new_map):
+    """
+    (dy, dx, correlation) with new[y, x] ~ prior[y + dy, x + dx] (full-resolution
+    pixels), or None if the masks do not have the same size.
+    """
+    if prior_map.shape != new_map.shape:
+        return None
+    step = max(1, max(new_map.shape) // REGISTRATION_SIDE)
+    dy, dx, correlation = register_translation(mask_thumbnail(prior_map, step), mask_thumbnail(new_map, step))
+    if step > 1:
+        dy = _refine_profile(prior_map.sum(axis=1, dtype=np.float64), new_map.sum(axis=1, dtype=np.float64), dy * step, step)
+        dx = _refine_profile(prior_map.sum(axis=0, dtype=np.float64), new_map.sum(axis=0, dtype=np.float64), dx * step, step)
+    return dy, dx, correlation
+
+
+def changed_tiles(prior_map, new_map, dy, dx, tile=CHANGE_TILE, min_fraction=CHANGE_MIN_FRACTION):
+    """
+    Bool grid (one cell per tile x tile block of the new frame): True where
+    the suspicious pixel count of the aligned masks differs by more than
+    min_fraction of the tile. Single-pixel flips (sensor noise near the
+    threshold) mostly cancel out in the count; a new, grown or healed defect
+    does not. Only the part covered by the prior is compared (the uncovered
+    strips are new area, see segments.new_area_rects).
+    """
+    height, width = new_map.shape
+    delta = np.zeros((height, width), dtype=np.int8)
+    prior_part, new_part = overlap_views(prior_map, new_map, dy, dx)
+    _, delta_part = overlap_views(prior_map, delta, dy, dx) # view into delta
+    np.subtract(new_part != 0, prior_part != 0, out=delta_part, dtype=np.int8)
+
+    rows, cols = -(-height // tile), -(-width // tile)
+    padded = np.zeros((rows * tile, cols * tile), dtype=np.int8)
+    padded[:height, :width] = delta
+    counts = padded.reshape(rows, tile, cols, tile).sum(axis=(1, 3), dtype=np.int64)
+    cell_h = np.minimum(tile, height - np.arange(rows) * tile)
+    cell_w = np.minimum(tile, width - np.arange(cols) * tile)
+    return np.abs(counts) > min_fraction * np.outer(cell_h, cell_w)
+
+
+def _overlaps(rect, tops, lefts, bottoms, rights):
+    """Which boxes (inclusive bounds) intersect rect = (top, left, h, w)."""
+    top, left, h, w = rect
+    return (tops < top + h) & (bottoms >= top) & (lefts < left + w) & (rights >= left)
+
+
+def _merge_rects(rects):
+    """Merges intersecting rectangles until none overlap."""
+    rects = list(rects)
+    merged = True
+    while merged:
+        merged = False
+        for i in range(len(rects)):
+            for j in range(i + 1, len(rects)):
+                (t1, l1, h1, w1), (t2, l2, h2, w2) = rects[i], rects[j]
+                if t1 < t2 + h2 and t2 < t1 + h1 and l1 < l2 + w2 and l2 < l1 + w1:
+                    top, left = min(t1, t2), min(l1, l2)
+                    rects[i] = (top, left, max(t1 + h1, t2 + h2) - top, max(l1 + w1, l2 + w2) - left)
+                    del rects[j]
+                    merged = True
+                    break
+            if merged:
+                break
+    return rects
+
+
+def change_rects(changed, tile, height, width, prior_table=None, new_area=()):
+    """
+    Rectangles (top, left, h, w) to re-analyze: groups of changed tiles with
+    one tile of margin, plus the new_area rectangles, grown to fully contain
+    every prior region they cut (so no region is analyzed in pieces), merged
+    until disjoint.
+    """
+    rects = list(new_area)
+    if changed.any():
+        grown = changed.copy()
+        grown[1:] |= changed[:-1]; grown[:-1] |= changed[1:]
+        grown[:, 1:] |= grown[:, :-1].copy(); grown[:, :-1] |= grown[:, 1:].copy()
+
+        rows, starts, ends, labels, n = label_runs(grown)
+        top = np.full(n, grown.shape[0]); np.minimum.at(top, labels, rows)
+        bottom = np.zeros(n, dtype=np.int64); np.maximum.at(bottom, labels, rows)
+        left = np.full(n, grown.shape[1]); np.minimum.at(left, labels, starts)
+        right = np.zeros(n, dtype=np.int64); np.maximum.at(right, labels, ends - 1)
+        for t, l, b, r in zip(top.tolist(), left.tolist(), bottom.tolist(), right.tolist()):
+            y0, x0 = t * tile, l * tile
+            rects.append((y0, x0, min(height, (b + 1) * tile) - y0, min(width, (r + 1) * tile) - x0))
+    return _expand_to_regions(_merge_rects(rects), height, width, prior_table)
+
+
+def _expand_to_regions(rects, height, width, prior_table):
+    """Grows every rectangle over the (non-joint) prior regions it cuts, until stable."""
+    if rects and prior_table is not None and prior_table.size:
+        regions = prior_table[~prior_table["is_joint"]]
+        tops, lefts = regions["min_row"], regions["min_col"]
+        bottoms, rights = regions["max_row"], regions["max_col"]
+        while True:
+            expanded = []
+            for rect in rects:
+                cut = _overlaps(rect, tops, lefts, bottoms, rights)
+                t, l, h, w = rect
+                if cut.any():
+                    y0 = max(0, min(t, int(tops[cut].min())))
+                    x0 = max(0, min(l, int(lefts[cut].min())))
+                    y1 = min(height, max(t + h, int(bottoms[cut].max()) + 1))
+                    x1 = min(width, max(l + w, int(rights[cut].max()) + 1))
+                    rect = (y0, x0, y1 - y0, x1 - x0)
+                expanded.append(rect)
+            expanded = _merge_rects(expanded)
+            if expanded == rects:
+                break
+            rects = expanded
+    return rects
+
+
+def _defect_rows(table):
+    return table["counted"] & (table["defect"] != DEFECT_CODES["NORMAL"])
+
+
+def analyze_change(pixels, width, height, pipe_id, prior_map, prior_table, thresholds=None,
+                   min_correlation=CHANGE_MIN_CORRELATION, tile=CHANGE_TILE, **analysis_options):
+    """
+    Analysis of a repeat inspection against the prior one of the same pipe.
+    analysis_options: passed to process_image_logic (workers, low_memory, ...).
+
+    Returns a process_image_logic-style result (region table = kept prior
+    regions + re-analyzed regions, frame coordinates) plus:
+        "change_status": status of every region row ("new" / "grown" /
+                         "unchanged" for defects, "" for the rest)
+        "change": {"registered", "offset", "correlation", "analyzed_fraction",
+                   "new", "grown", "unchanged", "resolved"}
+    If the new image does not register to the prior (other size / view),
+    the full analysis runs and "change" reports "registered": False.
+    """
+    pixels = as_pixel_array(pixels)
+    prior_map = np.asarray(prior_map)
+    dark_limit = frame_dark_limit(pixels, width, height)
+    new_map = rgb_to_binary_map_compact(pixels, width, height, dark_limit=dark_limit)
+
+    registration = register_masks(prior_map, new_map)
+    if registration is None or registration[2] < min_correlation:
+        result = process_image_logic(pixels, width, height, pipe_id, thresholds, **analysis_options)
+        result["change_status"] = [""] * len(result["region_table"])
+        result["change"] = {
+            "registered": False,
+            "correlation": None if registration is None else round(registration[2], 3),
+            "analyzed_fraction": 1.0,
+        }
+        return result
+    dy, dx, correlation = registration
+
+    # Prior regions in new-frame coordinates, classified with today's thresholds
+    prior = classify_region_table(shift_region_table(prior_table, -dy, -dx), thresholds)
+    changed = changed_tiles(prior_map, new_map, dy, dx, tile)
+    rects = change_rects(changed, tile, height, width, prior, new_area_rects(height, width, dy, dx))
+    # Crops covering most of the frame (e.g. grown over large prior regions): one full analysis is cheaper
+    whole_frame = sum(h * w for _, _, h, w in rects) > CHANGE_MAX_FRACTION * width * height
+    if whole_frame:
+        rects = [(0, 0, height, width)]
+
+    parts = []
+    for top, left, h, w in rects:
+        part = pixels[top:top + h, left:left + w]
+        part_result = process_image_logic(part, w, h, pipe_id, thresholds, trusted=True, dark_limit=dark_limit,
+                                          **analysis_options)
+        parts.append(((top, left, h, w), part_result))
+
+    # Prior regions untouched by the re-analysis are kept
+    dropped = np.zeros(len(prior), dtype=bool)
+    for rect, _ in parts:
+        dropped |= _overlaps(rect, prior["min_row"], prior["min_col"], prior["max_row"], prior["max_col"])
+    inside = (prior["min_row"] >= 0) & (prior["min_col"] >= 0) & (prior["max_row"] < height) & (prior["max_col"] < width)
+    kept = prior[~dropped & inside]
+    replaced = prior[dropped & _defect_rows(prior)]
+
+    fresh = [shift_region_table(res["region_table"], top, left) for (top, left, _, _), res in parts]
+    fresh = np.concatenate(fresh) if fresh else empty_region_table()
+    # A crop only sees part of a full-span pipe joint / edge band, so the piece
+    # no longer looks like a joint: pieces inside a prior joint stay joints
+    joints = prior[prior["is_joint"]] if not whole_frame else prior[:0]
+    for joint in joints:
+        inside_joint = (fresh["min_row"] >= joint["min_row"] - tile) & (fresh["max_row"] <= joint["max_row"] + tile) \
+            & (fresh["min_col"] >= joint["min_col"] - tile) & (fresh["max_col"] <= joint["max_col"] + tile)
+        fresh["is_joint"] |= inside_joint
+    if joints.size:
+        classify_region_table(fresh, thresholds)
+    table = np.concatenate([kept, fresh])
+
+    # Status: compare every re-analyzed defect with the prior defects it overlaps
+    status = np.where(_defect_rows(kept), "unchanged", "").tolist()
+    matched = np.zeros(len(replaced), dtype=bool)
+    for row, is_defect in zip(fresh, _defect_rows(fresh)):
+        if not is_defect:
+            status.append("")
+            continue
+        box = (int(row["min_row"]), int(row["min_col"]),
+               int(row["max_row"] - row["min_row"]) + 1, int(row["max_col"] - row["min_col"]) + 1)
+        hit = _overlaps(box, replaced["min_row"], replaced["min_col"], replaced["max_row"], replaced["max_col"])
+        matched |= hit
+        if not hit.any():
+            status.append("new")
+        elif row["area"] > replaced["area"][hit].sum() * (1 + CHANGE_GROWTH):
+            status.append("grown")
+        else:
+            status.append("unchanged")
+
+    analyzed = sum(h * w for h, w in ((rect[2], rect[3]) for rect, _ in parts))
+    outside = np.ones((height, width), dtype=bool)
+    for (top, left, h, w), _ in parts:
+        outside[top:top + h, left:left + w] = False
+    suspicious_pixels = int(np.count_nonzero(new_map[outside])) + sum(res["suspicious_pixels"] for _, res in parts)
+
+    total_pixels = width * height
+    defect_counts, max_defect_area, sample_coords = count_defects(table)
+    final_defect, explanation, affected_percentage, priority_score = global_consistency(
+        defect_counts, max_defect_area, suspicious_pixels, total_pixels, thresholds
+    )
+    counts = {name: status.count(name) for name in CHANGE_STATUSES}
+    counts["resolved"] = int(np.count_nonzero(~matched))
+    explanation = (f"{explanation} (Change vs prior: {counts['new']} new, {counts['grown']} grown, "
+                   f"{counts['unchanged']} unchanged, {counts['resolved']} resolved; "
+                   f"re-analyzed {analyzed / total_pixels * 100:.0f}% of frame.)")
+
+    # 20 x 50 binary sample around the most significant defect
+    sr, sc = sample_coords if sample_coords is not None else (height // 2, width // 2)
+    sr, sc = min(max(0, sr - 10), max(0, height - 20)), min(max(0, sc - 25), max(0, width - 50))
+    binary_sample = new_map[sr:sr + 20, sc:sc + 50].tolist()
+
+    return {
+        "final_defect": final_defect,
+        "explanation": explanation,
+        "binary_sample": binary_sample,
+        "total_pixels": total_pixels,
+        "suspicious_pixels": suspicious_pixels,
+        "affected_percentage": affected_percentage,
+        "priority_score": priority_score,
+        "region_table": table,
+        "change_status": status,
+        "change": {
+            "registered": True,
+            "offset": (int(dy), int(dx)),
+            "correlation": round(correlation, 3),
+            "analyzed_fraction": round(analyzed / total_pixels, 3),
+            **counts,
+        },
+    }
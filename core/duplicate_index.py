@@ -0,0 +1,92 @@
+import numpy as np
+
+# =========================================================
+# NEAR-DUPLICATE DETECTION (Perceptual Hash + BK-Tree)
+# =========================================================
+# dHash: shrink to a tiny 9x8 grayscale grid and store whether each cell is
+# brighter than its right neighbor -> 64-bit fingerprint. Re-uploads of the
+# same shot (also with another exposure) differ in only a few bits. On walls
+# with little structure along a row (plain pipe surface) the bits follow the
+# sensor noise, so shifted or re-encoded shots of those are usually not matched.
+# BK-Tree: metric tree over Hamming distance, so a "within k bits" lookup
+# only visits a small part of the index instead of every stored hash.
+
+HASH_ROWS, HASH_COLS = 8, 9
+
+
+def perceptual_hash(pixels):
+    """64-bit difference hash of an (H, W, 3) uint8 image (Python int)."""
+    height, width = pixels.shape[:2]
+
+    # Strided subsample first, so big frames cost the same as small ones
+    step_r = max(1, height // (HASH_ROWS * 8))
+    step_c = max(1, width // (HASH_COLS * 8))
+    small = pixels[::step_r, ::step_c, :3].astype(np.float32).mean(axis=2)
+
+    # Block average down to HASH_ROWS x HASH_COLS
+    h, w = small.shape
+    row_edges = np.linspace(0, h, HASH_ROWS + 1).astype(int)
+    col_edges = np.linspace(0, w, HASH_COLS + 1).astype(int)
+    row_means = np.add.reduceat(small, row_edges[:-1], axis=0) / np.diff(row_edges)[:, None]
+    grid = np.add.reduceat(row_means, col_edges[:-1], axis=1) / np.diff(col_edges)[None, :]
+
+    bits = (grid[:, :-1] > grid[:, 1:]).ravel()
+    value = 0
+    for bit in bits:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def hamming_distance(a, b):
+    return bin(a ^ b).count("1")
+
+
+class DuplicateIndex:
+    """
+    BK-Tree of perceptual hashes -> stored item (e.g. the index of a result).
+
+    add(hash, item)
+    find(hash, max_distance) -> (item, distance) of the closest match, or None
+    """
+
+    def __init__(self):
+        self.root = None   # [hash, item, {distance: child_node}]
+        self.size = 0
+        self.lookups = 0
+        self.duplicates = 0
+
+    def add(self, image_hash, item):
+        self.size += 1
+        node = [image_hash, item, {}]
+        if self.root is None:
+            self.root = node
+            return
+        current = self.root
+        while True:
+            d = hamming_distance(image_hash, current[0])
+            child = current[2].get(d)
+            if child is None:
+                current[2][d] = node
+                return
+            current = child
+
+    def find(self, image_hash, max_distance):
+        self.lookups += 1
+        best = None
+        if self.root is not None:
+            stack = [self.root]
+            while stack:
+                node = stack.pop()
+                d = hamming_distance(image_hash, node[0])
+                if d <= max_distance and (best is None or d < best[1]):
+                    best = (node[1], d)
+                # Triangle inequality: only children with |k - d| <= max_distance can match
+                for k, child in node[2].items():
+                    if d - max_distance <= k <= d + max_distance:
+                        stack.append(child)
+        if best is not None:
+            self.duplicates += 1
+        return best
+
+    def duplicate_rate(self):
+        return self.duplicates / self.lookups if self.lookups else 0.0
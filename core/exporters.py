@@ -0,0 +1,254 @@
+import base64
+import csv
+import io
+import json
+import os
+import zlib
+
+import numpy as np
+
+from core.region_table import REGION_DTYPE
+from core.serialization import result_to_dict
+
+# =========================================================
+# STREAMING EXPORTERS (JSONL / CSV)
+# =========================================================
+# Each result is appended (and flushed) as soon as it is written, nothing is
+# kept in memory except the keys already exported, so a 100k-image batch
+# needs the same memory as a 10-image one.
+#
+# Resumable: re-opening an existing export drops a torn last line (crash in
+# the middle of a write), reads back the exported keys and skips them:
+#     with JsonlExporter("results.jsonl") as out:
+#         for key, path in batch:
+#             if key in out: continue
+#             out.write(key, process_image_logic(...))
+
+SUMMARY_FIELDS = [
+    "key", "pipe_id", "file_name", "final_defect", "affected_percentage", "priority_score",
+    "suspicious_pixels", "total_pixels", "decode_time", "analysis_time", "explanation",
+]
+REGION_FIELDS = ["key"] + list(REGION_DTYPE.names)
+
+
+def encode_mask(binary_map):
+    """
+    Compact binary mask: 1 bit per pixel (np.packbits), zlib, base64.
+    A 12 MP mask is 1.5 MB packed and usually a few KB after zlib.
+    """
+    binary_map = np.asarray(binary_map, dtype=np.uint8)
+    packed = zlib.compress(np.packbits(binary_map != 0).tobytes(), 6)
+    return {
+        "shape": list(binary_map.shape),
+        "encoding": "packbits+zlib+base64",
+        "data": base64.b64encode(packed).decode("ascii"),
+    }
+
+
+def decode_mask(encoded):
+    """Inverse of encode_mask: (H, W) uint8 array of 0/1."""
+    height, width = encoded["shape"]
+    packed = np.frombuffer(zlib.decompress(base64.b64decode(encoded["data"])), dtype=np.uint8)
+    return np.unpackbits(packed, count=height * width).reshape(height, width)
+
+
+def export_record(result, include_regions=False, include_mask=False):
+    """
+    JSON-ready record of one result, without pixel data.
+    The mask comes from result["mask"] (already encoded, e.g. by a worker
+    process) or result["binary_map"] (process_image_logic(..., return_mask=True)).
+    """
+    record = result_to_dict(result, include_regions=include_regions, include_sample=False)
+    if include_mask:
+        mask = result.get("mask")
+        if mask is None and result.get("binary_map") is not None:
+            mask = encode_mask(result["binary_map"])
+        record["mask"] = mask
+    return record
+
+
+def recover_lines(path, key_of_line):
+    """
+    Truncates a torn last line and returns the keys of the complete lines.
+    key_of_line(bytes) -> key, or None for lines without one (CSV header).
+    """
+    keys = set()
+    if not os.path.exists(path):
+        return keys
+    good_end = 0
+    with open(path, "rb") as f:
+        offset = 0
+        for line in f:
+            offset += len(line)
+            if not line.endswith(b"\n"):
+                break # Torn last line
+            try:
+                key = key_of_line(line)
+            except ValueError:
+                break # Partially written / corrupt record: redo from here
+            if key is not None:
+                keys.add(key)
+            good_end = offset
+    if good_end < os.path.getsize(path):
+        with open(path, "r+b") as f:
+            f.truncate(good_end)
+    return keys
+
+
+class _StreamingExporter:
+    """
+    path: output file (appended to if it exists)
+    include_regions: export the region table of every result
+    include_mask: export the compact binary mask (see encode_mask)
+    sync_every: fsync after this many records (1 = every record)
+    """
+
+    def __init__(self, path, include_regions=False, include_mask=False, sync_every=1):
+        self.path = path
+        self.include_regions = include_regions
+        self.include_mask = include_mask
+        self.sync_every = max(1, sync_every)
+        self.written = 0
+        self.done = self._recover()
+        self.file = open(path, "a", encoding="utf-8", newline="")
+
+    def __contains__(self, key):
+        return str(key) in self.done
+
+    def __len__(self):
+        return len(self.done)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    def write(self, key, result):
+        """Appends one result. Returns False (and writes nothing) if key was already exported."""
+        key = str(key)
+        if key in self.done:
+            return False
+        record = export_record(result, self.include_regions, self.include_mask)
+        self._write(key, record)
+        self.done.add(key)
+        self.written += 1
+        if self.written % self.sync_every == 0:
+            self.sync()
+        return True
+
+    def sync(self):
+        self.file.flush()
+        os.fsync(self.file.fileno())
+
+    def close(self):
+        if not self.file.closed:
+            self.sync()
+            self.file.close()
+
+
+class JsonlExporter(_StreamingExporter):
+    """One JSON object per line: {"key": ..., <summary>, "regions": [...], "mask": {...}}."""
+
+    def _recover(self):
+        return recover_lines(self.path, lambda line: str(json.loads(line)["key"]))
+
+    def _write(self, key, record):
+        self.file.write(json.dumps({"key": key, **record}) + "\n")
+        self.file.flush()
+
+
+def _csv_line(fields, row):
+    buffer = io.StringIO()
+    csv.DictWriter(buffer, fields, extrasaction="ignore", lineterminator="\n").writerow(row)
+    return buffer.getvalue()
+
+
+def _csv_key(line, header):
+    text = line.decode("utf-8")
+    if text.rstrip("\n") == header:
+        return None
+    row = next(csv.reader([text]))
+    if not row:
+        raise ValueError("Empty CSV row")
+    return row[0]
+
+
+class CsvExporter(_StreamingExporter):
+    """
+    One summary row per result (SUMMARY_FIELDS, plus "mask" if include_mask).
+    With include_regions, region rows go to a second CSV (regions_path,
+    default <path>_regions.csv), one row per region, joined on "key".
+    """
+
+    def __init__(self, path, include_regions=False, include_mask=False, sync_every=1, regions_path=None):
+        self.fields = SUMMARY_FIELDS + (["mask"] if include_mask else [])
+        self.regions_path = None
+        self.regions_file = None
+        if include_regions:
+            self.regions_path = regions_path or os.path.splitext(path)[0] + "_regions.csv"
+        super().__init__(path, include_regions, include_mask, sync_every)
+
+        if os.path.getsize(path) == 0:
+            self.file.write(",".join(self.fields) + "\n")
+        if self.regions_path:
+            self.regions_file = open(self.regions_path, "a", encoding="utf-8", newline="")
+            if os.path.getsize(self.regions_path) == 0:
+                self.regions_file.write(",".join(REGION_FIELDS) + "\n")
+
+    def _recover(self):
+        header = ",".join(self.fields)
+        done = recover_lines(self.path, lambda line: _csv_key(line, header))
+        if self.regions_path and os.path.exists(self.regions_path):
+            self._drop_orphan_regions(done)
+        return done
+
+    def _drop_orphan_regions(self, done):
+        # Region rows are written before their summary row, so after a crash
+        # the tail may hold regions of a result that was never finished
+        header = ",".join(REGION_FIELDS)
+        good_end = 0
+        with open(self.regions_path, "rb") as f:
+            offset = 0
+            for line in f:
+                offset += len(line)
+                try:
+                    key = _csv_key(line, header) if line.endswith(b"\n") else None
+                except ValueError:
+                    break
+                if line.endswith(b"\n") and (key is None or key in done):
+                    good_end = offset
+        if good_end < os.path.getsize(self.regions_path):
+            with open(self.regions_path, "r+b") as f:
+                f.truncate(good_end)
+
+    def _write(self, key, record):
+        if self.regions_file is not None:
+            for region in record.pop("regions", []):
+                self.regions_file.write(_csv_line(REGION_FIELDS, {"key": key, **region}))
+            self.regions_file.flush()
+        row = {"key": key, **record}
+        if row.get("mask"):
+            mask = row["mask"]
+            row["mask"] = f"{mask['shape'][0]}x{mask['shape'][1]}:{mask['data']}"
+        self.file.write(_csv_line(self.fields, row))
+        self.file.flush()
+
+    def sync(self):
+        if self.regions_file is not None and not self.regions_file.closed:
+            self.regions_file.flush()
+            os.fsync(self.regions_file.fileno())
+        super().sync()
+
+    def close(self):
+        super().close() # syncs both files
+        if self.regions_file is not None and not self.regions_file.closed:
+            self.regions_file.close()
+
+
+def open_exporter(path, include_regions=False, include_mask=False, sync_every=1):
+    """JsonlExporter or CsvExporter, by file extension (.jsonl / .csv)."""
+    if path.lower().endswith(".csv"):
+        return CsvExporter(path, include_regions, include_mask, sync_every)
+    return JsonlExporter(path, include_regions, include_mask, sync_every)
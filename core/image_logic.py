@@ -1,14 +1,25 @@
-from defect_detection import rgb_to_binary_map, detect_linear_crack
-from region_analysis import dfs
-from classification import classify_region
+from defect_detection import rgb_to_binary_map, rgb_to_binary_map_compact, detect_linear_crack, band_rows_for
+from region_analysis import dfs, dfs_compact
+from classification import DEFECT_CODES, resolve_thresholds
 from severity_priority import add_to_priority
 from core.validity_check import is_valid_pipe
 from core.roi_extraction import extract_pipe_roi
+from core.region_table import analyzed_area, build_region_table, empty_region_table, classify_region_table
+from core.band_labeling import thread_pool, band_rows_for_workers, region_features
+from core.skeleton import measure_cracks
+from core.band_labeling import estimate_region_count
+from core.analysis_config import resolve_config, pyramid_factor, pyramid_level
+from core.budget import (ImageBudget, CHECK_EVERY, block_downsample, downsample_factor,
+                         upscale_result, describe, deferred_result)
+from input_module import as_pixel_array
 # from classification import classify_defect # Removed invalid import
 import heapq
 import numpy as np
 
-def process_image_logic(pixels, width, height, pipe_id):
+def process_image_logic(pixels, width, height, pipe_id, thresholds=None, trusted=False,
+                        low_memory=False, profiler=None, workers=1, return_mask=False,
+                        time_budget=None, max_regions=None, degrade=None, stages=None, config=None,
+                        dark_limit=None):
     """
     Orchestrates the entire Image Processing Pipeline (DSA Style).
     Steps:
@@ -17,10 +28,74 @@ def process_image_logic(pixels, width, height, pipe_id):
     3. Defect Detection - Global Thresholding / Morphology.
     4. Region Analysis - DFS for Connected Components.
     5. Priority Queue - Rank defects.
+
+    Besides the summary fields, the result carries "region_table":
+    a structured array (core.region_table.REGION_DTYPE) with one row per region.
+
+    pixels may be any (H, W, 3) uint8 array, including a memory-mapped frame
+    from input_module.open_frame, used as a zero-copy view: no in-memory copy
+    of the frame is made, the file pages are read as the stages sweep them.
+    Other dtypes must hold 8-bit values (input_module.as_pixel_array).
+
+    thresholds: optional overrides of config.CLASSIFY_THRESHOLDS.
+    trusted: skip the ROI + validity checks, for partial views of a surface
+        that was already validated (e.g. the new strip of an overlapping frame).
+    low_memory: keep every full-frame buffer in uint8/bool (binary map, visited),
+        compute whole-image statistics in row bands and free each stage's
+        buffers as soon as it is done. Same result, lower peak memory.
+    profiler: optional core.memory_profile.StageMemoryProfiler; mark(stage)
+        is called after every stage.
+    workers: > 1 splits the per-pixel and per-region work of ONE image over a
+        thread pool: edge map, thresholding and connected components run on
+        row bands (core.band_labeling), region gradients run per region.
+        Same result; lowers single-image latency on multi-core hosts.
+    return_mask: also return the full binary defect map as "binary_map"
+        ((H, W) uint8 array, valid images only), e.g. for export.
+    time_budget / max_regions: per-image guard (core.budget), seconds of
+        analysis and regions per image; None = config.IMAGE_TIME_BUDGET /
+        config.MAX_REGIONS, 0 = unlimited.
+    degrade: what to do past a limit, "downsample" | "partial" | "offline"
+        (None = config.DEGRADE_ACTION). A degraded result carries
+        "degraded" = {"reason", "action", ...}; "offline" gives DEFERRED.
+        The time budget can only stop the region walk early (partial), or
+        defer the image when degrade == "offline".
+    stages: frame-level stages already computed for a stack of same-sized
+        frames (core.batch.frame_stages): {"roi", "binary_map", "statistics"}.
+        Only the region stage runs here (band labeling, like workers > 1).
+    config: speed / quality knobs, a preset name ("fast", "balanced",
+        "thorough"), a dict or a core.analysis_config.AnalysisConfig
+        (None = config.DEFAULT_PRESET). See config.ANALYSIS_PRESETS.
+    dark_limit: dark-anomaly threshold of the binary map
+        (defect_detection.frame_dark_limit) instead of this image's own.
+        Crops of a frame (trusted strips / tiles) pass the whole frame's,
+        so they get the same binary map as the full analysis.
     """
+    budget = ImageBudget(time_budget, max_regions, degrade)
+    config = resolve_config(config)
+    pixels = as_pixel_array(pixels)
+
+    # Pyramid level: the whole analysis runs on a decimated copy
+    factor = pyramid_factor(config, width, height)
+    if factor > 1 and stages is None:
+        result = _downsampled_result(pyramid_level(pixels, factor), width, height, pipe_id, thresholds, factor,
+                                     trusted=trusted, low_memory=low_memory, profiler=profiler, workers=workers,
+                                     return_mask=return_mask, time_budget=time_budget, max_regions=max_regions,
+                                     degrade=degrade, config=config.replace(pyramid_levels=0),
+                                     dark_limit=dark_limit)
+        result["pyramid_factor"] = factor
+        return result
+    pool = thread_pool(workers) if workers > 1 else None
+    band_rows = band_rows_for_workers(height, workers) if pool else None
     
     # 1. ROI EXTRACTION (NEW: Look for Pipe First)
-    roi_mask, is_valid_roi, roi_reason = extract_pipe_roi(pixels, width, height)
+    if trusted:
+        roi_mask, is_valid_roi, roi_reason = None, True, "Trusted input (already validated)."
+    elif stages is not None:
+        roi_mask, is_valid_roi, roi_reason = stages["roi"]
+    else:
+        roi_mask, is_valid_roi, roi_reason = extract_pipe_roi(pixels, width, height, low_memory, pool, band_rows,
+                                                              config.roi_stride)
+    if profiler: profiler.mark("roi_extraction")
     
     if not is_valid_roi:
          return {
@@ -29,17 +104,33 @@ def process_image_logic(pixels, width, height, pipe_id):
             "binary_sample": np.zeros((20, 40), dtype=np.uint8), # Empty
             "total_pixels": width * height,
             "suspicious_pixels": 0,
-            "affected_percentage": 0.0
+            "affected_percentage": 0.0,
+            "region_table": empty_region_table()
         }
         
     # 2. VALIDITY CHECK (Structure/Texture)
     # We pass the original pixels, but ideally we should only check inside ROI.
     # For now, since ROI validation passed, we assume the image IS the pipe.
     # We need a preliminary binary map for validity
-    binary_map = rgb_to_binary_map(pixels, width, height)
-    binary_map_np = np.array(binary_map) # For slicing
+    if stages is not None:
+        binary_map = binary_map_np = stages["binary_map"]
+    elif low_memory or pool:
+        binary_map = rgb_to_binary_map_compact(pixels, width, height, band_rows, pool,
+                                               lookup=not low_memory, dark_limit=dark_limit) # uint8 array
+        binary_map_np = binary_map
+    else:
+        binary_map = rgb_to_binary_map(pixels, width, height, dark_limit)
+        binary_map_np = np.array(binary_map) # For slicing
+    if profiler: profiler.mark("binary_map")
     
-    is_valid, reason = is_valid_pipe(pixels, width, height, binary_map, trust_roi=is_valid_roi)
+    if trusted:
+        is_valid, reason = True, roi_reason
+    else:
+        is_valid, reason = is_valid_pipe(pixels, width, height, binary_map, trust_roi=is_valid_roi,
+                                        low_memory=low_memory or pool is not None,
+                                        stats=stages["statistics"] if stages is not None else None,
+                                        edge_stride=config.edge_stride)
+    if profiler: profiler.mark("validity")
     
     if not is_valid:
          return {
@@ -48,150 +139,136 @@ def process_image_logic(pixels, width, height, pipe_id):
             "binary_sample": [[0]*20 for _ in range(10)], # Empty placeholder
             "total_pixels": width * height,
             "suspicious_pixels": 0,
-            "affected_percentage": 0.0
+            "affected_percentage": 0.0,
+            "region_table": empty_region_table()
         }
 
+    # Region ceiling: a region has >= 1 pixel, so only count (root runs) when it could be exceeded
+    region_limit = None
+    degraded = None
+    if budget.max_regions and np.count_nonzero(binary_map_np) > budget.max_regions:
+        estimate = estimate_region_count(binary_map_np, pool)
+        if budget.over_region_limit(estimate):
+            degraded = {"reason": "region_limit", "regions_estimate": estimate, "max_regions": budget.max_regions}
+            if budget.action == "offline":
+                degraded["action"] = "offline"
+                return deferred_result(degraded, int(np.count_nonzero(binary_map_np)), width * height)
+            if budget.action == "downsample":
+                factor = downsample_factor(estimate, budget.max_regions)
+                degraded.update(action="downsampled", factor=factor)
+                # Already validated, so trusted. A copy that still exceeds the
+                # limits is cut short (partial), never downsampled again.
+                result = _downsampled_result(block_downsample(pixels, factor), width, height, pipe_id,
+                                             thresholds, factor, trusted=True,
+                                             low_memory=low_memory, workers=workers, return_mask=return_mask,
+                                             time_budget=budget.remaining() or 0, max_regions=budget.max_regions,
+                                             degrade="partial", config=config, dark_limit=dark_limit)
+                if "degraded" in result:
+                    degraded["followed_by"] = result["degraded"]
+                result["degraded"] = degraded
+                result["explanation"] = f"{result['explanation']} {describe(degraded)}"
+                return result
+            region_limit = budget.max_regions
+            degraded["action"] = "partial"
+
     # ======================================================
     # 1️⃣ REGION ANALYSIS & CLASSIFICATION (MULTI-STAGE)
     # ======================================================
-    visited = [[False]*width for _ in range(height)]
-
     total_length = 0
     regions_count = 0
     suspicious_pixels = 0
     
-    defect_counts = {"CRACK": 0, "CORROSION": 0, "DAMP": 0, "NORMAL": 0}
-    max_defect_area = 0
-    
     # Tracking for UI Sample
-    best_defect_score = -1 # Normal=0, Damp=1, Corr=2, Crack=3
     best_sample_coords = (height//2, width//2) # Default center
 
-    for r in range(height):
-        for c in range(width):
-            if binary_map[r][c] == 1 and not visited[r][c]:
-                # DSA: Extract Region (Connected Components)
-                area, length, avg_color, mi, mj, Ma, Mb, rectangularity = dfs(
-                    binary_map, pixels, visited, r, c, height, width
-                )
+    # Per-region rows for the structured region table
+    region_rows = []
 
-                suspicious_pixels += area
-                regions_count += 1
-                total_length += length
-                
-                # DSA: Classify Region (Geometry > Color)
-                bbox_w = (Mb - mj) + 1
-                bbox_h = (Ma - mi) + 1
-                
-                # NEW: Calculate Edge Softness / Gradient Magnitude for this region
-                # helps distinguish Sharp Crack vs Soft Damp
-                
-                # 1. Extract ROI with Context (Margin=2)
-                # We need context to see the edge contrast!
-                margin = 2
-                mi_p = max(0, mi - margin)
-                Ma_p = min(height, Ma + margin + 1) # +1 for slice exclusive
-                mj_p = max(0, mj - margin)
-                Mb_p = min(width, Mb + margin + 1)
-                
-                roi_pixels = pixels[mi_p:Ma_p, mj_p:Mb_p]
-                
-                avg_gradient = 0
-                if roi_pixels.shape[0] > 1 and roi_pixels.shape[1] > 1:
-                     try:
-                        roi_gray = np.mean(roi_pixels, axis=2)
-                        gy, gx = np.gradient(roi_gray)
-                        grad_mag = np.sqrt(gx**2 + gy**2)
-                        
-                        # We want the gradient ON THE DEFECT pixels.
-                        # We need the mask aligned with this expanded ROI.
-                        roi_mask_full = binary_map_np[mi_p:Ma_p, mj_p:Mb_p]
-                        
-                        defect_grads = grad_mag[roi_mask_full == 1]
-                        
-                        if defect_grads.size > 0:
-                            avg_gradient = np.max(defect_grads)
-                            
-                     except ValueError:
-                        pass # Dimensions too small
-
-                # 3. Check for PIPE JOINT (Full span straight line)
-                # If Rectangularity > 0.75 AND it spans > 80% of width or height
-                is_full_span = (bbox_w > width * 0.8) or (bbox_h > height * 0.8)
-                if rectangularity > 0.75 and is_full_span:
-                     # Skip classification, count as Normal/Structure
-                     # Do not increment defect_counts
-                     continue
-                
-                local_defect = classify_region(area, bbox_w, bbox_h, avg_color, rectangularity, avg_gradient)
-                if area > 50: # Ignore noise specs (was 10, now 50 for Normal Pipe robustness)
-                    defect_counts[local_defect] += 1
-                    max_defect_area = max(max_defect_area, area)
-                    
-                    # Update Best Sample Coords
-                    current_score = 0
-                    if local_defect == "CRACK": current_score = 3
-                    elif local_defect == "CORROSION": current_score = 2
-                    elif local_defect == "DAMP": current_score = 1
-                    
-                    # Center of Bounding Box
-                    center_r = mi + bbox_h // 2
-                    center_c = mj + bbox_w // 2
+    gradients = None
+    if pool or stages is not None:
+        regions = region_features(binary_map, pixels, pool, band_rows or band_rows_for(height))
+        if region_limit:
+            regions = regions[:region_limit]
+        # Per-region gradients in parallel (one bounding box per task)
+        gradients = list((pool.map if pool else map)(
+            lambda reg: region_max_gradient(pixels, binary_map_np, *reg[3:7], height, width, low_memory)
+                        if reg[0] > config.gradient_min_area else 0,
+            regions
+        ))
+    elif low_memory:
+        regions = iter_regions_compact(binary_map, pixels, height, width)
+    else:
+        regions = iter_regions(binary_map, pixels, height, width)
 
-                    if current_score > best_defect_score:
-                        best_defect_score = current_score
-                        best_sample_coords = (center_r, center_c)
-                        
-                    elif current_score == best_defect_score and area > max_defect_area:
-                         best_sample_coords = (center_r, center_c)
+    for area, length, avg_color, mi, mj, Ma, Mb, rectangularity, centroid in regions:
+        if region_limit and regions_count == region_limit:
+            break
+        # Time budget: stop the walk early (a clock read every CHECK_EVERY regions)
+        if regions_count % CHECK_EVERY == 0 and regions_count and budget.expired():
+            degraded = {"reason": "time_budget", "budget_seconds": budget.seconds}
+            if budget.action == "offline":
+                degraded["action"] = "offline"
+                return deferred_result(degraded, int(np.count_nonzero(binary_map_np)), width * height)
+            degraded["action"] = "partial"
+            region_limit = regions_count
+            break
+        suspicious_pixels += area
+        regions_count += 1
+        total_length += length
+        
+        # DSA: Classify Region (Geometry > Color)
+        bbox_w = (Mb - mj) + 1
+        bbox_h = (Ma - mi) + 1
+        
+        # NEW: Calculate Edge Softness / Gradient Magnitude for this region
+        # helps distinguish Sharp Crack vs Soft Damp
+        if gradients is not None:
+            avg_gradient = gradients[regions_count - 1]
+        elif area <= config.gradient_min_area:
+            avg_gradient = 0 # min-area prefilter (preset)
+        else:
+            avg_gradient = region_max_gradient(pixels, binary_map_np, mi, mj, Ma, Mb, height, width, low_memory)
+
+        # 3. Check for PIPE JOINT (Full span straight line)
+        # If Rectangularity > 0.75 AND it spans > 80% of width or height
+        # Joints skip classification, count as Normal/Structure
+        is_full_span = (bbox_w > width * 0.8) or (bbox_h > height * 0.8)
+        is_joint = rectangularity > 0.75 and is_full_span
+
+        # Class + counted flag are filled in below (one batch pass)
+        region_rows.append((
+            len(region_rows) + 1, area, mi, mj, Ma, Mb, centroid[0], centroid[1],
+            avg_color[0], avg_color[1], avg_color[2], rectangularity, avg_gradient,
+            length, DEFECT_CODES["NORMAL"], is_joint, False, 0.0, 0.0, 0, 1
+        ))
+
+    if profiler: profiler.mark("region_analysis")
 
+    # DSA: Classify ALL regions at once (Geometry > Color), vectorized
+    region_table = classify_region_table(build_region_table(region_rows), thresholds)
+    # Centerline length / width / branches of every crack (thinning on its bounding box only)
+    if config.crack_metrics:
+        unmeasured = measure_cracks(binary_map_np, region_table, budget)
+        if unmeasured:
+            # Regions are all classified already: keep them (partial), even for "offline"
+            degraded = degraded or {"reason": "time_budget", "budget_seconds": budget.seconds, "action": "partial"}
+            degraded["cracks_unmeasured"] = unmeasured
+    defect_counts, max_defect_area, sample_coords = count_defects(region_table)
+    if sample_coords is not None:
+        best_sample_coords = sample_coords
 
     # ======================================================
     # 2️⃣ GLOBAL CONSISTENCY CHECK
     # ======================================================
-    
-    final_defect = "HEALTHY"
-    explanation = "Healthy Pipe. No significant defects found."
     total_pixels = width * height
-    
-    # FILTER: NORMAL PIPE CHECK
-    # If total defect area is very small (< 1%) AND max defect blob is small (< 100 px),
-    # treat as Noise/Normal even if individual regions were classified.
-    # treat as Noise/Normal even if individual regions were classified.
-    if suspicious_pixels < total_pixels * 0.005 and max_defect_area < 50:
-         explanation = "Healthy Pipe. Minor anomalies (<0.5%) ignored as noise."
-         final_defect = "HEALTHY"
-    
-    # Priority Logic (Only if passed Normal Filter)
-    elif defect_counts["CRACK"] > 0:
-        final_defect = "CRACK"
-        explanation = f"CRACK Detected! Found {defect_counts['CRACK']} linear region(s). Geometry: High Aspect Ratio."
-        
-    elif defect_counts["CORROSION"] > 0:
-        final_defect = "CORROSION"
-        explanation = f"CORROSION Detected. Found {defect_counts['CORROSION']} irregular region(s). Geometry: High Solidity + Red/Brown Color."
-        
-    elif defect_counts["DAMP"] > 0:
-        final_defect = "DAMP"
-        explanation = f"DAMP Detected. Found {defect_counts['DAMP']} spread region(s). Geometry: Low Continuity + Dark/Desaturated."
-    
-    elif suspicious_pixels > 0:
-         explanation = "Minor anomalies detected but classified as Normal/Noise."
-
-    total_pixels = width * height
-    affected_percentage = round((suspicious_pixels / total_pixels) * 100, 2)
+    final_defect, explanation, affected_percentage, full_priority_score = global_consistency(
+        defect_counts, max_defect_area, suspicious_pixels, total_pixels, thresholds
+    )
+    if degraded is not None:
+        degraded["regions_analyzed"] = regions_count
+        explanation = f"{explanation} {describe(degraded)}"
+    if profiler: profiler.mark("classification")
 
-    # Priority Logic (Only if passed Normal Filter)
-    # Severity Score: Crack=3, Corrosion=2, Damp=1. 
-    severity_score = 0
-    if final_defect == "CRACK": severity_score = 3
-    elif final_defect == "CORROSION": severity_score = 2
-    elif final_defect == "DAMP": severity_score = 1
-    
-    # We augment score with affected % for tie-breaking
-    # Format: 300XX (Score 3, XX%)
-    full_priority_score = (severity_score * 1000) + int(affected_percentage * 10)
-    
     # Return directly, no external side effect
     pass
 
@@ -210,7 +287,7 @@ def process_image_logic(pixels, width, height, pipe_id):
         best_score = 0
         
         # Search radius and stride
-        search_radius = 60
+        search_radius = config.sample_search
         stride = 20
         
         # Define window size
@@ -288,12 +365,239 @@ def process_image_logic(pixels, width, height, pipe_id):
     while len(binary_sample) < 20:
         binary_sample.append([0]*50)
 
-    return {
+    if profiler: profiler.mark("binary_sample")
+
+    result = {
         "final_defect": final_defect,
         "explanation": explanation,
         "binary_sample": binary_sample,
         "total_pixels": total_pixels,
         "suspicious_pixels": suspicious_pixels,
         "affected_percentage": affected_percentage,
-        "priority_score": full_priority_score
+        "priority_score": full_priority_score,
+        "region_table": region_table
+    }
+    if return_mask:
+        result["binary_map"] = binary_map_np.astype(np.uint8, copy=False)
+    if degraded is not None:
+        result["degraded"] = degraded
+    return result
+
+
+def _downsampled_result(small, width, height, pipe_id, thresholds, factor, **options):
+    """
+    process_image_logic on a copy reduced by `factor` (block_downsample or
+    pyramid_level), with counts, region table and mask mapped back to the
+    width x height frame.
+    """
+    small_height, small_width = small.shape[:2]
+    result = process_image_logic(small, small_width, small_height, pipe_id, thresholds, **options)
+    return upscaled_result(result, factor, width, height, thresholds)
+
+
+def upscaled_result(result, factor, width, height, thresholds=None):
+    """
+    upscale_result, then the image-level decision again from the full-frame
+    totals (the reduced copy drops partial border blocks, so its affected
+    share can differ). Region classes stay: areas are classified in analyzed
+    pixels (region_table.analyzed_area).
+    """
+    return reclassify_result(upscale_result(result, factor, width, height), thresholds)
+
+
+def iter_regions(binary_map, pixels, height, width):
+    """Yields dfs() results for every connected component, in scan order."""
+    visited = [[False]*width for _ in range(height)]
+    for r in range(height):
+        for c in range(width):
+            if binary_map[r][c] == 1 and not visited[r][c]:
+                # DSA: Extract Region (Connected Components)
+                yield dfs(binary_map, pixels, visited, r, c, height, width)
+
+
+def iter_regions_compact(binary_map, pixels, height, width):
+    """Low-memory iter_regions: uint8 map + bool visited, flat-index DFS."""
+    binary_flat = binary_map.ravel()
+    pixels_flat = pixels.reshape(-1, pixels.shape[2]) if pixels.flags["C_CONTIGUOUS"] else None
+    if pixels_flat is None:
+        pixels_flat = _RowMajorPixels(pixels, width)
+    visited_flat = np.zeros(height * width, dtype=bool)
+    for r in range(height):
+        # Only visit the 1-pixels of this row
+        for c in np.flatnonzero(binary_map[r]).tolist():
+            start = r * width + c
+            if not visited_flat[start]:
+                yield dfs_compact(binary_flat, pixels_flat, visited_flat, start, height, width)
+
+
+class _RowMajorPixels:
+    """Flat-index access to a non-contiguous (H, W, 3) view without copying it."""
+
+    def __init__(self, pixels, width):
+        self.pixels = pixels
+        self.width = width
+
+    def __getitem__(self, idx):
+        return self.pixels[idx // self.width, idx % self.width]
+
+
+def region_max_gradient(pixels, binary_map_np, mi, mj, Ma, Mb, height, width, low_memory=False):
+    """
+    Max gradient magnitude ON the defect pixels of a region's bounding box.
+    low_memory: same computation, done in row bands of the box (1-row halo)
+    so huge regions never allocate full-box float arrays.
+    """
+    # 1. Extract ROI with Context (Margin=2)
+    # We need context to see the edge contrast!
+    margin = 2
+    mi_p = max(0, mi - margin)
+    Ma_p = min(height, Ma + margin + 1) # +1 for slice exclusive
+    mj_p = max(0, mj - margin)
+    Mb_p = min(width, Mb + margin + 1)
+    
+    roi_pixels = pixels[mi_p:Ma_p, mj_p:Mb_p]
+    
+    avg_gradient = 0
+    if roi_pixels.shape[0] > 1 and roi_pixels.shape[1] > 1:
+         try:
+            roi_rows = roi_pixels.shape[0]
+            band_rows = band_rows_for(height) if low_memory else roi_rows
+            for top in range(0, roi_rows, band_rows):
+                bottom = min(roi_rows, top + band_rows)
+                halo_top = max(0, top - 1)
+                halo_bottom = min(roi_rows, bottom + 1)
+                roi_gray = np.mean(roi_pixels[halo_top:halo_bottom], axis=2)
+                gy, gx = np.gradient(roi_gray)
+                grad_mag = np.sqrt(gx**2 + gy**2)[top - halo_top:top - halo_top + (bottom - top)]
+                
+                # We want the gradient ON THE DEFECT pixels.
+                # We need the mask aligned with this expanded ROI.
+                roi_mask_full = binary_map_np[mi_p + top:mi_p + bottom, mj_p:Mb_p]
+                
+                defect_grads = grad_mag[roi_mask_full == 1]
+                
+                if defect_grads.size > 0:
+                    avg_gradient = max(avg_gradient, np.max(defect_grads))
+                    
+         except ValueError:
+            pass # Dimensions too small
+    return avg_gradient
+
+
+def count_defects(region_table):
+    """
+    Image-level tallies from the classified region table (counted regions only).
+    Returns: defect_counts, max_defect_area, best_sample_coords (None if nothing counted)
+    """
+    defect_counts = {"CRACK": 0, "CORROSION": 0, "DAMP": 0, "NORMAL": 0}
+    counted = region_table[region_table["counted"]]
+    if counted.size == 0:
+        return defect_counts, 0, None
+
+    codes = counted["defect"]
+    for name, code in DEFECT_CODES.items():
+        defect_counts[name] = int(np.count_nonzero(codes == code))
+    max_defect_area = analyzed_area(counted).max().item() # Compared with min_defect_area
+
+    # Best Sample Coords: first region (scan order) with the most severe class
+    # Score: Normal=0, Damp=1, Corr=2, Crack=3 (== class code)
+    best = counted[int(np.argmax(codes))]
+    bbox_h = int(best["max_row"] - best["min_row"]) + 1
+    bbox_w = int(best["max_col"] - best["min_col"]) + 1
+    # Center of Bounding Box
+    best_sample_coords = (int(best["min_row"]) + bbox_h // 2, int(best["min_col"]) + bbox_w // 2)
+    return defect_counts, max_defect_area, best_sample_coords
+
+
+def global_consistency(defect_counts, max_defect_area, suspicious_pixels, total_pixels, thresholds=None):
+    """
+    Image-level decision from the region tallies.
+    Returns: final_defect, explanation, affected_percentage, priority_score
+    """
+    t = resolve_thresholds(thresholds)
+
+    final_defect = "HEALTHY"
+    explanation = "Healthy Pipe. No significant defects found."
+
+    # FILTER: NORMAL PIPE CHECK
+    # If total defect area is very small (< 1%) AND max defect blob is small (< 100 px),
+    # treat as Noise/Normal even if individual regions were classified.
+    if suspicious_pixels < total_pixels * t["noise_fraction"] and max_defect_area < t["min_defect_area"]:
+         explanation = "Healthy Pipe. Minor anomalies (<0.5%) ignored as noise."
+         final_defect = "HEALTHY"
+    
+    # Priority Logic (Only if passed Normal Filter)
+    elif defect_counts["CRACK"] > 0:
+        final_defect = "CRACK"
+        explanation = f"CRACK Detected! Found {defect_counts['CRACK']} linear region(s). Geometry: High Aspect Ratio."
+        
+    elif defect_counts["CORROSION"] > 0:
+        final_defect = "CORROSION"
+        explanation = f"CORROSION Detected. Found {defect_counts['CORROSION']} irregular region(s). Geometry: High Solidity + Red/Brown Color."
+        
+    elif defect_counts["DAMP"] > 0:
+        final_defect = "DAMP"
+        explanation = f"DAMP Detected. Found {defect_counts['DAMP']} spread region(s). Geometry: Low Continuity + Dark/Desaturated."
+    
+    elif suspicious_pixels > 0:
+         explanation = "Minor anomalies detected but classified as Normal/Noise."
+
+    affected_percentage = round((suspicious_pixels / total_pixels) * 100, 2) if total_pixels > 0 else 0.0
+
+    # Priority Logic (Only if passed Normal Filter)
+    # Severity Score: Crack=3, Corrosion=2, Damp=1. 
+    severity_score = 0
+    if final_defect == "CRACK": severity_score = 3
+    elif final_defect == "CORROSION": severity_score = 2
+    elif final_defect == "DAMP": severity_score = 1
+    
+    # We augment score with affected % for tie-breaking
+    # Format: 300XX (Score 3, XX%)
+    full_priority_score = (severity_score * 1000) + int(affected_percentage * 10)
+    
+    return final_defect, explanation, affected_percentage, full_priority_score
+
+
+def reclassify_result(result, thresholds=None, binary_map=None):
+    """
+    Re-runs ONLY classification + the global consistency check on a previous
+    result, using its stored region features (no detection / DFS).
+    Takes milliseconds, so thresholds can be tuned live.
+
+    Returns a new result dict (the input is not modified). INVALID and
+    DEFERRED results are returned unchanged, and so are quick-look estimates
+    (no regions). The binary sample window is kept as it was, and so is the
+    "degraded" note of the explanation.
+
+    binary_map: the frame's binary map (default: result["binary_map"], see
+        return_mask). Regions that become CRACK get their centerline metrics
+        measured on it, like in a fresh analysis; without a map they keep 0.
+        Regions that are no longer CRACK always lose them.
+    """
+    if result.get("final_defect") in ("INVALID", "DEFERRED") or result.get("estimated") or "region_table" not in result:
+        return result
+
+    was_crack = result["region_table"]["defect"] == DEFECT_CODES["CRACK"]
+    region_table = classify_region_table(result["region_table"].copy(), thresholds)
+    is_crack = region_table["defect"] == DEFECT_CODES["CRACK"]
+    for field in ("skeleton_length", "mean_width", "branches"):
+        region_table[field][~is_crack] = 0
+    if binary_map is None:
+        binary_map = result.get("binary_map")
+    if binary_map is not None:
+        measure_cracks(binary_map, region_table, only=np.flatnonzero(is_crack & ~was_crack))
+
+    defect_counts, max_defect_area, _ = count_defects(region_table)
+    final_defect, explanation, affected_percentage, priority_score = global_consistency(
+        defect_counts, max_defect_area, result["suspicious_pixels"], result["total_pixels"], thresholds
+    )
+    if "degraded" in result:
+        explanation = f"{explanation} {describe(result['degraded'])}"
+    return {
+        **result,
+        "final_defect": final_defect,
+        "explanation": explanation,
+        "affected_percentage": affected_percentage,
+        "priority_score": priority_score,
+        "region_table": region_table,
     }
@@ -0,0 +1,70 @@
+import time
+import tracemalloc
+
+# =========================================================
+# PER-STAGE PEAK MEMORY (tracemalloc)
+# =========================================================
+# NumPy reports its buffers to tracemalloc, so the traced peak covers both
+# Python objects (lists, tuples) and arrays allocated by the pipeline.
+# The input image itself is allocated before profiling and is not counted.
+
+class StageMemoryProfiler:
+    """
+    with StageMemoryProfiler(input_bytes=pixels.nbytes) as profiler:
+        process_image_logic(..., profiler=profiler)
+    profiler.report()
+    """
+
+    def __init__(self, input_bytes):
+        self.input_bytes = input_bytes
+        self.stages = []
+        self._started_here = False
+        self._last_time = None
+
+    def __enter__(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_here = True
+        tracemalloc.reset_peak()
+        self._base = tracemalloc.get_traced_memory()[0]
+        self._last_time = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        if self._started_here:
+            tracemalloc.stop()
+        return False
+
+    def mark(self, stage):
+        """Records the peak since the previous mark (relative to the start)."""
+        current, peak = tracemalloc.get_traced_memory()
+        now = time.perf_counter()
+        self.stages.append({
+            "stage": stage,
+            "peak_bytes": max(0, peak - self._base),
+            "retained_bytes": max(0, current - self._base),
+            "seconds": now - self._last_time,
+        })
+        tracemalloc.reset_peak()
+        self._last_time = now
+
+    def peak_bytes(self):
+        return max((s["peak_bytes"] for s in self.stages), default=0)
+
+    def report(self):
+        """Stage rows with peak as a multiple of the input size."""
+        rows = []
+        for s in self.stages:
+            rows.append({**s, "peak_x_input": round(s["peak_bytes"] / self.input_bytes, 2) if self.input_bytes else 0.0})
+        return rows
+
+
+def format_report(rows, input_bytes):
+    lines = [f"Input: {input_bytes / 1e6:.1f} MB",
+             f"{'Stage':<18}{'Peak MB':>10}{'x Input':>10}{'Kept MB':>10}{'Time s':>10}"]
+    for row in rows:
+        lines.append(
+            f"{row['stage']:<18}{row['peak_bytes'] / 1e6:>10.1f}{row['peak_x_input']:>10.2f}"
+            f"{row['retained_bytes'] / 1e6:>10.1f}{row['seconds']:>10.2f}"
+        )
+    return "\n".join(lines)
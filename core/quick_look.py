@@ -0,0 +1,150 @@
+import time
+from statistics import NormalDist
+
+import numpy as np
+
+from config import QUICK_LOOK_MIN_AFFECTED, QUICK_LOOK_SAMPLES
+from core.image_logic import process_image_logic
+from defect_detection import binary_map_rules, exact_color_mask
+from core.region_table import empty_region_table
+from input_module import as_pixel_array
+
+# =========================================================
+# QUICK LOOK (Stratified Pixel Sample + Confidence Intervals)
+# =========================================================
+# Estimates what the full pipeline would count, from a few thousand pixels:
+# 1. Split the frame into a grid of strata (cells) and draw the same number
+#    of random pixels in each one, so every part of the pipe is represented.
+# 2. Global brightness baseline = stratified mean of the sample.
+# 3. Apply the binary-map rules (dark vs baseline, rust color) to the sample;
+#    suspicious_pixels / affected_percentage = stratified proportion.
+# Intervals use the stratified variance (normal approximation for the
+# baseline, Wilson score on the effective sample size for proportions).
+# Cost depends on the sample size only, not on the frame size (memory-mapped
+# frames only read the sampled pages).
+
+
+def _stratum_edges(length, cells):
+    return np.linspace(0, length, cells + 1).astype(np.int64)
+
+
+def stratified_sample(height, width, samples=QUICK_LOOK_SAMPLES, grid=16, seed=0):
+    """
+    Random pixel coordinates, the same count per grid cell.
+    Returns rows, cols (shape (cells, per_cell)) and the cell weights
+    (share of the frame, shape (cells,)).
+    """
+    rng = np.random.default_rng(seed)
+    grid_rows, grid_cols = min(grid, height), min(grid, width)
+    row_edges = _stratum_edges(height, grid_rows)
+    col_edges = _stratum_edges(width, grid_cols)
+    per_cell = max(2, samples // (grid_rows * grid_cols))
+
+    top = np.repeat(row_edges[:-1], grid_cols)[:, None]
+    cell_h = np.repeat(np.diff(row_edges), grid_cols)[:, None]
+    left = np.tile(col_edges[:-1], grid_rows)[:, None]
+    cell_w = np.tile(np.diff(col_edges), grid_rows)[:, None]
+
+    n_cells = grid_rows * grid_cols
+    rows = top + (rng.random((n_cells, per_cell)) * cell_h).astype(np.int64)
+    cols = left + (rng.random((n_cells, per_cell)) * cell_w).astype(np.int64)
+    weights = (cell_h * cell_w).ravel() / float(height * width)
+    return rows, cols, weights
+
+
+def _stratified_mean(values, weights):
+    """Stratified mean and its standard error; values is (cells, per_cell)."""
+    per_cell = values.shape[1]
+    mean = float(np.sum(weights * values.mean(axis=1)))
+    variance = float(np.sum(weights ** 2 * values.var(axis=1, ddof=1) / per_cell))
+    return mean, variance ** 0.5
+
+
+def _stratified_interval(hits, weights, z):
+    """
+    Stratified proportion and its confidence interval. Wilson score interval
+    on the effective sample size (sample count / design effect), so cells
+    with 0 or all hits do not make the interval collapse to a point, and a
+    sample without hits still gets an upper bound of about z^2 / samples.
+    """
+    per_cell = hits.shape[1]
+    cell_p = hits.sum(axis=1) / per_cell
+    p = float(np.sum(weights * cell_p))
+    variance = float(np.sum(weights ** 2 * cell_p * (1 - cell_p) / (per_cell - 1)))
+    n = hits.size
+    n_eff = min(n, p * (1 - p) / variance) if variance > 0 else n
+    center = (p + z * z / (2 * n_eff)) / (1 + z * z / n_eff)
+    half = z * (p * (1 - p) / n_eff + z * z / (4 * n_eff ** 2)) ** 0.5 / (1 + z * z / n_eff)
+    return p, max(0.0, center - half), min(1.0, center + half)
+
+
+def quick_look(pixels, samples=QUICK_LOOK_SAMPLES, grid=16, confidence=0.95, seed=0):
+    """
+    Sampled estimate of the binary-map statistics of a frame.
+
+    Returns a dict with the estimates and their confidence intervals:
+        brightness_baseline, brightness_ci,
+        suspicious_pixels, suspicious_pixels_ci,
+        affected_percentage, affected_percentage_ci,
+        samples, total_pixels, confidence, seconds
+    """
+    start = time.perf_counter()
+    pixels = as_pixel_array(pixels)
+    height, width = pixels.shape[:2]
+    total_pixels = width * height
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+
+    rows, cols, weights = stratified_sample(height, width, samples, grid, seed)
+    rgb = pixels[rows, cols] # (cells, per_cell, 3)
+    brightness = rgb.sum(axis=2, dtype=np.int16) / 3
+
+    # Same rules as defect_detection.rgb_to_binary_map, with the estimated baseline
+    # (a few thousand samples: evaluated directly, no lookup table)
+    baseline, baseline_se = _stratified_mean(brightness, weights)
+    hits = exact_color_mask(rgb, binary_map_rules(baseline * 0.75))
+    fraction, low, high = _stratified_interval(hits, weights, z)
+    return {
+        "brightness_baseline": round(baseline, 2),
+        "brightness_ci": (round(baseline - z * baseline_se, 2), round(baseline + z * baseline_se, 2)),
+        "suspicious_pixels": int(round(fraction * total_pixels)),
+        "suspicious_pixels_ci": (int(low * total_pixels), int(np.ceil(high * total_pixels))),
+        "affected_percentage": round(fraction * 100, 2),
+        "affected_percentage_ci": (round(low * 100, 2), round(high * 100, 2)),
+        "samples": int(rows.size),
+        "total_pixels": total_pixels,
+        "confidence": confidence,
+        "seconds": time.perf_counter() - start,
+    }
+
+
+def triage(pixels, width, height, pipe_id, min_affected=QUICK_LOOK_MIN_AFFECTED, thresholds=None,
+           samples=QUICK_LOOK_SAMPLES, **analysis_options):
+    """
+    Quick look first; the full process_image_logic only runs when the upper
+    confidence bound of the affected area reaches min_affected (percent).
+    Skipped images get an estimated HEALTHY result (no regions, "estimated": True).
+    Either way the result carries the estimate under "quick_look".
+    """
+    estimate = quick_look(pixels, samples)
+    if estimate["affected_percentage_ci"][1] >= min_affected:
+        result = process_image_logic(pixels, width, height, pipe_id, thresholds, **analysis_options)
+        result["quick_look"] = estimate
+        return result
+
+    low, high = estimate["affected_percentage_ci"]
+    return {
+        "final_defect": "HEALTHY",
+        "explanation": (
+            f"Quick look: estimated {estimate['affected_percentage']}% affected "
+            f"({estimate['confidence']*100:.0f}% CI {low}-{high}%), below the {min_affected}% triage "
+            f"threshold. Full analysis skipped."
+        ),
+        "binary_sample": [[0]*50 for _ in range(20)],
+        "total_pixels": width * height,
+        "suspicious_pixels": estimate["suspicious_pixels"],
+        "affected_percentage": estimate["affected_percentage"],
+        "priority_score": int(estimate["affected_percentage"] * 10), # same formula as a HEALTHY full result
+        "region_table": empty_region_table(),
+        "estimated": True,
+        "quick_look": estimate,
+    }
@@ -0,0 +1,120 @@
+import numpy as np
+
+from classification import DEFECT_CODES, DEFECT_NAMES, classify_regions, resolve_thresholds
+
+# =========================================================
+# REGION TABLE (Columnar / Structured Array)
+# =========================================================
+# One row per connected component found by the region DFS.
+# A NumPy structured array keeps every column contiguous, so consumers
+# can filter / sort / export thousands of regions without Python dicts:
+#     cracks = table[table["defect"] == DEFECT_CODES["CRACK"]]
+#     biggest = np.sort(table, order="area")[::-1]
+
+REGION_DTYPE = np.dtype([
+    ("label", np.int32),          # 1-based region id (DFS discovery order)
+    ("area", np.int32),           # pixel count
+    ("min_row", np.int32),        # bounding box (inclusive)
+    ("min_col", np.int32),
+    ("max_row", np.int32),
+    ("max_col", np.int32),
+    ("centroid_row", np.float64),
+    ("centroid_col", np.float64),
+    ("mean_r", np.uint8),         # mean color of region pixels
+    ("mean_g", np.uint8),
+    ("mean_b", np.uint8),
+    ("rectangularity", np.float64), # float64: classification thresholds are compared exactly
+    ("gradient", np.float64),     # max gradient magnitude on the region
+    ("length", np.int32),         # pixels with >= 2 region neighbors
+    ("defect", np.int8),          # class code, see DEFECT_NAMES
+    ("is_joint", np.bool_),       # full-span straight line (pipe joint), not classified
+    ("counted", np.bool_),        # contributed to defect_counts (area > min_defect_area, not a joint)
+    # CRACK regions only (0 otherwise), from the thinned centerline, see core/skeleton.py
+    ("skeleton_length", np.float64), # centerline length in px (diagonal steps = sqrt(2))
+    ("mean_width", np.float64),   # area / skeleton_length
+    ("branches", np.int32),       # centerline branches (1 = a single line)
+    ("scale", np.int16),          # frame pixels per analyzed pixel side (> 1: pyramid / downsampled analysis)
+])
+
+
+def empty_region_table():
+    return np.zeros(0, dtype=REGION_DTYPE)
+
+
+def build_region_table(rows):
+    """
+    Builds the structured array from a list of row tuples
+    (field order must match REGION_DTYPE).
+    """
+    if not rows:
+        return empty_region_table()
+    return np.array(rows, dtype=REGION_DTYPE)
+
+
+def analyzed_area(table):
+    """
+    Region areas in analyzed pixels (float64), the unit of the area
+    thresholds. Equal to "area" unless the region was found on a reduced copy
+    of the frame (core.budget.upscale_region_table multiplies "area" by scale^2).
+    """
+    area = table["area"].astype(np.float64)
+    scaled = table["scale"] > 1
+    if scaled.any():
+        area[scaled] /= table["scale"][scaled].astype(np.float64) ** 2
+    return area
+
+
+def classify_region_table(table, thresholds=None):
+    """
+    Fills the "defect" and "counted" columns IN PLACE with one vectorized
+    classification pass over every non-joint region.
+    thresholds: optional overrides of config.CLASSIFY_THRESHOLDS.
+    """
+    t = resolve_thresholds(thresholds)
+    classify_mask = ~table["is_joint"]
+    area = analyzed_area(table)
+    rows = table[classify_mask]
+    if rows.size > 0:
+        bbox_w = rows["max_col"] - rows["min_col"] + 1
+        bbox_h = rows["max_row"] - rows["min_row"] + 1
+        colors = np.stack([rows["mean_r"], rows["mean_g"], rows["mean_b"]], axis=1)
+        table["defect"][classify_mask] = classify_regions(
+            area[classify_mask], bbox_w, bbox_h, colors, rows["rectangularity"], rows["gradient"], t
+        )
+    # Ignore noise specs (area <= min_defect_area) for the image-level decision
+    table["counted"] = classify_mask & (area > t["min_defect_area"])
+    return table
+
+
+def region_defect_names(table):
+    """Returns the class name of every row (e.g. for display / CSV)."""
+    return [DEFECT_NAMES[code] for code in table["defect"]]
+
+
+def region_table_to_records(table):
+    """
+    Converts the table to a list of plain dicts (JSON friendly).
+    Only meant for export; keep the structured array for analysis.
+    """
+    records = []
+    names = REGION_DTYPE.names
+    for row in table.tolist():
+        rec = dict(zip(names, row))
+        rec["defect"] = DEFECT_NAMES[rec["defect"]]
+        records.append(rec)
+    return records
+
+
+def region_table_from_records(records):
+    """
+    Inverse of region_table_to_records (e.g. regions read back from an export).
+    Columns missing from older exports are left at 0 (scale: 1).
+    """
+    table = np.zeros(len(records), dtype=REGION_DTYPE)
+    table["scale"] = 1
+    for i, rec in enumerate(records):
+        for name in REGION_DTYPE.names:
+            if name in rec:
+                value = rec[name]
+                table[name][i] = DEFECT_CODES[value] if name == "defect" else value
+    return table
@@ -1,10 +1,14 @@
 import numpy as np
 import sys
+from array import array
+
+from defect_detection import band_rows_for
+from core.band_labeling import label_runs, component_sizes
 
 # Increase recursion depth just in case, though we use iterative stack
 sys.setrecursionlimit(10000)
 
-def extract_pipe_roi(pixels, width, height):
+def extract_pipe_roi(pixels, width, height, low_memory=False, pool=None, band_rows=None, stride=4):
     """
     Uses DFS (Connected Components) to find the largest structural object (Pipe).
     
@@ -19,7 +23,20 @@ def extract_pipe_roi(pixels, width, height):
         roi_mask (np.array): Binary mask of the pipe.
         is_valid_roi (bool): True if a significant pipe object is found.
         reason (str): Explanation.
+
+    low_memory: compute the gradient in row bands straight into uint8 and run
+        the DFS on a typed-array stack of flat indices (4 bytes per entry
+        instead of a Python tuple). Same result.
+    pool: optional thread pool; the edge map is built on row bands in parallel
+        and the components are found by band labeling (core.band_labeling)
+        instead of the DFS (band_rows rows per band). Same result.
+    stride: DFS start points are every stride-th row / column (a component
+        with no start point is never measured; 1 = every pixel).
     """
+    if pool is not None:
+        return _extract_pipe_roi_banded(pixels, width, height, pool, band_rows or band_rows_for(height), stride)
+    if low_memory:
+        return _extract_pipe_roi_compact(pixels, width, height, stride)
     
     # 1. Compute Simple Gradient (Structure)
     # Convert to grayscale rough approximation
@@ -66,8 +83,8 @@ def extract_pipe_roi(pixels, width, height):
     component_count = 0
     
     # Iterate through potential start nodes
-    for r in range(0, height, 4): # subsample start points for speed
-        for c in range(0, width, 4):
+    for r in range(0, height, stride): # subsample start points for speed
+        for c in range(0, width, stride):
             if dilated_mask[r, c] and not visited[r, c]:
                 # Found a new component
                 component_count += 1
@@ -133,3 +150,94 @@ def extract_pipe_roi(pixels, width, height):
         return None, False, f"INVALID: No Pipe Detected. Largest Object is only {coverage*100:.1f}% of image (Threshold 10%)."
         
     return None, True, f"Valid Pipe ROI Detected ({coverage*100:.1f}% coverage)."
+
+
+def _structure_mask_compact(pixels, width, height, band_rows=None, pool=None):
+    """Dilated structure mask (same as above) with only band-sized temporaries."""
+    band_rows = band_rows or band_rows_for(height)
+    grad_mag = np.zeros((height, width), dtype=np.uint8)
+
+    def gradient_band(top):
+        bottom = min(height, top + band_rows)
+        # One extra row below for the vertical difference
+        gray = np.mean(pixels[top:min(height, bottom + 1)], axis=2).astype(np.float32)
+        gx = np.abs(gray[:bottom - top, 1:] - gray[:bottom - top, :-1])
+        grad_mag[top:bottom, :-1] += gx.astype(np.uint8)
+        del gx
+        gy = np.abs(gray[1:, :] - gray[:-1, :])
+        rows = min(bottom, height - 1) - top
+        grad_mag[top:top + rows, :] += gy[:rows].astype(np.uint8)
+        del gray, gy
+
+    # Each band only writes its own rows
+    for _ in (pool.map if pool is not None else map)(gradient_band, range(0, height, band_rows)):
+        pass
+
+    structure_mask = grad_mag > 5
+    del grad_mag
+
+    dilated_mask = structure_mask.copy()
+    dilated_mask[:-1, :] |= structure_mask[1:, :] # From Down
+    dilated_mask[1:, :]  |= structure_mask[:-1, :] # From Up
+    dilated_mask[:, :-1] |= structure_mask[:, 1:] # From Right
+    dilated_mask[:, 1:]  |= structure_mask[:, :-1] # From Left
+    return dilated_mask
+
+
+def _extract_pipe_roi_compact(pixels, width, height, stride=4):
+    dilated = _structure_mask_compact(pixels, width, height).ravel()
+    visited = np.zeros(width * height, dtype=bool)
+    max_component_size = 0
+
+    for r in range(0, height, stride): # subsample start points for speed
+        for c in range(0, width, stride):
+            start = r * width + c
+            if dilated[start] and not visited[start]:
+                # Iterative DFS on flat indices (typed array stack)
+                stack = array("i", [start])
+                visited[start] = True
+                current_size = 0
+                while stack:
+                    idx = stack.pop()
+                    current_size += 1
+                    col = idx % width
+                    # Up / Down / Left / Right
+                    if idx >= width and dilated[idx - width] and not visited[idx - width]:
+                        visited[idx - width] = True
+                        stack.append(idx - width)
+                    if idx + width < width * height and dilated[idx + width] and not visited[idx + width]:
+                        visited[idx + width] = True
+                        stack.append(idx + width)
+                    if col > 0 and dilated[idx - 1] and not visited[idx - 1]:
+                        visited[idx - 1] = True
+                        stack.append(idx - 1)
+                    if col < width - 1 and dilated[idx + 1] and not visited[idx + 1]:
+                        visited[idx + 1] = True
+                        stack.append(idx + 1)
+                max_component_size = max(max_component_size, current_size)
+
+    total_pixels = width * height
+    coverage = max_component_size / total_pixels
+    if coverage < 0.10:
+        return None, False, f"INVALID: No Pipe Detected. Largest Object is only {coverage*100:.1f}% of image (Threshold 10%)."
+    return None, True, f"Valid Pipe ROI Detected ({coverage*100:.1f}% coverage)."
+
+
+def _extract_pipe_roi_banded(pixels, width, height, pool, band_rows, stride=4):
+    dilated = _structure_mask_compact(pixels, width, height, band_rows, pool)
+    rows, starts, ends, labels, n_regions = label_runs(dilated, pool, band_rows)
+
+    max_component_size = 0
+    if n_regions:
+        # Same as the DFS: only components holding a subsampled start point
+        # (every stride-th row / column) are measured
+        seeded = (rows % stride == 0) & (-(-starts // stride) * stride < ends)
+        if seeded.any():
+            sizes = component_sizes(labels, starts, ends, n_regions)
+            max_component_size = int(sizes[labels[seeded]].max())
+
+    total_pixels = width * height
+    coverage = max_component_size / total_pixels
+    if coverage < 0.10:
+        return None, False, f"INVALID: No Pipe Detected. Largest Object is only {coverage*100:.1f}% of image (Threshold 10%)."
+    return None, True, f"Valid Pipe ROI Detected ({coverage*100:.1f}% coverage)."
@@ -0,0 +1,378 @@
+import numpy as np
+
+from core.image_logic import process_image_logic, count_defects, global_consistency
+from core.region_table import empty_region_table, classify_region_table
+from defect_detection import frame_dark_limit
+from input_module import as_pixel_array
+
+# =========================================================
+# PIPE SEGMENTS (Frame Grouping + Overlap Registration)
+# =========================================================
+# A crawler / inspector shoots several overlapping frames of one pipe segment.
+# Instead of analyzing every frame fully (and counting the same crack in each):
+#   1. Register the new frame to the previous frame of the segment
+#      (coarse translation via phase correlation on a small grayscale copy).
+#   2. Analyze only the part of the new frame that the previous frame did not cover
+#      (with the whole frame's dark threshold, so a strip is thresholded like the frame).
+#   3. Merge region tables (shifted into segment coordinates) and decide ONE
+#      severity per segment with the normal global consistency check. A region
+#      touching the strip's inner edge continues a stored one (e.g. a crack
+#      crossing the overlap) and is merged into it, not counted again.
+
+REGISTRATION_SIDE = 128   # registration works on frames shrunk to about this size
+
+
+def registration_gray(pixels):
+    """Strided grayscale thumbnail for registration. Returns (gray, step)."""
+    height, width = pixels.shape[:2]
+    step = max(1, max(height, width) // REGISTRATION_SIDE)
+    gray = pixels[::step, ::step, :3].astype(np.float32).mean(axis=2)
+    return gray, step
+
+
+def register_translation(ref_gray, new_gray):
+    """
+    Phase correlation between two same-sized grayscale thumbnails.
+
+    Returns (dy, dx, correlation): the new frame's origin lies at (dy, dx) in
+    the reference frame, i.e. new[y, x] ~ ref[y + dy, x + dx]; correlation is
+    the normalized cross-correlation of the overlapping area (-1..1).
+    """
+    h, w = ref_gray.shape
+    window = np.outer(np.hanning(h), np.hanning(w)).astype(np.float32)
+    fa = np.fft.rfft2((ref_gray - ref_gray.mean()) * window)
+    fb = np.fft.rfft2((new_gray - new_gray.mean()) * window)
+    cross = fa * np.conj(fb)
+    cross /= np.abs(cross) + 1e-9
+    response = np.fft.irfft2(cross, s=(h, w))
+
+    dy, dx = np.unravel_index(int(np.argmax(response)), response.shape)
+    # Wrap to signed shifts
+    if dy > h // 2: dy -= h
+    if dx > w // 2: dx -= w
+
+    ref_part, new_part = overlap_views(ref_gray, new_gray, dy, dx)
+    if ref_part.size < 16:
+        return int(dy), int(dx), 0.0
+    a = ref_part - ref_part.mean()
+    b = new_part - new_part.mean()
+    denom = np.sqrt(np.sum(a * a) * np.sum(b * b))
+    correlation = float(np.sum(a * b) / denom) if denom > 0 else 0.0
+    return int(dy), int(dx), correlation
+
+
+def overlap_views(ref, new, dy, dx):
+    """Overlapping parts of ref and new for new[y, x] ~ ref[y + dy, x + dx]."""
+    h, w = ref.shape[:2]
+    r0, r1 = max(0, -dy), min(h, h - dy)
+    c0, c1 = max(0, -dx), min(w, w - dx)
+    if r1 <= r0 or c1 <= c0:
+        return ref[0:0, 0:0], new[0:0, 0:0]
+    return ref[r0 + dy:r1 + dy, c0 + dx:c1 + dx], new[r0:r1, c0:c1]
+
+
+def new_area_rects(height, width, dy, dx, margin=0):
+    """
+    Rectangles (top, left, h, w) of the new frame NOT covered by the reference
+    frame. Up to 2 rectangles: a full-width row band and a column band.
+    margin: overlap shrunk by this many pixels (registration uncertainty).
+    """
+    dy = dy + margin if dy > 0 else dy - margin if dy < 0 else 0
+    dx = dx + margin if dx > 0 else dx - margin if dx < 0 else 0
+    dy = max(-height, min(height, dy))
+    dx = max(-width, min(width, dx))
+
+    rects = []
+    # Row band (new rows beyond the reference frame's top/bottom edge)
+    if dy > 0:
+        rects.append((height - dy, 0, dy, width))
+    elif dy < 0:
+        rects.append((0, 0, -dy, width))
+
+    # Column band, limited to the rows shared with the reference
+    r0, r1 = max(0, -dy), min(height, height - dy)
+    if r1 > r0:
+        if dx > 0:
+            rects.append((r0, width - dx, r1 - r0, dx))
+        elif dx < 0:
+            rects.append((r0, 0, r1 - r0, -dx))
+    return [rect for rect in rects if rect[2] > 0 and rect[3] > 0]
+
+
+def inner_edge_rows(table, rect, height, width):
+    """
+    Rows of a strip's region table (strip coordinates) touching one of the
+    strip's edges inside the frame, i.e. the side the previous frame covered.
+    """
+    top, left, h, w = rect
+    touching = np.zeros(len(table), dtype=bool)
+    if top > 0: touching |= table["min_row"] == 0
+    if top + h < height: touching |= table["max_row"] == h - 1
+    if left > 0: touching |= table["min_col"] == 0
+    if left + w < width: touching |= table["max_col"] == w - 1
+    return touching & ~table["is_joint"]
+
+
+def merge_region_rows(row, piece):
+    """
+    Folds `piece` (another part of the same region) into `row` IN PLACE.
+    Area / length add up, the box is the union, means are area-weighted and
+    the rectangularity is recomputed. The crack metrics are combined from the
+    pieces (lengths add up, most branches) since no whole mask is kept.
+    The row keeps its own analysis scale.
+    """
+    area = int(row["area"]) + int(piece["area"])
+    for field in ("centroid_row", "centroid_col", "mean_r", "mean_g", "mean_b"):
+        row[field] = (float(row[field]) * row["area"] + float(piece[field]) * piece["area"]) / area
+    for field in ("min_row", "min_col"):
+        row[field] = min(row[field], piece[field])
+    for field in ("max_row", "max_col", "gradient", "branches"):
+        row[field] = max(row[field], piece[field])
+    row["area"] = area
+    row["length"] += piece["length"]
+    row["rectangularity"] = area / ((row["max_row"] - row["min_row"] + 1) * (row["max_col"] - row["min_col"] + 1))
+    row["skeleton_length"] += piece["skeleton_length"]
+    row["mean_width"] = area / row["skeleton_length"] if row["skeleton_length"] > 0 else 0.0
+
+
+def shift_region_table(table, row_offset, col_offset):
+    """Copy of a region table moved into another coordinate frame."""
+    shifted = table.copy()
+    for field in ("min_row", "max_row"):
+        shifted[field] += row_offset
+    for field in ("min_col", "max_col"):
+        shifted[field] += col_offset
+    shifted["centroid_row"] += row_offset
+    shifted["centroid_col"] += col_offset
+    return shifted
+
+
+class Segment:
+    """
+    One pipe segment: its frames, where each frame sits in segment
+    coordinates, and the merged regions of everything analyzed so far.
+    """
+
+    def __init__(self, segment_id):
+        self.segment_id = segment_id
+        self.frames = []             # frame names, in order
+        self.frame_offsets = []      # (row, col) of each frame in segment coordinates
+        self.tables = []             # region tables in segment coordinates
+        self.suspicious_pixels = 0
+        self.analyzed_pixels = 0     # pixels actually analyzed (union of new areas)
+        self.skipped_pixels = 0      # overlap pixels not analyzed again
+        self.last_gray = None        # registration thumbnail of the last frame
+        self.last_step = 1
+        self.last_shape = None
+
+    def add_regions(self, table, continuing=None):
+        """
+        Adds a region table (segment coordinates). Each row flagged in
+        `continuing` (inner_edge_rows) is merged into the stored region its
+        box overlaps most instead, if any. Returns the number of merged rows.
+        """
+        if continuing is None or not continuing.any() or not self.tables:
+            self.tables.append(table)
+            return 0
+        stored = np.concatenate(self.tables)
+        fresh = np.ones(len(table), dtype=bool)
+        for i in np.flatnonzero(continuing):
+            piece = table[i]
+            # Box overlap (1 px of slack: the pieces may only touch)
+            rows = np.minimum(stored["max_row"], piece["max_row"] + 1) - np.maximum(stored["min_row"], piece["min_row"] - 1) + 1
+            cols = np.minimum(stored["max_col"], piece["max_col"] + 1) - np.maximum(stored["min_col"], piece["min_col"] - 1) + 1
+            overlap = np.where((rows > 0) & (cols > 0) & ~stored["is_joint"], rows * cols, 0)
+            if overlap.any():
+                merge_region_rows(stored[int(np.argmax(overlap))], piece)
+                fresh[i] = False
+        self.tables = [stored, table[fresh]]
+        return int(np.count_nonzero(~fresh))
+
+    def summary(self, thresholds=None):
+        """Per-segment result (same keys as a process_image_logic result)."""
+        table = np.concatenate(self.tables) if self.tables else empty_region_table()
+        # Re-classify from the stored features so live threshold changes apply
+        classify_region_table(table, thresholds)
+        if self.analyzed_pixels == 0:
+            return {
+                "pipe_id": self.segment_id,
+                "final_defect": "INVALID",
+                "explanation": "No valid frame in this segment.",
+                "total_pixels": 0,
+                "suspicious_pixels": 0,
+                "affected_percentage": 0.0,
+                "priority_score": 0,
+                "frames": list(self.frames),
+                "region_table": table,
+            }
+        defect_counts, max_defect_area, _ = count_defects(table)
+        final_defect, explanation, affected_percentage, priority_score = global_consistency(
+            defect_counts, max_defect_area, self.suspicious_pixels, self.analyzed_pixels, thresholds
+        )
+        return {
+            "pipe_id": self.segment_id,
+            "final_defect": final_defect,
+            "explanation": f"{explanation} (Segment of {len(self.frames)} frame(s).)",
+            "total_pixels": self.analyzed_pixels,
+            "skipped_pixels": self.skipped_pixels,
+            "suspicious_pixels": self.suspicious_pixels,
+            "affected_percentage": affected_percentage,
+            "priority_score": priority_score,
+            "frames": list(self.frames),
+            "region_table": table,
+        }
+
+
+class SegmentTracker:
+    """
+    Groups frames into segments and analyzes only their new (non-overlapping) parts.
+
+    add_frame(pixels, frame_name, segment_id=None):
+      - segment_id given: the frame joins that segment (created if new).
+      - segment_id None: the frame joins the most recent segment if it
+        registers to that segment's last frame, otherwise starts a new one.
+
+    min_overlap:     fraction of the frame that must overlap to count as the same view
+    min_correlation: registration quality needed to trust the overlap
+    """
+
+    def __init__(self, min_overlap=0.2, min_correlation=0.6, id_prefix="SEG_"):
+        self.min_overlap = min_overlap
+        self.min_correlation = min_correlation
+        self.id_prefix = id_prefix
+        self.segments = {}
+        self.last_segment_id = None
+
+    def next_segment_id(self):
+        return f"{self.id_prefix}{len(self.segments) + 1:03d}"
+
+    def _register(self, segment, gray, step, shape):
+        """(dy, dx) in full-resolution pixels, or None if the frames do not overlap."""
+        if segment.last_gray is None or segment.last_shape != shape or segment.last_step != step:
+            return None
+        dy, dx, correlation = register_translation(segment.last_gray, gray)
+        h, w = gray.shape
+        overlap = max(0, h - abs(dy)) * max(0, w - abs(dx)) / (h * w)
+        if correlation < self.min_correlation or overlap < self.min_overlap:
+            return None
+        return dy * step, dx * step
+
+    def add_frame(self, pixels, frame_name, segment_id=None, thresholds=None, **analysis_options):
+        """
+        Returns (segment, frame_result). frame_result is the analysis of the
+        frame's NEW area only, with "segment_id", "frame_index", "frame_offset",
+        "analyzed_fraction" added, and "continued_regions": regions of the new
+        area that continue a region of earlier frames (merged into it).
+        analysis_options: passed to process_image_logic (config, workers,
+        return_mask, ...). With return_mask, the frame's "binary_map" holds
+        the maps of the analyzed parts (0 in the skipped overlap).
+        """
+        pixels = as_pixel_array(pixels)
+        height, width = pixels.shape[:2]
+        gray, step = registration_gray(pixels)
+
+        shift = None
+        if segment_id is None:
+            last = self.segments.get(self.last_segment_id)
+            if last is not None:
+                shift = self._register(last, gray, step, pixels.shape)
+            segment_id = last.segment_id if shift is not None else self.next_segment_id()
+        elif segment_id in self.segments:
+            shift = self._register(self.segments[segment_id], gray, step, pixels.shape)
+
+        segment = self.segments.get(segment_id)
+        if segment is None:
+            segment = self.segments[segment_id] = Segment(segment_id)
+        self.last_segment_id = segment_id
+
+        if shift is None:
+            # First frame (or no usable overlap): full analysis incl. validity checks
+            result = process_image_logic(pixels, width, height, segment_id, thresholds, **analysis_options)
+            offset = (0, 0) if not segment.frame_offsets else None
+            parts = [((0, 0, height, width), result)] if result["final_defect"] != "INVALID" else []
+        else:
+            # Overlapping frame: analyze only the new strips (trusted, segment
+            # already valid), thresholded against the whole frame's brightness
+            dy, dx = shift
+            dark_limit = frame_dark_limit(pixels, width, height)
+            prev_row, prev_col = segment.frame_offsets[-1] or (0, 0)
+            offset = (prev_row + dy, prev_col + dx)
+            parts = []
+            for top, left, h, w in new_area_rects(height, width, dy, dx, margin=step):
+                if h < 3 or w < 3:
+                    continue
+                part = pixels[top:top + h, left:left + w]
+                parts.append(((top, left, h, w), process_image_logic(part, w, h, segment_id, thresholds, trusted=True,
+                                                                     dark_limit=dark_limit, **analysis_options)))
+            result = merge_parts(parts, height * width, thresholds)
+            if analysis_options.get("return_mask"):
+                result["binary_map"] = np.zeros((height, width), dtype=np.uint8)
+                for (top, left, h, w), part_result in parts:
+                    result["binary_map"][top:top + h, left:left + w] = part_result["binary_map"]
+
+        # Merge into the segment (segment coordinates when the frame position is known)
+        base_row, base_col = offset if offset is not None else (0, 0)
+        continued = 0
+        for (top, left, h, w), part_result in parts:
+            table = part_result["region_table"]
+            continuing = inner_edge_rows(table, (top, left, h, w), height, width) if shift is not None else None
+            continued += segment.add_regions(shift_region_table(table, base_row + top, base_col + left), continuing)
+            segment.suspicious_pixels += part_result["suspicious_pixels"]
+            segment.analyzed_pixels += h * w
+        analyzed = sum(h * w for (_, _, h, w), _ in parts)
+        if result["final_defect"] != "INVALID":
+            segment.skipped_pixels += height * width - analyzed
+
+        segment.frames.append(frame_name)
+        segment.frame_offsets.append(offset)
+        if result["final_defect"] != "INVALID":
+            # Only valid frames can serve as registration reference (their overlap is trusted)
+            segment.last_gray, segment.last_step, segment.last_shape = gray, step, pixels.shape
+
+        result["segment_id"] = segment_id
+        result["frame_index"] = len(segment.frames)
+        result["frame_offset"] = offset
+        result["analyzed_fraction"] = round(analyzed / (height * width), 3)
+        result["continued_regions"] = continued
+        return segment, result
+
+    def summaries(self, thresholds=None):
+        """Per-segment results, highest priority first."""
+        results = [segment.summary(thresholds) for segment in self.segments.values()]
+        return sorted(results, key=lambda res: res["priority_score"], reverse=True)
+
+
+def merge_parts(parts, frame_pixels, thresholds=None):
+    """Frame-level result for a frame analyzed in several rectangles."""
+    tables = [shift_region_table(res["region_table"], top, left) for (top, left, _, _), res in parts]
+    table = np.concatenate(tables) if tables else empty_region_table()
+    suspicious_pixels = sum(res["suspicious_pixels"] for _, res in parts)
+    analyzed_pixels = sum(h * w for (_, _, h, w), _ in parts)
+
+    if analyzed_pixels == 0:
+        final_defect, explanation, affected_percentage, priority_score = (
+            "HEALTHY", "Frame fully overlaps the previous frame. Nothing new to analyze.", 0.0, 0
+        )
+    else:
+        defect_counts, max_defect_area, _ = count_defects(table)
+        final_defect, explanation, affected_percentage, priority_score = global_consistency(
+            defect_counts, max_defect_area, suspicious_pixels, analyzed_pixels, thresholds
+        )
+        explanation = f"{explanation} (New area only: {analyzed_pixels / frame_pixels * 100:.0f}% of frame.)"
+
+    # Binary sample of the largest analyzed part
+    if parts:
+        sample = max(parts, key=lambda part: part[0][2] * part[0][3])[1]["binary_sample"]
+    else:
+        sample = [[0] * 50 for _ in range(20)]
+
+    return {
+        "final_defect": final_defect,
+        "explanation": explanation,
+        "binary_sample": sample,
+        "total_pixels": analyzed_pixels,
+        "suspicious_pixels": suspicious_pixels,
+        "affected_percentage": affected_percentage,
+        "priority_score": priority_score,
+        "region_table": table,
+    }
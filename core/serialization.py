@@ -0,0 +1,38 @@
+import numpy as np
+
+from core.region_table import region_table_to_records
+
+
+def to_builtin(value):
+    """Converts numpy scalars / arrays to plain Python values (recursively)."""
+    if isinstance(value, np.ndarray):
+        return value.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    if isinstance(value, dict):
+        return {k: to_builtin(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [to_builtin(v) for v in value]
+    return value
+
+
+def result_to_dict(result, include_regions=False, include_sample=True):
+    """
+    JSON-friendly copy of a process_image_logic result.
+    Timing / metadata keys that are plain values are kept as well.
+    """
+    out = {}
+    for key, value in result.items():
+        if key in ("image_obj", "region_table", "binary_sample"):
+            continue
+        if isinstance(value, (str, int, float, bool, type(None), np.generic)):
+            out[key] = to_builtin(value)
+
+    if "degraded" in result:
+        # What the per-image guard did (core.budget), plain values only
+        out["degraded"] = to_builtin(result["degraded"])
+    if include_sample and "binary_sample" in result:
+        out["binary_sample"] = to_builtin(result["binary_sample"])
+    if include_regions and "region_table" in result:
+        out["regions"] = region_table_to_records(result["region_table"])
+    return out
@@ -0,0 +1,231 @@
+import numpy as np
+
+from classification import DEFECT_CODES
+from core.band_labeling import label_runs, merge_components
+
+# =========================================================
+# CRACK SKELETON (Vectorized Zhang-Suen Thinning)
+# =========================================================
+# The region "length" (pixels with >= 2 neighbors) grows with crack width,
+# so it cannot measure a crack. Thinning the region to a 1-pixel centerline
+# gives the real length; width = area / centerline length.
+#
+# Every pixel's 8 neighbors are packed into one code (0..255) with array
+# lookups, and a 256-entry table says whether Zhang-Suen removes the pixel.
+# Only the foreground pixels of the region are visited (flat index array),
+# so the cost follows the crack area, not the frame size.
+
+# Neighbor order P2..P9 of Zhang-Suen: N, NE, E, SE, S, SW, W, NW
+_NEIGHBORS = ((-1, 0), (-1, 1), (0, 1), (1, 1), (1, 0), (1, -1), (0, -1), (-1, -1))
+
+
+def _thinning_tables():
+    codes = np.arange(256)
+    bits = (codes[:, None] >> np.arange(8)) & 1 # bits[:, k] = P(k + 2)
+    p2, p3, p4, p5, p6, p7, p8, p9 = bits.T
+    count = bits.sum(axis=1)
+    # 0 -> 1 transitions around the ring P2, P3, ..., P9, P2
+    transitions = ((bits == 0) & (np.roll(bits, -1, axis=1) == 1)).sum(axis=1)
+    base = (count >= 2) & (count <= 6) & (transitions == 1)
+    first = base & (p2 * p4 * p6 == 0) & (p4 * p6 * p8 == 0)
+    second = base & (p2 * p4 * p8 == 0) & (p2 * p6 * p8 == 0)
+    return first, second
+
+
+_REMOVE_FIRST, _REMOVE_SECOND = _thinning_tables()
+
+
+def skeletonize(mask):
+    """1-pixel wide centerline (8-connected) of a 2-D bool mask."""
+    height, width = mask.shape
+    padded_width = width + 2
+    flat = np.zeros((height + 2) * padded_width, dtype=np.uint8)
+    flat.reshape(height + 2, padded_width)[1:-1, 1:-1] = mask
+    offsets = np.array([dr * padded_width + dc for dr, dc in _NEIGHBORS])
+    weights = (1 << np.arange(8)).astype(np.uint8)
+
+    pixels = np.flatnonzero(flat)
+    while True:
+        removed_any = False
+        for table in (_REMOVE_FIRST, _REMOVE_SECOND):
+            # Neighborhood code of every remaining pixel (8 gathers)
+            codes = np.zeros(pixels.size, dtype=np.uint8)
+            for offset, weight in zip(offsets, weights):
+                codes |= flat[pixels + offset] * weight
+            remove = table[codes]
+            if remove.any():
+                flat[pixels[remove]] = 0
+                pixels = pixels[~remove]
+                removed_any = True
+        if not removed_any:
+            break
+    return flat.reshape(height + 2, padded_width)[1:-1, 1:-1].astype(bool)
+
+
+def _ring_tables():
+    """Per neighborhood code: neighbor count and crossing number (0 -> 1 transitions around the ring)."""
+    codes = np.arange(256)
+    bits = (codes[:, None] >> np.arange(8)) & 1
+    crossings = ((bits == 0) & (np.roll(bits, -1, axis=1) == 1)).sum(axis=1)
+    return bits.sum(axis=1), crossings
+
+
+_COUNT, _CROSSINGS = _ring_tables()
+
+
+def _neighbor_codes(flat, pixels, offsets):
+    codes = np.zeros(pixels.size, dtype=np.uint8)
+    for k, offset in enumerate(offsets):
+        codes |= flat[pixels + offset] << k
+    return codes
+
+
+def _flat_skeleton(skeleton):
+    height, width = skeleton.shape
+    padded_width = width + 2
+    flat = np.zeros((height + 2) * padded_width, dtype=np.uint8)
+    flat.reshape(height + 2, padded_width)[1:-1, 1:-1] = skeleton
+    offsets = np.array([dr * padded_width + dc for dr, dc in _NEIGHBORS])
+    return flat, offsets, padded_width
+
+
+def prune_spurs(skeleton, iterations):
+    """
+    Removes side branches shorter than `iterations` px (boundary noise of a
+    thick region thins into short spurs). Endpoints are peeled `iterations`
+    times, then the branches that survived grow back from their ends, one
+    peeled layer at a time (so they keep their full length).
+    """
+    flat, offsets, padded_width = _flat_skeleton(skeleton)
+    pixels = np.flatnonzero(flat)
+    peeled = []
+    for _ in range(iterations):
+        end = _CROSSINGS[_neighbor_codes(flat, pixels, offsets)] <= 1
+        if not end.any():
+            break
+        flat[pixels[end]] = 0
+        peeled.append(pixels[end])
+        pixels = pixels[~end]
+
+    if peeled and pixels.size:
+        front = np.zeros_like(flat)
+        front[pixels[_CROSSINGS[_neighbor_codes(flat, pixels, offsets)] <= 1]] = 1
+        for layer in reversed(peeled):
+            grown = layer[_neighbor_codes(front, layer, offsets) != 0]
+            front[:] = 0
+            front[grown] = 1
+            flat[grown] = 1
+    height = skeleton.shape[0]
+    return flat.reshape(height + 2, padded_width)[1:-1, 1:-1].astype(bool)
+
+
+def skeleton_metrics(skeleton):
+    """
+    Centerline length (px, diagonal steps count sqrt(2)) and branch count
+    of a skeleton. Branches = endpoints + junctions - 1 (exact for trees:
+    a line is 1, a Y is 3, an X is 4).
+    """
+    flat, offsets, padded_width = _flat_skeleton(skeleton)
+    pixels = np.flatnonzero(flat)
+    if pixels.size == 0:
+        return 0.0, 0
+
+    def at(dr, dc):
+        return flat[pixels + dr * padded_width + dc]
+
+    # Each link counted once (E, S, SE, SW). A diagonal step that already has
+    # an orthogonal corner (staircase) adds nothing of its own.
+    east, south = at(0, 1), at(1, 0)
+    south_east = at(1, 1) & (1 - east) & (1 - south)
+    south_west = at(1, -1) & (1 - at(0, -1)) & (1 - south)
+    length = float(east.sum() + south.sum()) + np.sqrt(2) * float(south_east.sum() + south_west.sum())
+
+    # Crossing number: 1 = line end, >= 3 = branching point
+    crossings = _CROSSINGS[_neighbor_codes(flat, pixels, offsets)]
+    endpoints = int(np.count_nonzero(crossings == 1))
+
+    # Branching pixels next to each other form ONE junction
+    junction = pixels[crossings >= 3]
+    junctions = 0
+    if junction.size:
+        links = []
+        for offset in (1, padded_width - 1, padded_width, padded_width + 1):
+            pos = np.searchsorted(junction, junction + offset)
+            hit = (pos < junction.size) & (junction[np.minimum(pos, junction.size - 1)] == junction + offset)
+            links.append(np.stack([np.flatnonzero(hit), pos[hit]], axis=1))
+        roots = merge_components(junction.size, np.concatenate(links))
+        junctions = int(np.unique(roots).size)
+
+    branches = max(1, endpoints + junctions - 1)
+    return length, branches
+
+
+def region_mask(binary_map, row):
+    """
+    Bool mask of one region table row's pixels, over its bounding box.
+
+    The region is one 4-connected component of its bounding-box crop, so only
+    the crop is labeled (never the whole map). The component is matched to
+    the row by area, box and centroid; a row that matches no component of
+    the map raises ValueError.
+    """
+    top, left = int(row["min_row"]), int(row["min_col"])
+    height, width = int(row["max_row"]) - top + 1, int(row["max_col"]) - left + 1
+    crop = np.asarray(binary_map[top:top + height, left:left + width]) != 0
+    rows, starts, ends, labels, n_regions = label_runs(crop)
+    lengths = ends - starts
+
+    def per_component(values, reduce, initial):
+        out = np.full(n_regions, initial, dtype=np.float64)
+        reduce.at(out, labels, values)
+        return out
+
+    sizes = per_component(lengths, np.add, 0)
+    spans_box = ((per_component(rows, np.minimum, height) == 0) & (per_component(rows, np.maximum, -1) == height - 1)
+                 & (per_component(starts, np.minimum, width) == 0) & (per_component(ends, np.maximum, 0) == width))
+    candidates = np.flatnonzero(spans_box & (sizes == row["area"]))
+    if candidates.size == 0:
+        raise ValueError(f"region {int(row['label'])} does not match the binary map")
+    label = candidates[0]
+    if candidates.size > 1:
+        # Same area and box (interleaved regions): the centroid decides
+        centroid_row = top + per_component(rows * lengths, np.add, 0)[candidates] / sizes[candidates]
+        centroid_col = left + per_component((starts + ends - 1) * lengths / 2, np.add, 0)[candidates] / sizes[candidates]
+        distance = np.hypot(centroid_row - row["centroid_row"], centroid_col - row["centroid_col"])
+        label = candidates[np.argmin(distance)]
+
+    runs = np.flatnonzero(labels == label)
+    run_lengths = lengths[runs]
+    offsets = np.arange(run_lengths.sum()) - np.repeat(np.cumsum(run_lengths) - run_lengths, run_lengths)
+    mask = np.zeros((height, width), dtype=bool)
+    mask[np.repeat(rows[runs], run_lengths), np.repeat(starts[runs], run_lengths) + offsets] = True
+    return mask
+
+
+def measure_cracks(binary_map, region_table, budget=None, only=None):
+    """
+    Fills skeleton_length, mean_width and branches IN PLACE for every CRACK
+    region (other regions keep 0). Each crack is thinned on its own
+    bounding box (region_mask), so time and memory follow the cracks, not
+    the frame.
+
+    budget: core.budget.ImageBudget, checked before every crack; the cracks
+        left when it expires keep 0.
+    only: optional row indices to measure (default: every CRACK row).
+    Returns the number of cracks left unmeasured (0 = all measured).
+    """
+    cracks = np.flatnonzero(region_table["defect"] == DEFECT_CODES["CRACK"]) if only is None else np.asarray(only)
+    for done, i in enumerate(cracks):
+        if budget is not None and budget.expired():
+            return cracks.size - done
+        row = region_table[i]
+        skeleton = skeletonize(region_mask(binary_map, row))
+        length, _ = skeleton_metrics(skeleton)
+        width = row["area"] / length if length > 0 else float(row["area"])
+        # Spurs shorter than the crack width are edge noise, not branches
+        _, branches = skeleton_metrics(prune_spurs(skeleton, int(np.ceil(width))))
+        branches = max(1, branches) # pruned away completely: a short blob, one branch
+        region_table["skeleton_length"][i] = length
+        region_table["mean_width"][i] = width
+        region_table["branches"][i] = branches
+    return 0
@@ -1,27 +1,45 @@
 import numpy as np
 
-def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
+from defect_detection import band_rows_for
+
+def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False, low_memory=False, stats=None, edge_stride=4):
     """
     Determines if the image is likely a pipe based on structural continuity and noise distribution.
     Returns: (is_valid: bool, reason: str)
+
+    low_memory: binary_map is a uint8 array and the whole-image statistics
+        (profiles, histogram, saturation, gradient) are computed in row bands
+        instead of full-size float copies. Same decisions.
+    stats: the whole-image statistics already computed for a stack of frames
+        (core.batch.frame_statistics); only the decisions run here.
+    edge_stride: the texture (edge density / direction) check samples every
+        edge_stride-th row and column.
     """
     
     total_pixels = width * height
     defect_pixels = 0
     
-    for r in range(height):
-        for c in range(width):
-            if binary_map[r][c] == 1:
-                defect_pixels += 1
+    if stats is not None:
+        defect_pixels = stats["defect_pixels"]
+    elif low_memory:
+        defect_pixels = int(np.count_nonzero(binary_map))
+    else:
+        for r in range(height):
+            for c in range(width):
+                if binary_map[r][c] == 1:
+                    defect_pixels += 1
                 
     
     # Check for Rust Color Dominance (Simple Avg)
     # Perform this early to adjust thresholds
     center_region = pixels[height//4 : 3*height//4, width//4 : 3*width//4]
     if center_region.size > 0:
-         avg_r = np.mean(center_region[:,:,0])
-         avg_g = np.mean(center_region[:,:,1])
-         avg_b = np.mean(center_region[:,:,2])
+         if stats is not None:
+             avg_r, avg_g, avg_b = stats["center_mean"]
+         else:
+             avg_r = np.mean(center_region[:,:,0])
+             avg_g = np.mean(center_region[:,:,1])
+             avg_b = np.mean(center_region[:,:,2])
          
          # Red dominant and warm colors
          is_rusty = (avg_r > avg_g + 10) and (avg_r > avg_b + 10)
@@ -36,14 +54,19 @@ def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
     # If we detect a strong "Cylindrical Profile", we VALIDATE immediately, skipping noise checks.
     
     def check_cylindrical_gradient(px):
-        # Convert to grayscale
-        gray = np.mean(px, axis=2)
-        h, w = gray.shape
-        
-        # Check Vertical Profile (Average of Columns) - for Horizontal Pipe
-        col_profile = np.mean(gray, axis=0)
-        # Check Horizontal Profile (Average of Rows) - for Vertical Pipe
-        row_profile = np.mean(gray, axis=1)
+        if stats is not None:
+            col_profile, row_profile = stats["profiles"]
+        elif low_memory:
+            col_profile, row_profile = _gray_profiles_compact(px)
+        else:
+            # Convert to grayscale
+            gray = np.mean(px, axis=2)
+            h, w = gray.shape
+            
+            # Check Vertical Profile (Average of Columns) - for Horizontal Pipe
+            col_profile = np.mean(gray, axis=0)
+            # Check Horizontal Profile (Average of Rows) - for Vertical Pipe
+            row_profile = np.mean(gray, axis=1)
         
         # Logic: Center should be brighter than edges (Highlight)
         # OR Center should be darker than edges (if inside lit from end? rare)
@@ -69,22 +92,25 @@ def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
     vertical_edges = 0
     horizontal_edges = 0
     
-    for r in range(1, height-1, 4):
-        for c in range(1, width-1, 4):
-             # Simple Sobel-like manual check
-             # Cast to int32 to avoid uint8 overflow
-             p_center = np.sum(pixels[r,c], dtype=np.int32)
-             p_right = np.sum(pixels[r, c+1], dtype=np.int32)
-             p_down = np.sum(pixels[r+1, c], dtype=np.int32)
+    if stats is not None:
+        horizontal_edges, vertical_edges = stats["sampled_edges"]
+    else:
+        for r in range(1, height-1, edge_stride):
+            for c in range(1, width-1, edge_stride):
+                 # Simple Sobel-like manual check
+                 # Cast to int32 to avoid uint8 overflow
+                 p_center = np.sum(pixels[r,c], dtype=np.int32)
+                 p_right = np.sum(pixels[r, c+1], dtype=np.int32)
+                 p_down = np.sum(pixels[r+1, c], dtype=np.int32)
              
-             dx = abs(p_right - p_center)
-             dy = abs(p_down - p_center)
+                 dx = abs(p_right - p_center)
+                 dy = abs(p_down - p_center)
              
-             if dx > 40: horizontal_edges += 1
-             if dy > 40: vertical_edges += 1
+                 if dx > 40: horizontal_edges += 1
+                 if dy > 40: vertical_edges += 1
              
     total_edges = horizontal_edges + vertical_edges
-    sampled_pixels = (width // 4) * (height // 4)
+    sampled_pixels = (width // edge_stride) * (height // edge_stride)
     edge_density = total_edges / (2 * sampled_pixels) if sampled_pixels > 0 else 0
     ratio = 0.0
     
@@ -108,8 +134,13 @@ def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
     # Natural photos have noise (Gaussian distribution).
     # Check Histogram: If > 15% of pixels are EXACTLY one value (e.g. White).
     
-    gray_int = (np.mean(pixels, axis=2)).astype(np.uint8)
-    hist, _ = np.histogram(gray_int, bins=256, range=(0,256))
+    if stats is not None:
+        hist = stats["histogram"]
+    elif low_memory:
+        hist = _gray_histogram_compact(pixels)
+    else:
+        gray_int = (np.mean(pixels, axis=2)).astype(np.uint8)
+        hist, _ = np.histogram(gray_int, bins=256, range=(0,256))
     max_freq = np.max(hist)
     
     if max_freq > total_pixels * 0.15:
@@ -121,19 +152,24 @@ def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
     # ----------------------------------------------------
     # Check for Neon colors (High Saturation > 0.9)
     # Vectorized Saturation Calculation
-    px_float = pixels.astype(np.float32)
-    c_max = np.max(px_float, axis=2)
-    c_min = np.min(px_float, axis=2)
-    
-    # Avoid divide by zero
-    with np.errstate(divide='ignore', invalid='ignore'):
-        s_map = (c_max - c_min) / c_max
-        s_map[c_max == 0] = 0
+    if stats is not None:
+        high_sat_pixels = stats["high_saturation"]
+    elif low_memory:
+        high_sat_pixels = _count_high_saturation_compact(pixels, 0.85)
+    else:
+        px_float = pixels.astype(np.float32)
+        c_max = np.max(px_float, axis=2)
+        c_min = np.min(px_float, axis=2)
         
-    s_map = np.nan_to_num(s_map)
-    
-    # Count high saturation pixels
-    high_sat_pixels = np.sum(s_map > 0.85)
+        # Avoid divide by zero
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s_map = (c_max - c_min) / c_max
+            s_map[c_max == 0] = 0
+            
+        s_map = np.nan_to_num(s_map)
+        
+        # Count high saturation pixels
+        high_sat_pixels = np.sum(s_map > 0.85)
     if high_sat_pixels > total_pixels * 0.40: # 40% neon/vibrant
          return False, f"INVALID: Digital Wallpaper/Neon Art (High Saturation Coverage {high_sat_pixels/total_pixels:.2f})."
 
@@ -143,12 +179,17 @@ def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
     # Compute edge density on the whole image (simplified)
     # If the image is extremely flat (no edges), it's invalid.
     
-    gray_full = np.mean(pixels, axis=2)
-    gy, gx = np.gradient(gray_full)
-    grad_mag_full = np.sqrt(gx**2 + gy**2)
-    # Threshold for "Edge"
-    edge_mask = grad_mag_full > 10
-    global_edge_density = np.sum(edge_mask) / total_pixels
+    if stats is not None:
+        global_edge_density = stats["gradient_edges"] / total_pixels
+    elif low_memory:
+        global_edge_density = _count_gradient_edges_compact(pixels, 10) / total_pixels
+    else:
+        gray_full = np.mean(pixels, axis=2)
+        gy, gx = np.gradient(gray_full)
+        grad_mag_full = np.sqrt(gx**2 + gy**2)
+        # Threshold for "Edge"
+        edge_mask = grad_mag_full > 10
+        global_edge_density = np.sum(edge_mask) / total_pixels
     
     if global_edge_density < 0.01:
         return False, f"INVALID: Low Information (Edge Density {global_edge_density:.4f}). Image is too flat/empty."
@@ -206,3 +247,65 @@ def is_valid_pipe(pixels, width, height, binary_map, trust_roi=False):
              return False, f"INVALID: High entropy (Defects {defect_pixels/total_pixels:.2f}), no dominant direction."
 
     return True, f"Valid Pipe Structure (Ratio: {ratio:.2f}, Density: {edge_density:.2f})"
+
+
+
+# =========================================================
+# LOW-MEMORY HELPERS (row bands, band-sized temporaries only)
+# =========================================================
+def _gray_profiles_compact(pixels):
+    """Column / row means of the grayscale image without a full gray copy."""
+    height, width = pixels.shape[:2]
+    band_rows = band_rows_for(height)
+    col_sum = np.zeros(width, dtype=np.float64)
+    row_profile = np.zeros(height, dtype=np.float64)
+    for top in range(0, height, band_rows):
+        gray = np.mean(pixels[top:top + band_rows], axis=2)
+        col_sum += gray.sum(axis=0)
+        row_profile[top:top + gray.shape[0]] = gray.mean(axis=1)
+    return col_sum / height, row_profile
+
+
+def _gray_histogram_compact(pixels):
+    hist = np.zeros(256, dtype=np.int64)
+    band_rows = band_rows_for(pixels.shape[0])
+    for top in range(0, pixels.shape[0], band_rows):
+        gray_int = np.mean(pixels[top:top + band_rows], axis=2).astype(np.uint8)
+        hist += np.bincount(gray_int.ravel(), minlength=256)
+    return hist
+
+
+def _count_high_saturation_compact(pixels, threshold):
+    count = 0
+    band_rows = band_rows_for(pixels.shape[0])
+    for top in range(0, pixels.shape[0], band_rows):
+        band = pixels[top:top + band_rows]
+        c_max = band.max(axis=2).astype(np.float32)
+        c_min = band.min(axis=2).astype(np.float32)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            s_map = (c_max - c_min) / c_max
+        s_map[c_max == 0] = 0
+        count += int(np.count_nonzero(s_map > threshold))
+    return count
+
+
+def _count_gradient_edges_compact(pixels, threshold):
+    """np.gradient edge count, band by band with a 1-row halo (exact)."""
+    height = pixels.shape[0]
+    band_rows = band_rows_for(height)
+    count = 0
+    for top in range(0, height, band_rows):
+        bottom = min(height, top + band_rows)
+        halo_top = max(0, top - 1)
+        halo_bottom = min(height, bottom + 1)
+        gray = np.mean(pixels[halo_top:halo_bottom], axis=2)
+        gy, gx = np.gradient(gray)
+        del gray
+        gx **= 2
+        gy **= 2
+        gx += gy
+        del gy
+        np.sqrt(gx, out=gx)
+        inner = gx[top - halo_top:top - halo_top + (bottom - top)]
+        count += int(np.count_nonzero(inner > threshold))
+    return count
@@ -1,59 +1,148 @@
+from functools import lru_cache
+
+import numpy as np
+
+from config import COLOR_LUT_BITS, LOW_MEMORY_BAND_ROWS, LOW_MEMORY_BAND_FRACTION
+
 # =========================================================
 # DEFECT DETECTION MODULE (COLOR + STRUCTURAL)
 # =========================================================
 
-def rgb_to_binary_map(pixels, width, height):
-    binary_map = [[0]*width for _ in range(height)]
-    
-    # calculate global average brightness for baseline
-    total_brightness = 0
-    for y in range(height):
-        for x in range(width):
-            r, g, b = pixels[y, x]
-            total_brightness += (int(r) + int(g) + int(b))
-    
+# ---------------------------------------------------------
+# Color rules -> quantized RGB lookup table
+# ---------------------------------------------------------
+# A color rule is a conjunction of linear terms on one pixel:
+#     (coefs, divisor, op, threshold)  means  (coefs . (r, g, b)) / divisor  op  threshold
+# A set of rules (OR-ed) is compiled into a table over the quantized RGB cube
+# (2^COLOR_LUT_BITS levels per channel). Every cell holds:
+#     0 = no color in the cell matches, 1 = every color matches,
+#     2 = undecided (the cell straddles a rule boundary)
+# decided from the min / max of every term over the cell (interval bounds).
+# A mask is then ONE gather per pixel; only the few pixels in undecided cells
+# (a thin shell around each boundary) are evaluated exactly, so the result is
+# identical to evaluating the rules on every pixel. Adding a rule costs a
+# table rebuild (~262k cells), not extra per-pixel work.
+
+LUT_SHIFT = 8 - COLOR_LUT_BITS
+
+
+def binary_map_rules(dark_limit):
+    """The binary-map color rules (any match = suspicious pixel)."""
+    return (
+        # 1. Dark Anomaly (Crack/Damp) - darker than the global baseline
+        (((1, 1, 1), 3, "<", dark_limit),),
+        # 2. Rust / Corrosion - red dominance + deviation from gray
+        (((1, 0, 0), 1, ">", 100), ((1, -1, 0), 1, ">", 20), ((1, 0, -1), 1, ">", 20)),
+    )
+
+
+def _term_value(term, r, g, b):
+    coefs, divisor, _, _ = term
+    value = coefs[0] * r + coefs[1] * g + coefs[2] * b
+    return value / divisor if divisor != 1 else value
+
+
+def _term_test(term, value):
+    _, _, op, threshold = term
+    return value < threshold if op == "<" else value > threshold
+
+
+@lru_cache(maxsize=16)
+def compile_color_mask(rules):
+    """
+    Table (uint8, 0 / 1 / 2 per cell, flat index r | g | b) for OR-ed rules.
+    Built one red plane at a time, so the interval temporaries are
+    levels^2 cells, not a full cube of int64 / float64 per term.
+    """
+    levels = 1 << COLOR_LUT_BITS
+    low = (np.arange(levels, dtype=np.int64) << LUT_SHIFT)
+    high = low + (1 << LUT_SHIFT) - 1
+    green = (low.reshape(levels, 1), high.reshape(levels, 1))
+    blue = (low.reshape(1, levels), high.reshape(1, levels))
+
+    table = np.empty((levels,) * 3, dtype=np.uint8)
+    for red_level in range(levels):
+        # Per channel (min, max) of the plane's cells
+        axes = [(low[red_level], high[red_level]), green, blue]
+        sure = np.zeros((levels, levels), dtype=bool)
+        maybe = np.zeros((levels, levels), dtype=bool)
+        for rule in rules:
+            rule_sure = np.ones((levels, levels), dtype=bool)
+            rule_maybe = np.ones((levels, levels), dtype=bool)
+            for term in rule:
+                coefs = term[0]
+                # Smallest / largest value of the term in every cell
+                lo = _term_value(term, *(axes[c][0] if coefs[c] >= 0 else axes[c][1] for c in range(3)))
+                hi = _term_value(term, *(axes[c][1] if coefs[c] >= 0 else axes[c][0] for c in range(3)))
+                worst, best = (hi, lo) if term[2] == "<" else (lo, hi)
+                rule_sure &= _term_test(term, worst)
+                rule_maybe &= _term_test(term, best)
+            sure |= rule_sure
+            maybe |= rule_maybe
+        # sure implies maybe: 1 where maybe, then 2 where maybe but not sure
+        plane = table[red_level]
+        plane[...] = maybe
+        plane[maybe & ~sure] = 2
+    return table.ravel()
+
+
+def exact_color_mask(rgb, rules):
+    """Reference evaluation of OR-ed rules on (..., 3) colors (bool)."""
+    r, g, b = (rgb[..., c].astype(np.int16) for c in range(3))
+    mask = np.zeros(rgb.shape[:-1], dtype=bool)
+    for rule in rules:
+        match = np.ones(rgb.shape[:-1], dtype=bool)
+        for term in rule:
+            match &= _term_test(term, _term_value(term, r, g, b))
+        mask |= match
+    return mask
+
+
+def color_mask(rgb, rules, out=None):
+    """
+    OR of the rules on (..., 3) uint8 colors, as a uint8 0/1 array (written
+    to out if given). One table gather per pixel + exact checks of the
+    undecided ones.
+    """
+    table = compile_color_mask(rules)
+    dtype = np.uint32 if 3 * COLOR_LUT_BITS > 16 else np.uint16
+    index = (rgb[..., 0] >> LUT_SHIFT).astype(dtype)
+    index <<= 2 * COLOR_LUT_BITS
+    index |= (rgb[..., 1] >> LUT_SHIFT).astype(dtype) << COLOR_LUT_BITS
+    index |= rgb[..., 2] >> LUT_SHIFT
+    if out is None:
+        out = np.empty(rgb.shape[:-1], dtype=np.uint8)
+    np.take(table, index, out=out)
+    del index
+
+    flat = out.reshape(-1)
+    undecided = np.flatnonzero(flat == 2)
+    if undecided.size:
+        flat[undecided] = exact_color_mask(rgb.reshape(-1, 3)[undecided], rules)
+    return out
+
+
+def global_dark_limit(total_brightness, width, height):
+    """Dark-anomaly threshold from the summed r + g + b of the image."""
     if width * height > 0:
         global_avg_brightness = total_brightness / (3 * width * height)
     else:
         global_avg_brightness = 128  # Fallback
+    # Relaxed to 0.75 to detect lighter damp patches
+    return global_avg_brightness * 0.75
 
-    for y in range(height):
-        for x in range(width):
-            r, g, b = pixels[y, x]
-            brightness = (int(r) + int(g) + int(b)) / 3
-
-            # 1. Dark Anomaly (Crack/Damp) - darker than global avg
-            # Relaxed to 0.75 to detect lighter damp patches
-            if brightness < global_avg_brightness * 0.75:
-                binary_map[y][x] = 1
-                
-            # 2. Rust / Corrosion - Specific Color Rules
-            # Red dominance + Deviation from gray
-            elif (int(r) > 100 and int(r) > int(g) + 20 and int(r) > int(b) + 20):
-                binary_map[y][x] = 1
-                
-            # 3. High Contrast Anomaly (General)
-            # If a pixel is very different from its neighbors (Laplacian-like check could be here, 
-            # but per instructions, keeping it simple pixel-level first, relying on global contrast)
-            
-    return binary_map
 
+def rgb_to_binary_map(pixels, width, height, dark_limit=None):
+    # Same map as before (list of lists of 0/1); the rules run through the
+    # color lookup table on the whole array instead of per-pixel Python
+    return rgb_to_binary_map_compact(pixels, width, height, dark_limit=dark_limit).tolist()
 
 
 def detect_linear_crack(pixels, width, height):
-    dark_count = 0
-    rust_like = 0
-
-    for y in range(height):
-        for x in range(width - 1):   # ✅ SAFE LIMIT
-            r, g, b = pixels[y, x]
-            r2, g2, b2 = pixels[y, x + 1]
-
-            if r < 80 and g < 80 and b < 80:
-                dark_count += 1
-
-            if r > g and r > b and r > 100:
-                rust_like += 1
+    # Columns 0 .. width - 2 (the old pairwise loop never looked at the last one)
+    rgb = np.asarray(pixels)[:height, :max(0, width - 1)]
+    dark_count = int(np.count_nonzero(color_mask(rgb, DARK_PIXEL_RULES)))
+    rust_like = int(np.count_nonzero(color_mask(rgb, RUST_LIKE_RULES)))
 
     if dark_count > 300 and rust_like < dark_count * 0.3:
         return True
@@ -61,4 +150,59 @@ def detect_linear_crack(pixels, width, height):
     return False
 
 
+# detect_linear_crack rules: near-black pixels, and red above both other channels
+DARK_PIXEL_RULES = ((((1, 0, 0), 1, "<", 80), ((0, 1, 0), 1, "<", 80), ((0, 0, 1), 1, "<", 80)),)
+RUST_LIKE_RULES = ((((1, -1, 0), 1, ">", 0), ((1, 0, -1), 1, ">", 0), ((1, 0, 0), 1, ">", 100)),)
+
+
+# =========================================================
+# LOW-MEMORY VARIANT (uint8 map, row bands)
+# =========================================================
+# Same rules as rgb_to_binary_map, but the map is a uint8 array (1 byte per
+# pixel instead of a Python list pointer per pixel) and all arithmetic runs on
+# row bands, so temporaries never exceed a few bands.
+
+def band_rows_for(height):
+    """Row-band height used by the low-memory stages."""
+    return max(8, min(LOW_MEMORY_BAND_ROWS, height // LOW_MEMORY_BAND_FRACTION))
+
+
+def frame_dark_limit(pixels, width, height, band_rows=None, pool=None):
+    """global_dark_limit of a whole frame (exact integer sum, band by band)."""
+    band_rows = band_rows or band_rows_for(height)
+    run = pool.map if pool is not None else map
+    tops = range(0, height, band_rows)
+    total_brightness = sum(run(lambda top: int(pixels[top:top + band_rows].sum(dtype=np.int64)), tops))
+    return global_dark_limit(total_brightness, width, height)
+
+
+def rgb_to_binary_map_compact(pixels, width, height, band_rows=None, pool=None, lookup=True, dark_limit=None):
+    """
+    pool: optional thread pool (concurrent.futures); bands are then thresholded
+    in parallel (NumPy releases the GIL), each band writing its own rows.
+    lookup: threshold through the compiled color table (color_mask). False
+    evaluates the rules on every band pixel (exact_color_mask, same result):
+    slower, but no 262k-cell table, for low-memory mode.
+    dark_limit: dark-anomaly threshold to use instead of this image's own,
+    e.g. the whole frame's when `pixels` is a crop of it.
+    """
+    band_rows = band_rows or band_rows_for(height)
+    binary_map = np.zeros((height, width), dtype=np.uint8)
+    tops = range(0, height, band_rows)
+    run = pool.map if pool is not None else map
 
+    if dark_limit is None:
+        dark_limit = frame_dark_limit(pixels, width, height, band_rows, pool)
+    rules = binary_map_rules(dark_limit)
+
+    def threshold_band(top):
+        # Dark anomaly OR rust color, one table lookup per pixel
+        if lookup:
+            color_mask(pixels[top:top + band_rows], rules, out=binary_map[top:top + band_rows])
+        else:
+            binary_map[top:top + band_rows] = exact_color_mask(pixels[top:top + band_rows], rules)
+
+    for _ in run(threshold_band, tops):
+        pass
+
+    return binary_map
@@ -1,7 +1,117 @@
-from PIL import Image
+import time
+
+import numpy as np
+
+# PIL is imported inside the loaders: modules that only need as_pixel_array
+# (core.image_logic, the analysis workers) start without it.
 
 def load_image(path):
+    from PIL import Image
     img = Image.open(path).convert("RGB")
     pixels = img.load()
     width, height = img.size
     return pixels, width, height
+
+
+def load_image_array(source, target_size=None):
+    """
+    Fast decode path: decodes straight into a contiguous uint8 (H, W, 3) array.
+
+    source: file path or file-like object (e.g. a Streamlit upload).
+    target_size: optional (width, height) analysis size. The image is reduced
+        to the smallest size that still covers it. JPEGs use the decoder's
+        draft mode (DCT scaling 1/2, 1/4, 1/8), so the full-resolution image
+        is never decoded; other formats are reduced after decode.
+
+    Returns: pixels, width, height, decode_time (seconds)
+    """
+    from PIL import Image
+
+    start = time.perf_counter()
+
+    img = Image.open(source)
+    if target_size is not None:
+        target_w, target_h = target_size
+        if img.format == "JPEG":
+            # Reduced-size decode (only affects JPEG, must be called before load)
+            img.draft("RGB", (target_w, target_h))
+
+        # Integer box reduction for whatever is still too big (non-JPEG,
+        # or a draft scale that could not go low enough)
+        factor = min(img.size[0] // max(1, target_w), img.size[1] // max(1, target_h))
+        if factor >= 2:
+            if img.mode not in ("L", "RGB"):
+                # reduce() rejects palette, 1-bit and 16-bit modes
+                img = img.convert("RGB")
+            img = img.reduce(factor)
+
+    if img.mode != "RGB":
+        img = img.convert("RGB")
+
+    pixels = np.ascontiguousarray(np.array(img, dtype=np.uint8))
+    height, width, _ = pixels.shape
+
+    decode_time = time.perf_counter() - start
+    return pixels, width, height, decode_time
+
+
+def open_frame(path, width=None, height=None, channels=3, offset=0, crop=None):
+    """
+    Memory-mapped frame input for camera capture pipelines (no decode, no copy).
+
+    path: a .npy file (shape/dtype read from its header) or a raw 8-bit frame
+        file of known shape (width, height, channels, header offset).
+        Frames must be uint8: 10/12/16-bit or float sensor output has to be
+        scaled to 8 bits by the capture side (a conversion here would copy
+        the whole frame).
+    crop: optional (top, left, crop_height, crop_width) window. Only the file
+        pages under that window are ever read, so tiles of very large frames
+        can be analyzed without loading the frame.
+
+    Returns: pixels (zero-copy (H, W, C) view of the file), width, height
+    """
+    if str(path).lower().endswith(".npy"):
+        frame = np.load(path, mmap_mode="r")
+    else:
+        if width is None or height is None:
+            raise ValueError("Raw frames need width and height")
+        frame = np.memmap(path, dtype=np.uint8, mode="r", offset=offset, shape=(height, width, channels))
+
+    if frame.ndim != 3 or frame.shape[2] < 3:
+        raise ValueError(f"Expected an (H, W, 3) frame, got shape {frame.shape}")
+    if frame.dtype != np.uint8:
+        raise ValueError(f"Expected a uint8 frame, got {frame.dtype} (scale it to 8 bits before saving)")
+
+    if crop is not None:
+        top, left, crop_h, crop_w = crop
+        frame = frame[top:top + crop_h, left:left + crop_w]
+
+    pixels = as_pixel_array(frame)
+    height, width, _ = pixels.shape
+    return pixels, width, height
+
+
+def as_pixel_array(pixels):
+    """
+    Normalizes pipeline input to a plain uint8 (H, W, 3) ndarray.
+
+    np.memmap inputs are returned as ndarray VIEWS (still backed by the file):
+    indexing a memmap subclass wraps every slice in a new memmap object, which
+    is very slow in the per-pixel DFS. Extra channels are dropped (still a
+    view). Other dtypes are copied to uint8 only if every value already lies
+    in 0..255; anything else (e.g. a 12/16-bit sensor frame) raises
+    ValueError instead of being clipped into a wrong image.
+    """
+    if isinstance(pixels, np.memmap):
+        pixels = pixels.view(np.ndarray)
+    else:
+        pixels = np.asarray(pixels)
+
+    if pixels.shape[2] > 3:
+        pixels = pixels[:, :, :3] # Drop alpha/extra channels (still a view)
+    if pixels.dtype != np.uint8:
+        if pixels.size and (pixels.min() < 0 or pixels.max() > 255):
+            raise ValueError(f"Expected 8-bit pixel values (0..255), got {pixels.dtype} values up to "
+                             f"{pixels.max()}; scale the frame to 8 bits first")
+        pixels = pixels.astype(np.uint8)
+    return pixels
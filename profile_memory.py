@@ -0,0 +1,55 @@
+"""
+Peak traced memory per pipeline stage, normal vs low-memory mode.
+
+    python profile_memory.py                 # synthetic 400x300 pipe image
+    python profile_memory.py pipe.jpg        # a real image
+    python profile_memory.py --size 2000x1500
+"""
+import argparse
+
+import numpy as np
+
+from core.image_logic import process_image_logic
+from core.memory_profile import StageMemoryProfiler, format_report
+from defect_detection import compile_color_mask
+from input_module import load_image_array
+
+
+def synthetic_pipe(width, height, seed=0):
+    # Horizontal pipe: bright center highlight, a diagonal crack, a rust patch
+    rng = np.random.default_rng(seed)
+    profile = np.sin(np.linspace(0, np.pi, height)) * 120 + 60
+    pixels = np.repeat(np.repeat(profile[:, None, None], width, 1), 3, 2)
+    pixels = np.clip(pixels + rng.normal(0, 6, pixels.shape), 0, 255).astype(np.uint8)
+    for i in range(width // 2):
+        r = height // 5 + i * height // (2 * width)
+        pixels[r:r + 2, width // 5 + i] = 15
+    pixels[height // 2:height // 2 + height // 10, 3 * width // 4:3 * width // 4 + width // 12] = (160, 60, 40)
+    return pixels
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Per-stage peak memory of process_image_logic")
+    parser.add_argument("image", nargs="?", default=None)
+    parser.add_argument("--size", default="400x300", help="synthetic image WIDTHxHEIGHT")
+    args = parser.parse_args()
+
+    if args.image:
+        pixels, width, height, _ = load_image_array(args.image)
+    else:
+        width, height = (int(v) for v in args.size.split("x"))
+        pixels = synthetic_pipe(width, height)
+
+    for low_memory in (False, True):
+        compile_color_mask.cache_clear() # Each mode pays its own color-table compile
+        with StageMemoryProfiler(pixels.nbytes) as profiler:
+            result = process_image_logic(pixels, width, height, "PROFILE", low_memory=low_memory, profiler=profiler,
+                                         time_budget=0, max_regions=0) # every stage at full size
+        print(f"\n=== {'LOW-MEMORY' if low_memory else 'NORMAL'} MODE: {result['final_defect']} ===")
+        print(format_report(profiler.report(), pixels.nbytes))
+        print(f"Overall peak: {profiler.peak_bytes() / 1e6:.1f} MB "
+              f"({profiler.peak_bytes() / pixels.nbytes:.2f}x input)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Fleet-wide priority ranking from per-worker shards.
+
+    python rank_fleet.py inbox_a/.top_k.jsonl inbox_b/.top_k.jsonl --k 20
+    python rank_fleet.py site1/results.jsonl site2/results.csv --k 50 --json
+
+Inputs can be top-k shards (service.watch_folder --top-k), watch-folder
+ledgers or JSONL / CSV exports (core.exporters). Every input is reduced to
+its own top-k with a bounded heap while it is streamed, then the sorted
+shards are combined with a k-way merge (severity_priority.merge_top_k).
+Memory: k entries per input, whatever the number of images behind them.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+
+from severity_priority import TopK, merge_top_k, read_shard
+
+ENTRY_FIELDS = ["pipe_id", "final_defect", "priority_score", "affected_percentage", "file_name", "key"]
+
+
+def _number(value):
+    value = float(value)
+    return int(value) if value.is_integer() else value
+
+
+def read_entries(path):
+    """Yields ranking entries (pipe_id, priority_score, ...) from a shard, ledger or export."""
+    if path.lower().endswith(".csv"):
+        with open(path, encoding="utf-8", newline="") as f:
+            rows = csv.DictReader(f)
+            for row in rows:
+                if row.get("priority_score") not in (None, ""):
+                    yield row
+        return
+    for record in read_shard(path):
+        if "priority_score" in record:
+            yield record
+
+
+def to_entry(record):
+    entry = {field: record.get(field) for field in ENTRY_FIELDS}
+    entry["priority_score"] = _number(entry["priority_score"])
+    if entry["affected_percentage"] not in (None, ""):
+        entry["affected_percentage"] = _number(entry["affected_percentage"])
+    if not entry["pipe_id"]:
+        entry["pipe_id"] = os.path.splitext(entry["file_name"] or "")[0]
+    return entry
+
+
+def rank(paths, k):
+    """Global top-k over the given inputs, highest priority first."""
+    shards = [TopK(k).extend(to_entry(record) for record in read_entries(path)).items() for path in paths]
+    return merge_top_k(shards, k)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Merge per-worker priority shards into one fleet top-k")
+    parser.add_argument("inputs", nargs="+", help="top-k shards, watch-folder ledgers or .jsonl/.csv exports")
+    parser.add_argument("--k", type=int, default=20, help="entries in the ranking")
+    parser.add_argument("--json", action="store_true", help="print JSON lines instead of a table")
+    args = parser.parse_args()
+
+    missing = [path for path in args.inputs if not os.path.exists(path)]
+    if missing:
+        parser.error(f"not found: {', '.join(missing)}")
+
+    ranking = rank(args.inputs, args.k)
+    if args.json:
+        for entry in ranking:
+            print(json.dumps(entry))
+        return
+    for position, entry in enumerate(ranking, 1):
+        print(f"{position:>4}. {entry['priority_score']:>8}  {str(entry['final_defect']):<10} {entry['pipe_id']}")
+    if not ranking:
+        print("No ranked results.", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,5 @@
+from array import array
+
 def dfs(binary_map, pixels, visited, i, j, height, width):
     stack = [(i, j)]
     visited[i][j] = True
@@ -7,6 +9,8 @@ def dfs(binary_map, pixels, visited, i, j, height, width):
     r_sum = int(0)
     g_sum = int(0)
     b_sum = int(0)
+    row_sum = 0
+    col_sum = 0
 
 
     min_i = max_i = i
@@ -21,7 +25,8 @@ def dfs(binary_map, pixels, visited, i, j, height, width):
         r_sum += int(r)
         g_sum += int(g)
         b_sum += int(b)
-
+        row_sum += x
+        col_sum += y
 
         min_i = min(min_i, x)
         max_i = max(max_i, x)
@@ -58,4 +63,64 @@ def dfs(binary_map, pixels, visited, i, j, height, width):
     # Thin/diagonal shapes (cracks) ~ low solidity relative to bbox (unless perfectly vertical/horizontal)
     rectangularity = area / bbox_area if bbox_area > 0 else 0
 
-    return area, length, avg_color, min_i, min_j, max_i, max_j, rectangularity
+    # Centroid (mean row, mean col) of the region pixels
+    centroid = (row_sum / area, col_sum / area)
+
+    return area, length, avg_color, min_i, min_j, max_i, max_j, rectangularity, centroid
+
+
+def dfs_compact(binary_flat, pixels_flat, visited_flat, start, height, width):
+    """
+    Same as dfs, for the low-memory pipeline:
+    binary_flat / visited_flat are flat uint8 / bool arrays (1 byte per pixel),
+    pixels_flat is the (H*W, 3) view of the image, and the stack holds flat
+    indices in a typed array (4 bytes per entry instead of a tuple object).
+    """
+    stack = array("i", [start])
+    visited_flat[start] = True
+    n = height * width
+
+    area = 0
+    length = 0
+    r_sum = g_sum = b_sum = 0
+    row_sum = col_sum = 0
+
+    min_i = max_i = start // width
+    min_j = max_j = start % width
+
+    while stack:
+        idx = stack.pop()
+        x, y = divmod(idx, width)
+        area += 1
+
+        r, g, b = pixels_flat[idx]
+        r_sum += int(r)
+        g_sum += int(g)
+        b_sum += int(b)
+        row_sum += x
+        col_sum += y
+
+        if x < min_i: min_i = x
+        if x > max_i: max_i = x
+        if y < min_j: min_j = y
+        if y > max_j: max_j = y
+
+        local_links = 0
+        # Up / Down / Left / Right
+        for nidx, inside in ((idx - width, x > 0), (idx + width, idx + width < n),
+                             (idx - 1, y > 0), (idx + 1, y < width - 1)):
+            if inside and binary_flat[nidx] == 1:
+                local_links += 1
+                if not visited_flat[nidx]:
+                    visited_flat[nidx] = True
+                    stack.append(nidx)
+
+        if local_links >= 2:
+            length += 1
+
+    avg_color = (r_sum // area, g_sum // area, b_sum // area)
+    bbox_area = ((max_j - min_j) + 1) * ((max_i - min_i) + 1)
+    rectangularity = area / bbox_area if bbox_area > 0 else 0
+    centroid = (row_sum / area, col_sum / area)
+
+    return area, length, avg_color, min_i, min_j, max_i, max_j, rectangularity, centroid
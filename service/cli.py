@@ -0,0 +1,381 @@
+"""
+Fast-start command-line analysis, with an optional warm worker.
+
+    python -m service.cli pipe.jpg                 # one-off (cold) analysis
+    python -m service.cli --serve &                # start the warm worker
+    python -m service.cli pipe.jpg --warm          # use the warm worker
+    python -m service.cli pipe.jpg --benchmark 5   # cold vs warm latency
+
+The client only imports the standard library. numpy, Pillow and the core
+modules are imported lazily, and only where the analysis actually runs
+(never the ui package, streamlit or pandas).
+
+--serve keeps one interpreter with everything imported and listens on a local
+socket (a Unix socket, or 127.0.0.1 where those are not available). --warm
+sends the image path there and prints the JSON answer. If no worker is
+listening, --warm analyzes in-process and starts a worker for the next call.
+"""
+import argparse
+import json
+import os
+import signal
+import socket
+import socketserver
+import subprocess
+import sys
+import time
+
+START_TIME = time.perf_counter()
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+DEFAULT_SOCKET = os.path.join(os.environ.get("XDG_RUNTIME_DIR") or "/tmp", f"pipe-defect-{os.getuid() if hasattr(os, 'getuid') else 'user'}.sock")
+DEFAULT_PORT = 8765
+HAS_UNIX_SOCKETS = hasattr(socket, "AF_UNIX")
+
+
+# =========================================================
+# ANALYSIS (lazy imports, runs in the CLI or in the worker)
+# =========================================================
+
+def analyze_path(path, pipe_id=None, max_side=None, include_regions=False, workers=None, quick=None, prior=None,
+                 preset=None):
+    """
+    Decodes + analyzes one image file. Returns a JSON-ready dict.
+    workers: threads for this one image (process_image_logic workers),
+        default min(4, CPU count).
+    quick: triage threshold (affected %); a sampled quick look runs first and
+        the full analysis only if the estimate may reach it (core.quick_look).
+    prior: JSONL export holding an earlier inspection of the same pipe id (with
+        regions and mask); only the areas that changed since then are
+        re-analyzed (core.change_detection). Takes precedence over quick.
+    preset: speed / quality preset (config.ANALYSIS_PRESETS, None = default).
+    """
+    import_start = time.perf_counter()
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    from core.image_logic import process_image_logic
+    from core.serialization import result_to_dict, to_builtin
+    from input_module import load_image_array, open_frame
+    import_time = time.perf_counter() - import_start
+
+    target_size = (max_side, max_side * 3 // 4) if max_side else None
+    if path.lower().endswith(".npy"):
+        decode_start = time.perf_counter()
+        pixels, width, height = open_frame(path)
+        decode_time = time.perf_counter() - decode_start
+    else:
+        pixels, width, height, decode_time = load_image_array(path, target_size)
+
+    start = time.perf_counter()
+    workers = workers or min(4, os.cpu_count() or 1)
+    pipe_id = pipe_id or os.path.splitext(os.path.basename(path))[0]
+    previous = None
+    if prior:
+        from core.change_detection import load_prior
+        previous = load_prior(prior, pipe_id)
+    if previous is not None:
+        from core.change_detection import analyze_change
+        result = analyze_change(pixels, width, height, pipe_id, *previous, workers=workers, config=preset)
+    elif quick is not None:
+        from config import QUICK_LOOK_MIN_AFFECTED
+        from core.quick_look import triage
+        min_affected = quick if quick >= 0 else QUICK_LOOK_MIN_AFFECTED # --quick without a value
+        result = triage(pixels, width, height, pipe_id, min_affected=min_affected, workers=workers,
+                        config=preset)
+    else:
+        result = process_image_logic(pixels, width, height, pipe_id, workers=workers, config=preset)
+    analysis_time = time.perf_counter() - start
+
+    out = result_to_dict(result, include_regions=include_regions, include_sample=False)
+    if "quick_look" in result:
+        out["quick_look"] = to_builtin(result["quick_look"])
+    if "change" in result:
+        out["change"] = to_builtin(result["change"])
+    elif prior:
+        out["change"] = {"registered": False, "reason": f"no prior inspection of {pipe_id} with mask and regions"}
+    out["file"] = os.path.abspath(path)
+    out["import_time"] = round(import_time, 4)
+    out["decode_time"] = round(decode_time, 4)
+    out["analysis_time"] = round(analysis_time, 4)
+    return out
+
+
+# =========================================================
+# WARM WORKER (one request = one JSON line each way)
+# =========================================================
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        line = self.rfile.readline()
+        if not line:
+            return
+        try:
+            request = json.loads(line)
+            if request.get("command") == "ping":
+                response = {"status": "ok", "pid": os.getpid()}
+            else:
+                response = analyze_path(
+                    request["path"], request.get("pipe_id"),
+                    request.get("max_side"), request.get("regions", False), request.get("workers"),
+                    request.get("quick"), request.get("prior"), request.get("preset")
+                )
+        except Exception as e:
+            response = {"error": f"{type(e).__name__}: {e}"}
+        self.server.last_request = time.monotonic()
+        self.wfile.write((json.dumps(response) + "\n").encode("utf-8"))
+
+
+if HAS_UNIX_SOCKETS:
+    class WorkerServer(socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+else:
+    class WorkerServer(socketserver.ThreadingTCPServer):
+        daemon_threads = True
+        allow_reuse_address = True
+
+
+def worker_address(socket_arg=None):
+    """Unix socket path, or ("127.0.0.1", port) where Unix sockets are not available."""
+    if HAS_UNIX_SOCKETS:
+        return socket_arg or DEFAULT_SOCKET
+    return ("127.0.0.1", int(socket_arg or DEFAULT_PORT))
+
+
+def serve(socket_arg=None, idle_timeout=None):
+    # Pay every import once, before the first request
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    import core.image_logic  # noqa: F401
+    import core.serialization  # noqa: F401
+    import input_module
+    from PIL import Image  # noqa: F401
+
+    address = worker_address(socket_arg)
+    if HAS_UNIX_SOCKETS and os.path.exists(address):
+        if _ping(socket_arg):
+            print(f"Worker already running on {address}", file=sys.stderr)
+            return
+        os.unlink(address) # Stale socket from a killed worker
+
+    # kill / service stop: leave through the finally below (removes the socket)
+    signal.signal(signal.SIGTERM, lambda *_: sys.exit(0))
+    server = WorkerServer(address, WorkerHandler)
+    server.last_request = time.monotonic()
+    server.timeout = 1.0
+    print(f"Warm worker ready on {address} (pid {os.getpid()})", file=sys.stderr)
+    try:
+        while True:
+            server.handle_request()
+            if idle_timeout and time.monotonic() - server.last_request > idle_timeout:
+                print("Idle timeout, stopping worker", file=sys.stderr)
+                break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        if HAS_UNIX_SOCKETS and os.path.exists(address):
+            os.unlink(address)
+
+
+def _connect(address, timeout):
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    else:
+        sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    sock.connect(address)
+    return sock
+
+
+def _request(socket_arg, request, timeout=None):
+    """Sends one request to the worker. Returns the response dict, or None if no worker is listening."""
+    try:
+        sock = _connect(worker_address(socket_arg), timeout)
+    except OSError:
+        return None
+    with sock, sock.makefile("rwb") as stream:
+        stream.write((json.dumps(request) + "\n").encode("utf-8"))
+        stream.flush()
+        line = stream.readline()
+    return json.loads(line) if line else None
+
+
+def _ping(socket_arg):
+    return _request(socket_arg, {"command": "ping"}, timeout=1.0) is not None
+
+
+def start_worker(socket_arg, idle_timeout):
+    """Starts a detached worker process (returns immediately)."""
+    args = [sys.executable, "-m", "service.cli", "--serve"]
+    if socket_arg:
+        args += ["--socket", str(socket_arg)]
+    if idle_timeout:
+        args += ["--idle-timeout", str(idle_timeout)]
+    subprocess.Popen(args, cwd=ROOT_DIR, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                     stderr=subprocess.DEVNULL, start_new_session=True)
+
+
+def wait_for_worker(socket_arg, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if _ping(socket_arg):
+            return True
+        time.sleep(0.05)
+    return False
+
+
+# =========================================================
+# LATENCY BENCHMARK (cold process vs warm worker)
+# =========================================================
+
+def _median(values):
+    ordered = sorted(values)
+    mid = len(ordered) // 2
+    return ordered[mid] if len(ordered) % 2 else (ordered[mid - 1] + ordered[mid]) / 2
+
+
+def benchmark(path, runs, socket_arg, idle_timeout, analysis_args=()):
+    """Wall time of complete CLI invocations (interpreter start included)."""
+    base = [sys.executable, "-m", "service.cli", os.path.abspath(path), "--quiet", *analysis_args]
+    if socket_arg:
+        base += ["--socket", str(socket_arg)]
+
+    def timed(args):
+        start = time.perf_counter()
+        subprocess.run(args, cwd=ROOT_DIR, check=True, stdout=subprocess.DEVNULL)
+        return time.perf_counter() - start
+
+    cold = [timed(base) for _ in range(runs)]
+
+    if not _ping(socket_arg):
+        start_worker(socket_arg, idle_timeout)
+        if not wait_for_worker(socket_arg):
+            raise RuntimeError("Warm worker did not start")
+    warm = [timed(base + ["--warm"]) for _ in range(runs)]
+
+    return {
+        "file": os.path.abspath(path),
+        "runs": runs,
+        "cold_median_s": round(_median(cold), 4),
+        "cold_max_s": round(max(cold), 4),
+        "warm_median_s": round(_median(warm), 4),
+        "warm_max_s": round(max(warm), 4),
+    }
+
+
+# =========================================================
+# CLI
+# =========================================================
+
+def print_result(result, as_json):
+    if as_json:
+        print(json.dumps(result, indent=2))
+        return
+    if "error" in result:
+        print(f"ERROR: {result['error']}")
+        return
+    print(f"{result.get('pipe_id') or os.path.basename(result['file'])}: {result['final_defect']}")
+    print(f"  {result['explanation']}")
+    if "priority_score" in result:
+        print(f"  Affected: {result['affected_percentage']}%  Priority: {result['priority_score']}")
+    if "quick_look" in result:
+        look = result["quick_look"]
+        low, high = look["affected_percentage_ci"]
+        print(f"  Quick look: ~{look['affected_percentage']}% affected (CI {low}-{high}%, "
+              f"{look['samples']} samples, {look['seconds']*1000:.1f} ms)")
+    if "change" in result:
+        change = result["change"]
+        if change["registered"]:
+            print(f"  Change vs prior: {change['new']} new, {change['grown']} grown, {change['unchanged']} unchanged, "
+                  f"{change['resolved']} resolved ({change['analyzed_fraction']*100:.0f}% re-analyzed)")
+        else:
+            print(f"  Change vs prior: not compared ({change.get('reason', 'image does not register to the prior')}), full analysis")
+
+
+def main(argv=None):
+    if ROOT_DIR not in sys.path:
+        sys.path.insert(0, ROOT_DIR)
+    from config import ANALYSIS_PRESETS, DEFAULT_PRESET # Constants only (no numpy)
+
+    parser = argparse.ArgumentParser(description="Analyze one pipe image from the command line.")
+    parser.add_argument("image", nargs="?", help="image file (JPG/PNG) or .npy frame")
+    parser.add_argument("--pipe-id", default=None)
+    parser.add_argument("--max-side", type=int, default=None, help="analyze at reduced size (longest side)")
+    parser.add_argument("--regions", action="store_true", help="include the per-region table")
+    parser.add_argument("--workers", type=int, default=None, help="threads for the image (default min(4, CPUs))")
+    parser.add_argument("--quick", type=float, nargs="?", const=-1, default=None, metavar="MIN_AFFECTED",
+                        help="quick-look triage: full analysis only if the estimated affected %% may reach "
+                             "MIN_AFFECTED (default config.QUICK_LOOK_MIN_AFFECTED)")
+    parser.add_argument("--prior", default=None, metavar="EXPORT",
+                        help="JSONL export with the previous inspection of this pipe (--export-regions --export-mask): "
+                             "re-analyze only what changed")
+    parser.add_argument("--preset", default=None, choices=sorted(ANALYSIS_PRESETS),
+                        help=f"speed / quality preset (default {DEFAULT_PRESET})")
+    parser.add_argument("--json", action="store_true", help="print the full JSON result")
+    parser.add_argument("--quiet", action="store_true", help="no output (for timing)")
+    parser.add_argument("--warm", action="store_true", help="use (or start) the warm worker")
+    parser.add_argument("--serve", action="store_true", help="run the warm worker")
+    parser.add_argument("--socket", default=None,
+                        help=f"worker socket path (Unix, default {DEFAULT_SOCKET}) or port (elsewhere, default {DEFAULT_PORT})")
+    parser.add_argument("--idle-timeout", type=float, default=900.0,
+                        help="seconds without requests before the worker exits (0 = never)")
+    parser.add_argument("--benchmark", type=int, default=0, metavar="N",
+                        help="report cold vs warm latency over N runs each")
+    args = parser.parse_args(argv)
+
+    if args.serve:
+        serve(args.socket, args.idle_timeout)
+        return 0
+    if not args.image:
+        parser.error("an image path is required")
+
+    if args.benchmark:
+        analysis_args = []
+        if args.max_side:
+            analysis_args += ["--max-side", str(args.max_side)]
+        if args.workers:
+            analysis_args += ["--workers", str(args.workers)]
+        if args.quick is not None:
+            analysis_args += ["--quick", str(args.quick)]
+        if args.prior:
+            analysis_args += ["--prior", os.path.abspath(args.prior)]
+        if args.preset:
+            analysis_args += ["--preset", args.preset]
+        report = benchmark(args.image, args.benchmark, args.socket, args.idle_timeout, analysis_args)
+        print(json.dumps(report, indent=2))
+        return 0
+
+    mode = "cold"
+    result = None
+    if args.warm:
+        request = {"path": os.path.abspath(args.image), "pipe_id": args.pipe_id,
+                   "max_side": args.max_side, "regions": args.regions, "workers": args.workers, "quick": args.quick,
+                   "prior": os.path.abspath(args.prior) if args.prior else None, "preset": args.preset}
+        result = _request(args.socket, request)
+        if result is not None:
+            mode = "warm"
+        else:
+            # Nobody listening: answer now, warm up a worker for the next call
+            start_worker(args.socket, args.idle_timeout)
+
+    if result is None:
+        try:
+            result = analyze_path(args.image, args.pipe_id, args.max_side, args.regions, args.workers, args.quick,
+                                  args.prior, args.preset)
+        except Exception as e: # Same answer as the worker gives
+            result = {"error": f"{type(e).__name__}: {e}"}
+    result["mode"] = mode
+    result["total_time"] = round(time.perf_counter() - START_TIME, 4)
+
+    if not args.quiet:
+        print_result(result, args.json)
+        if not args.json and "error" not in result:
+            print(f"  [{mode}] total {result['total_time']*1000:.0f} ms "
+                  f"(imports {result['import_time']*1000:.0f} ms, decode {result['decode_time']*1000:.0f} ms, "
+                  f"analysis {result['analysis_time']*1000:.0f} ms)")
+    return 1 if "error" in result else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,300 @@
+"""
+Shared-memory frame ring between decoder and analysis processes.
+
+    decoders (processes) --frames--> [ring of shared-memory slots] --views--> analyzers (processes)
+
+Decoding and analysis run in separate processes, so JPEG decoding never
+competes with process_image_logic inside one interpreter, and pixel arrays
+are never pickled: a decoder writes the frame into a free slot of one
+SharedMemory block, analyzers wrap the slot in a zero-copy NumPy view.
+Only small messages cross process boundaries:
+
+    jobs    (job, key, path)                                    -> decoders
+    ready   (slot, job, key, path, height, width, decode_time)  -> analyzers
+    free    slot                                                -> decoders
+    results (job, key, path, result dict)                       -> caller
+
+A slot goes back to the free queue as soon as its frame is analyzed. When
+every slot is in use, decoders block on the free queue, and submit() blocks
+once queue_size jobs are waiting (backpressure, like the watch-folder queues).
+
+Every process publishes the job it works on in a small shared array. When a
+process dies (OOM kill, crash in a decoder), get_result() reports that job
+as an error result with "lost": True and restarts the processes on fresh
+queues with every other unfinished job, so a dead process can neither keep
+a slot or queue lock nor leave the caller waiting for a result forever.
+
+    with FrameRingPipeline(workers=4, decoders=2) as pipeline:
+        pipeline.submit(key, path)
+        key, path, result = pipeline.get_result()
+"""
+import multiprocessing as mp
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+# Largest frame a slot holds by default (12 MP RGB). Shared memory pages are
+# only allocated when a frame is written, so unused capacity costs nothing.
+DEFAULT_SLOT_PIXELS = 4000 * 3000
+
+
+# =========================================================
+# RING (fixed-size slots in one shared-memory block)
+# =========================================================
+
+class FrameRing:
+    """
+    slots x slot_bytes of shared memory. The creating process owns (and
+    unlinks) the block; other processes attach by name.
+    """
+
+    def __init__(self, slots, slot_bytes, name=None):
+        self.slots = slots
+        self.slot_bytes = slot_bytes
+        if name is None:
+            self.shm = SharedMemory(create=True, size=slots * slot_bytes)
+            self.owner = True
+        else:
+            # Children share the owner's resource tracker, so the owner's
+            # unlink is the only cleanup the block gets
+            self.shm = SharedMemory(name=name)
+            self.owner = False
+
+    @property
+    def name(self):
+        return self.shm.name
+
+    def view(self, slot, height, width):
+        """(height, width, 3) uint8 array over the slot's memory (no copy)."""
+        if height * width * 3 > self.slot_bytes:
+            raise ValueError(f"{width}x{height} frame does not fit a {self.slot_bytes / 1e6:.1f} MB ring slot")
+        return np.ndarray((height, width, 3), dtype=np.uint8, buffer=self.shm.buf, offset=slot * self.slot_bytes)
+
+    def close(self):
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# =========================================================
+# PROCESS LOOPS
+# =========================================================
+
+# Job each process is working on (shared array, one entry per process), IDLE = none
+IDLE = -1
+
+
+def decoder_loop(index, holdings, ring_name, slots, slot_bytes, jobs, free, ready, results, target_size):
+    from service.watch_folder import decode_file
+
+    ring = FrameRing(slots, slot_bytes, ring_name)
+    try:
+        while True:
+            message = jobs.get()
+            if message is None:
+                return
+            job, key, path = message
+            holdings[index] = job
+            try:
+                pixels, width, height, decode_time = decode_file(path, target_size)
+                if height * width * 3 > slot_bytes:
+                    raise ValueError(f"{width}x{height} frame does not fit a {slot_bytes / 1e6:.1f} MB ring slot")
+                slot = free.get() # Blocks while every slot is in use
+                start = time.perf_counter()
+                np.copyto(ring.view(slot, height, width), pixels[:, :, :3])
+                del pixels
+                ready.put((slot, job, key, path, height, width, decode_time + time.perf_counter() - start))
+            except Exception as e:
+                results.put((job, key, path, {"error": f"Decode failed: {type(e).__name__}: {e}"}))
+            holdings[index] = IDLE
+    finally:
+        ring.close()
+
+
+def analyzer_loop(index, holdings, ring_name, slots, slot_bytes, ready, free, results, keep_regions, keep_mask,
+                  preset):
+    from service.watch_folder import analyze_pixels
+
+    ring = FrameRing(slots, slot_bytes, ring_name)
+    try:
+        while True:
+            message = ready.get()
+            if message is None:
+                return
+            slot, job, key, path, height, width, decode_time = message
+            holdings[index] = job
+            pipe_id = os.path.splitext(os.path.basename(path))[0]
+            try:
+                # The result holds no reference to the view (maps / tables are new arrays)
+                result = analyze_pixels(ring.view(slot, height, width), width, height, pipe_id,
+                                        keep_regions, keep_mask, preset)
+                result["decode_time"] = decode_time
+            except Exception as e:
+                result = {"error": f"Analysis failed: {type(e).__name__}: {e}"}
+            finally:
+                free.put(slot)
+            results.put((job, key, path, result))
+            holdings[index] = IDLE
+    finally:
+        ring.close()
+
+
+# =========================================================
+# PIPELINE (caller side)
+# =========================================================
+
+class FrameRingPipeline:
+    """
+    workers:     analysis processes
+    decoders:    decoder processes
+    slots:       ring slots (default workers + decoders: every analyzer busy
+                 while every decoder holds its next frame)
+    slot_pixels: largest frame (width x height) a slot holds; bigger frames
+                 fail with an error result (decode them reduced, target_size)
+    queue_size:  jobs waiting beyond the ones in progress before submit() blocks
+    target_size: reduced-size decode (see input_module.load_image_array)
+    keep_regions / keep_mask: extras of watch_folder.analyze_pixels
+    preset:      speed / quality preset of the analysis (config.ANALYSIS_PRESETS)
+    poll:        seconds between process health checks while get_result() waits
+    """
+
+    def __init__(self, workers=2, decoders=2, slots=None, slot_pixels=None, queue_size=8,
+                 target_size=None, keep_regions=False, keep_mask=False, preset=None, poll=0.5):
+        self.workers = workers
+        self.decoders = decoders
+        self.poll = poll
+        self.target_size = target_size
+        self.analysis_args = (keep_regions, keep_mask, preset)
+        self.ring = FrameRing(slots or workers + decoders, (slot_pixels or DEFAULT_SLOT_PIXELS) * 3)
+        self.ctx = mp.get_context()
+        self.holdings = self.ctx.Array("q", [IDLE] * (decoders + workers), lock=False)
+
+        # submit() / get_result() may run on different threads (watch folder)
+        self.lock = threading.Lock()
+        self.queue_size = queue_size
+        self.outstanding = {} # job -> (key, path), until its result is handed out
+        self.lost = deque()   # error results of jobs whose process died
+        self.next_job = 0
+        self.restarts = 0
+        self._start_processes()
+
+    def _start_processes(self):
+        """Fresh queues (all slots free) and processes."""
+        ctx = self.ctx
+        self.jobs = ctx.Queue(self.queue_size + len(self.outstanding)) # Room for the jobs resent on a restart
+        self.ready = ctx.Queue()
+        self.free = ctx.Queue()
+        self.results = ctx.Queue()
+        for slot in range(self.ring.slots):
+            self.free.put(slot)
+        for index in range(len(self.holdings)):
+            self.holdings[index] = IDLE
+
+        ring_args = (self.ring.name, self.ring.slots, self.ring.slot_bytes)
+        specs = [(decoder_loop, f"decoder-{i}", ring_args + (self.jobs, self.free, self.ready, self.results,
+                                                             self.target_size))
+                 for i in range(self.decoders)]
+        specs += [(analyzer_loop, f"analyzer-{i}", ring_args + (self.ready, self.free, self.results)
+                   + self.analysis_args)
+                  for i in range(self.workers)]
+        self.processes = [ctx.Process(target=target, name=name, daemon=True, args=(index, self.holdings) + args)
+                          for index, (target, name, args) in enumerate(specs)]
+        for process in self.processes:
+            process.start()
+
+    def submit(self, key, path):
+        """Queues one file (blocks while queue_size jobs are waiting)."""
+        with self.lock:
+            job = self.next_job
+            self.next_job += 1
+            self.outstanding[job] = (key, path)
+            jobs = self.jobs
+        while True:
+            try:
+                jobs.put((job, key, path), timeout=self.poll)
+                return
+            except (queue.Full, ValueError): # Full, or closed by a restart
+                self._check_processes()
+                with self.lock:
+                    if self.jobs is not jobs: # The restart has resent the job
+                        return
+
+    def get_result(self, timeout=None):
+        """
+        Next finished (key, path, result), in completion order; None on timeout.
+        A job whose process died comes back as {"error": ..., "lost": True}.
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            self._check_processes()
+            if self.lost:
+                return self.lost.popleft()
+            wait = self.poll if deadline is None else min(self.poll, deadline - time.monotonic())
+            try:
+                job, key, path, result = self.results.get(timeout=max(0, wait))
+                with self.lock:
+                    if self.outstanding.pop(job, None) is not None: # Not already reported as lost
+                        return key, path, result
+            except queue.Empty:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return None
+
+    def _check_processes(self):
+        """
+        After a process died: its job is reported lost, every other process is
+        stopped and a fresh set takes over the remaining jobs. A dead process
+        may still hold a queue's reader lock or a ring slot, so the queues and
+        slots are not reused; jobs in progress elsewhere simply run again.
+        """
+        with self.lock:
+            dead = [index for index, process in enumerate(self.processes) if process.exitcode is not None]
+            if not dead:
+                return
+            for index in dead:
+                job = self.holdings[index]
+                if job != IDLE and job in self.outstanding:
+                    key, path = self.outstanding.pop(job)
+                    process = self.processes[index]
+                    self.lost.append((key, path, {"error": f"{process.name} process died (exit code {process.exitcode})",
+                                                  "lost": True}))
+            for process in self.processes:
+                process.kill()
+                process.join()
+            for old in (self.jobs, self.ready, self.free, self.results):
+                old.cancel_join_thread() # Nobody reads them any more (left open for a get() in progress)
+            self._start_processes()
+            for job, (key, path) in sorted(self.outstanding.items()):
+                self.jobs.put((job, key, path))
+            self.restarts += 1
+
+    def close(self, timeout=30):
+        """Stops the processes (after the queued work) and frees the ring. Drain get_result() first."""
+        # Decoders first (their frames still reach the analyzers), then analyzers
+        for _ in range(self.decoders):
+            self.jobs.put(None)
+        for process in self.processes[:self.decoders]:
+            process.join(timeout)
+        for _ in range(self.workers):
+            self.ready.put(None)
+        for process in self.processes[self.decoders:]:
+            process.join(timeout)
+        for process in self.processes:
+            if process.is_alive(): # e.g. blocked on undrained results
+                process.terminate()
+        self.ring.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
@@ -0,0 +1,354 @@
+"""
+Local HTTP inference service (standard library only).
+
+    python -m service.http_server --port 8080 --workers 4
+
+Endpoints:
+    POST /analyze?pipe_id=PIPE_001&max_side=1024&regions=1
+         body = raw image bytes (JPG/PNG), e.g.
+         curl --data-binary @pipe.jpg http://localhost:8080/analyze
+    GET  /stats   -> queue depth, batch sizes, latency percentiles
+    GET  /health  -> {"status": "ok"}
+
+Requests go into a bounded queue. A batcher thread groups concurrent
+requests into micro-batches and hands them to a process pool running
+process_image_logic. When the queue is full the server answers 503 with
+Retry-After (backpressure) instead of queueing unbounded work. Bodies larger
+than --max-body-mb are refused with 413 before any of them is read.
+"""
+import argparse
+import io
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, Future
+from concurrent.futures.process import BrokenProcessPool
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+import numpy as np
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import ANALYSIS_PRESETS, DEFAULT_PRESET
+from core.image_logic import process_image_logic
+from core.batch import process_batch
+from core.serialization import result_to_dict
+from input_module import load_image_array
+
+
+# =========================================================
+# WORKER SIDE (runs inside pool processes)
+# =========================================================
+
+def analyze_batch(jobs, preset=None):
+    """
+    Runs one micro-batch. Each job is (image_bytes, pipe_id, target_size, include_regions).
+    Only bytes go in and small JSON-ready dicts come out (no pixel arrays are pickled).
+    Undecodable images get an error result with "status": 400 (client error).
+    preset: speed / quality preset of every analysis (config.ANALYSIS_PRESETS).
+
+    Images of the same size are analyzed together (core.batch.process_batch:
+    frame-level stages once over the stacked frames); their analysis_time is
+    the group time divided by the group size.
+    """
+    results = [None] * len(jobs)
+    groups = {} # (height, width) -> [(job index, pixels, decode_time)]
+    for i, (image_bytes, pipe_id, target_size, include_regions) in enumerate(jobs):
+        try:
+            pixels, width, height, decode_time = load_image_array(io.BytesIO(image_bytes), target_size)
+            groups.setdefault((height, width), []).append((i, pixels, decode_time))
+        except Exception as e:
+            results[i] = {"pipe_id": pipe_id, "error": f"Cannot decode image: {type(e).__name__}: {e}", "status": 400}
+
+    for (height, width), group in groups.items():
+        pipe_ids = [jobs[i][1] for i, _, _ in group]
+        try:
+            start = time.perf_counter()
+            if len(group) == 1:
+                analyzed = [process_image_logic(group[0][1], width, height, pipe_ids[0], config=preset)]
+            else:
+                analyzed = process_batch([pixels for _, pixels, _ in group], pipe_ids, config=preset)
+            analysis_time = (time.perf_counter() - start) / len(group)
+        except Exception as e:
+            for (i, _, _), pipe_id in zip(group, pipe_ids):
+                results[i] = {"pipe_id": pipe_id, "error": f"{type(e).__name__}: {e}"}
+            continue
+        for (i, _, decode_time), pipe_id, result in zip(group, pipe_ids, analyzed):
+            result["pipe_id"] = pipe_id
+            result["decode_time"] = decode_time
+            result["analysis_time"] = analysis_time
+            results[i] = result_to_dict(result, include_regions=jobs[i][3])
+    return results
+
+
+# =========================================================
+# SERVER SIDE
+# =========================================================
+
+def latency_percentiles(samples):
+    """p50/p95/p99 (milliseconds) of a list of latencies in seconds."""
+    if not samples:
+        return {"p50_ms": None, "p95_ms": None, "p99_ms": None}
+    p50, p95, p99 = np.percentile(np.asarray(samples) * 1000, [50, 95, 99])
+    return {"p50_ms": round(float(p50), 2), "p95_ms": round(float(p95), 2), "p99_ms": round(float(p99), 2)}
+
+
+class InferenceService:
+    """
+    Bounded request queue + micro-batcher + process pool.
+
+    workers:        pool processes (concurrency)
+    max_batch:      max requests grouped into one batch
+    batch_wait:     seconds to wait for more requests after the first one
+    queue_limit:    max queued requests before rejecting (backpressure)
+    preset:         speed / quality preset of every analysis (None = default)
+    """
+
+    def __init__(self, workers=2, max_batch=4, batch_wait=0.01, queue_limit=64, latency_window=1000, preset=None):
+        self.workers = workers
+        self.preset = preset
+        self.max_batch = max_batch
+        self.batch_wait = batch_wait
+        self.queue_limit = queue_limit
+
+        self.requests = queue.Queue(maxsize=queue_limit)
+        self.pool = ProcessPoolExecutor(max_workers=workers)
+        # At most `workers` batches in flight, so the queue (not the pool) absorbs bursts
+        self.in_flight = threading.BoundedSemaphore(workers)
+
+        self.lock = threading.Lock()
+        self.latencies = deque(maxlen=latency_window)
+        self.batch_sizes = deque(maxlen=latency_window)
+        self.counters = {"accepted": 0, "completed": 0, "errors": 0, "rejected": 0, "batches": 0, "pool_restarts": 0}
+        self.started_at = time.time()
+
+        self.running = True
+        self.batcher = threading.Thread(target=self._batch_loop, name="batcher", daemon=True)
+        self.batcher.start()
+
+    # ---------- request side ----------
+    def submit(self, image_bytes, pipe_id, target_size=None, include_regions=False):
+        """Queues one request. Returns a Future, or None if the queue is full."""
+        future = Future()
+        job = (image_bytes, pipe_id, target_size, include_regions)
+        try:
+            self.requests.put_nowait((job, future, time.perf_counter()))
+        except queue.Full:
+            with self.lock:
+                self.counters["rejected"] += 1
+            return None
+        with self.lock:
+            self.counters["accepted"] += 1
+        return future
+
+    # ---------- batching side ----------
+    def _collect_batch(self):
+        """Blocks for the first request, then gathers more for up to batch_wait seconds."""
+        try:
+            batch = [self.requests.get(timeout=0.5)]
+        except queue.Empty:
+            return []
+        deadline = time.perf_counter() + self.batch_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self.requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _batch_loop(self):
+        while self.running:
+            self.in_flight.acquire()
+            batch = self._collect_batch()
+            if not batch:
+                self.in_flight.release()
+                continue
+            jobs = [job for job, _, _ in batch]
+            try:
+                pool_future = self._submit(jobs)
+            except Exception as e:
+                # Fail this batch's requests instead of the batcher thread
+                pool_future = Future()
+                pool_future.set_exception(e)
+            pool_future.add_done_callback(lambda f, b=batch: self._finish_batch(f, b))
+
+    def _submit(self, jobs):
+        """pool.submit; a pool broken by a dead worker process is replaced once."""
+        try:
+            return self.pool.submit(analyze_batch, jobs, self.preset)
+        except BrokenProcessPool:
+            self.pool.shutdown(wait=False, cancel_futures=True)
+            self.pool = ProcessPoolExecutor(max_workers=self.workers)
+            with self.lock:
+                self.counters["pool_restarts"] += 1
+            return self.pool.submit(analyze_batch, jobs, self.preset)
+
+    def _finish_batch(self, pool_future, batch):
+        self.in_flight.release()
+        now = time.perf_counter()
+        try:
+            results = pool_future.result()
+        except Exception as e:
+            results = [{"error": f"{type(e).__name__}: {e}"}] * len(batch)
+
+        with self.lock:
+            self.counters["batches"] += 1
+            self.batch_sizes.append(len(batch))
+            for (_, _, enqueued_at), result in zip(batch, results):
+                self.latencies.append(now - enqueued_at)
+                self.counters["errors" if "error" in result else "completed"] += 1
+
+        for (_, future, _), result in zip(batch, results):
+            future.set_result(result)
+
+    # ---------- stats ----------
+    def stats(self):
+        with self.lock:
+            latencies = list(self.latencies)
+            batch_sizes = list(self.batch_sizes)
+            counters = dict(self.counters)
+        uptime = time.time() - self.started_at
+        return {
+            **counters,
+            "queue_depth": self.requests.qsize(),
+            "queue_limit": self.queue_limit,
+            "workers": self.workers,
+            "max_batch": self.max_batch,
+            "preset": self.preset or DEFAULT_PRESET,
+            "mean_batch_size": round(float(np.mean(batch_sizes)), 2) if batch_sizes else None,
+            "throughput_per_s": round(counters["completed"] / uptime, 3) if uptime > 0 else 0.0,
+            "uptime_s": round(uptime, 1),
+            "latency": latency_percentiles(latencies),
+        }
+
+    def shutdown(self):
+        self.running = False
+        self.batcher.join(timeout=1)
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+class RequestHandler(BaseHTTPRequestHandler):
+    service = None          # set by make_server
+    request_timeout = 120   # seconds a client waits for its result
+    max_body_bytes = 64 * 1024 * 1024 # larger uploads are refused (413) unread
+
+    def _send_json(self, status, payload, headers=None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for key, value in (headers or {}).items():
+            self.send_header(key, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        path = urlparse(self.path).path
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/stats":
+            self._send_json(200, self.service.stats())
+        else:
+            self._send_json(404, {"error": "Not found"})
+
+    def do_POST(self):
+        url = urlparse(self.path)
+        if url.path != "/analyze":
+            self._send_json(404, {"error": "Not found"})
+            return
+
+        try:
+            length = int(self.headers.get("Content-Length", 0))
+        except ValueError:
+            length = -1
+        if length <= 0:
+            self._send_json(400, {"error": "Empty body or bad Content-Length. Send raw image bytes."})
+            return
+        if length > self.max_body_bytes:
+            self.close_connection = True # The body is never read
+            self._send_json(413, {"error": f"Body of {length} bytes exceeds the {self.max_body_bytes} byte limit."},
+                            {"Connection": "close"})
+            return
+        image_bytes = self.rfile.read(length)
+
+        params = parse_qs(url.query)
+        pipe_id = params.get("pipe_id", ["PIPE_000"])[0]
+        include_regions = params.get("regions", ["0"])[0] in ("1", "true")
+        target_size = None
+        if "max_side" in params:
+            side = params["max_side"][0]
+            if not side.isdigit() or int(side) < 4:
+                self._send_json(400, {"error": f"max_side must be an integer >= 4, got {side!r}"})
+                return
+            target_size = (int(side), int(side) * 3 // 4)
+
+        future = self.service.submit(image_bytes, pipe_id, target_size, include_regions)
+        if future is None:
+            self._send_json(503, {"error": "Queue full, retry later."}, {"Retry-After": "1"})
+            return
+
+        try:
+            result = future.result(timeout=self.request_timeout)
+        except Exception:
+            self._send_json(504, {"error": "Timed out waiting for analysis."})
+            return
+        status = result.pop("status", 500) if "error" in result else 200
+        self._send_json(status, result)
+
+    def log_message(self, format, *args):
+        pass # Keep the console quiet; use /stats instead
+
+
+def make_server(host="127.0.0.1", port=8080, max_body_bytes=RequestHandler.max_body_bytes, **service_options):
+    service = InferenceService(**service_options)
+    handler = type("BoundRequestHandler", (RequestHandler,), {"service": service, "max_body_bytes": max_body_bytes})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    return server, service
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline defect detection HTTP service")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8080)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="analysis processes")
+    parser.add_argument("--max-batch", type=int, default=4, help="max requests per micro-batch")
+    parser.add_argument("--batch-wait-ms", type=float, default=10, help="wait for more requests per batch")
+    parser.add_argument("--queue-limit", type=int, default=64, help="queued requests before 503")
+    parser.add_argument("--max-body-mb", type=float, default=RequestHandler.max_body_bytes / 2**20,
+                        help="largest accepted upload (MB) before 413")
+    parser.add_argument("--preset", default=None, choices=sorted(ANALYSIS_PRESETS),
+                        help=f"speed / quality preset (default {DEFAULT_PRESET})")
+    args = parser.parse_args()
+
+    server, service = make_server(
+        args.host, args.port,
+        max_body_bytes=int(args.max_body_mb * 2**20),
+        workers=args.workers,
+        max_batch=args.max_batch,
+        batch_wait=args.batch_wait_ms / 1000,
+        queue_limit=args.queue_limit,
+        preset=args.preset,
+    )
+    print(f"Serving on http://{args.host}:{args.port} ({args.workers} workers)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        service.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,379 @@
+"""
+Watch-folder ingestion daemon.
+
+    python -m service.watch_folder /data/inbox --workers 4 --queue-size 8
+
+Polls a directory for new images (JPG/PNG/NPY) and feeds them through a
+bounded asyncio pipeline:
+
+    scanner -> [decode queue] -> decoders (threads) -> [analysis queue] -> analyzers (processes)
+
+Decoding runs in a thread pool while analysis runs in a process pool, so the
+two overlap. Both queues are bounded: when analyzers fall behind, decoders
+block on put(), and the scanner stops picking up files (backpressure).
+
+--shared-memory runs the decoders as processes too, handing frames to the
+analyzers through a shared-memory ring (service.frame_ring): no pixel array
+is pickled, only file names and small result dicts cross processes.
+
+Every finished file is appended to a JSONL ledger (one line per file, fsynced).
+On restart the ledger is read back and already-processed files are skipped.
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from config import ANALYSIS_PRESETS, DEFAULT_PRESET
+from core.image_logic import process_image_logic
+from core.serialization import result_to_dict
+from core.exporters import encode_mask, open_exporter, recover_lines
+from severity_priority import TopK, read_shard, write_shard
+from input_module import load_image_array, open_frame
+from service.frame_ring import FrameRingPipeline
+
+IMAGE_EXTENSIONS = (".jpg", ".jpeg", ".png", ".npy")
+# Retries of one file after the worker process analyzing it died (process
+# pool rebuilt / ring process replaced). A file that keeps killing workers is
+# left unrecorded (retried on the next run), never written to the ledger as failed.
+POOL_RETRIES = 2
+
+
+# =========================================================
+# LEDGER (restart-safe record of processed files)
+# =========================================================
+
+def file_key(path, stat):
+    # Same name but new size/mtime = new photo (re-synced file), process again
+    return f"{os.path.abspath(path)}|{stat.st_size}|{int(stat.st_mtime)}"
+
+
+class Ledger:
+    def __init__(self, path):
+        self.path = path
+        # A torn last line (crash mid-write) is cut off, so the next record
+        # starts on a line of its own
+        self.done = recover_lines(path, lambda line: json.loads(line).get("key"))
+        self.file = open(path, "a", encoding="utf-8")
+
+    def __contains__(self, key):
+        return key in self.done
+
+    def record(self, key, record):
+        self.file.write(json.dumps({"key": key, **record}) + "\n")
+        self.file.flush()
+        os.fsync(self.file.fileno())
+        self.done.add(key)
+
+    def close(self):
+        self.file.close()
+
+
+# =========================================================
+# STAGES
+# =========================================================
+
+def decode_file(path, target_size):
+    if path.lower().endswith(".npy"):
+        start = time.perf_counter()
+        pixels, width, height = open_frame(path)
+        return pixels, width, height, time.perf_counter() - start
+    return load_image_array(path, target_size)
+
+
+def analyze_pixels(pixels, width, height, pipe_id, keep_regions=False, keep_mask=False, preset=None):
+    start = time.perf_counter()
+    result = process_image_logic(pixels, width, height, pipe_id, return_mask=keep_mask, config=preset)
+    result["analysis_time"] = time.perf_counter() - start
+    result["pipe_id"] = pipe_id # exports are looked up by pipe id (change detection)
+    out = result_to_dict(result)
+    # Export extras travel back from the worker as a small structured array
+    # and an already-compressed mask (never the full map)
+    if keep_regions:
+        out["region_table"] = result["region_table"]
+    if keep_mask and "binary_map" in result:
+        out["mask"] = encode_mask(result["binary_map"])
+    return out
+
+
+def ranking_entry(record):
+    """Small entry for the priority ranking (from a result or a ledger line)."""
+    return {
+        "pipe_id": record.get("pipe_id") or os.path.splitext(record.get("file_name", ""))[0],
+        "final_defect": record.get("final_defect"),
+        "priority_score": record["priority_score"],
+        "affected_percentage": record.get("affected_percentage"),
+        "file_name": record.get("file_name"),
+        "key": record.get("key"),
+    }
+
+
+class WatchFolder:
+    """
+    directory:   folder to watch
+    ledger_path: JSONL file of processed files (defaults to <directory>/.processed.jsonl)
+    workers:     analysis processes
+    decoders:    decode threads
+    queue_size:  capacity of each bounded queue
+    interval:    seconds between directory scans
+    settle:      seconds a file must be unmodified before it is picked up
+                 (avoids reading half-synced files)
+    exporter:    optional core.exporters JsonlExporter / CsvExporter; every
+                 finished result is appended to it as it completes
+    top_k:       keep this folder's k highest-priority results (bounded heap,
+                 seeded from the ledger on restart) and write them to
+                 top_k_path, highest first, whenever they change. The shards
+                 of several watchers merge into one fleet ranking (rank_fleet.py).
+    shared_memory: decoder processes + shared-memory frame ring instead of
+                 decode threads + pickled pixel arrays (service.frame_ring)
+    """
+
+    def __init__(self, directory, ledger_path=None, workers=2, decoders=2, queue_size=8,
+                 interval=2.0, settle=1.0, target_size=None, exporter=None, top_k=None, top_k_path=None,
+                 shared_memory=False, preset=None):
+        self.directory = directory
+        self.ledger = Ledger(ledger_path or os.path.join(directory, ".processed.jsonl"))
+        self.workers = workers
+        self.decoders = decoders
+        self.queue_size = queue_size
+        self.interval = interval
+        self.settle = settle
+        self.target_size = target_size
+        self.exporter = exporter
+        self.top_k = None
+        if top_k:
+            self.top_k = TopK(top_k)
+            self.top_k_path = top_k_path or os.path.join(directory, ".top_k.jsonl")
+            self.top_k.extend(ranking_entry(record) for record in read_shard(self.ledger.path)
+                              if "priority_score" in record)
+            write_shard(self.top_k_path, self.top_k)
+
+        self.shared_memory = shared_memory
+        self.preset = preset
+        self.pending = set() # keys queued but not yet in the ledger
+        self.process_pool = None
+        self.processed = 0
+        self.failed = 0
+        self.pool_restarts = 0
+        self.left_for_next_run = set() # keys whose worker kept dying: not rescanned, not in the ledger
+        self.attempts = {} # key -> analyses lost to dead worker processes (shared-memory ring)
+
+    def scan(self):
+        """Returns (key, path) of settled, unprocessed images, oldest first."""
+        now = time.time()
+        found = []
+        with os.scandir(self.directory) as entries:
+            for entry in entries:
+                if not entry.is_file() or not entry.name.lower().endswith(IMAGE_EXTENSIONS):
+                    continue
+                stat = entry.stat()
+                if now - stat.st_mtime < self.settle:
+                    continue
+                key = file_key(entry.path, stat)
+                if key in self.ledger or key in self.pending or key in self.left_for_next_run:
+                    continue
+                found.append((stat.st_mtime, key, entry.path))
+        found.sort()
+        return [(key, path) for _, key, path in found]
+
+    async def scanner(self, decode_queue, once):
+        while True:
+            for key, path in self.scan():
+                self.pending.add(key)
+                await decode_queue.put((key, path)) # Blocks when full (backpressure)
+            if once:
+                return
+            await asyncio.sleep(self.interval)
+
+    async def decoder(self, decode_queue, analysis_queue, thread_pool):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, path = await decode_queue.get()
+            try:
+                frame = await loop.run_in_executor(thread_pool, decode_file, path, self.target_size)
+                await analysis_queue.put((key, path, frame))
+            except Exception as e:
+                self.finish(key, path, {"error": f"Decode failed: {type(e).__name__}: {e}"})
+            finally:
+                decode_queue.task_done()
+
+    def replace_pool(self, broken):
+        """New process pool after a worker died (once per broken pool, whichever analyzer notices first)."""
+        if self.process_pool is broken:
+            broken.shutdown(wait=False, cancel_futures=True)
+            self.process_pool = ProcessPoolExecutor(self.workers)
+            self.pool_restarts += 1
+
+    async def analyzer(self, analysis_queue):
+        loop = asyncio.get_running_loop()
+        while True:
+            key, path, (pixels, width, height, decode_time) = await analysis_queue.get()
+            pipe_id = os.path.splitext(os.path.basename(path))[0]
+            try:
+                for attempt in range(POOL_RETRIES + 1):
+                    pool = self.process_pool
+                    try:
+                        result = await loop.run_in_executor(
+                            pool, analyze_pixels, pixels, width, height, pipe_id,
+                            self.exporter is not None and self.exporter.include_regions,
+                            self.exporter is not None and self.exporter.include_mask, self.preset,
+                        )
+                        break
+                    except BrokenProcessPool:
+                        # Infrastructure failure, not a verdict on the file: rebuild and retry
+                        self.replace_pool(pool)
+                else:
+                    self.leave_for_next_run(key, path)
+                    continue
+                result["decode_time"] = decode_time
+                self.finish(key, path, result)
+            except Exception as e:
+                self.finish(key, path, {"error": f"Analysis failed: {type(e).__name__}: {e}"})
+            finally:
+                analysis_queue.task_done()
+
+    def leave_for_next_run(self, key, path):
+        """Gives up on a file whose worker keeps dying, without recording it (retried on restart)."""
+        self.pending.discard(key)
+        self.left_for_next_run.add(key)
+        print(f"{os.path.basename(path)}: worker process died {POOL_RETRIES + 1} times, left for the next run")
+
+    def finish(self, key, path, result):
+        result["file_name"] = os.path.basename(path)
+        if self.exporter is not None and "error" not in result:
+            self.exporter.write(key, result)
+        # The ledger keeps the summary only
+        self.ledger.record(key, {k: v for k, v in result.items() if k not in ("region_table", "mask")})
+        if self.top_k is not None and "priority_score" in result:
+            if self.top_k.push(ranking_entry({"key": key, **result})):
+                write_shard(self.top_k_path, self.top_k)
+        self.pending.discard(key)
+        if "error" in result:
+            self.failed += 1
+        else:
+            self.processed += 1
+        print(f"[{self.processed + self.failed}] {result['file_name']}: {result.get('final_defect', result.get('error'))}")
+
+    async def run(self, once=False):
+        if self.shared_memory:
+            return await self.run_shared_memory(once)
+        decode_queue = asyncio.Queue(maxsize=self.queue_size)
+        analysis_queue = asyncio.Queue(maxsize=self.queue_size)
+
+        self.process_pool = ProcessPoolExecutor(self.workers) # Replaced if a worker process dies
+        with ThreadPoolExecutor(self.decoders) as thread_pool:
+            tasks = [asyncio.create_task(self.decoder(decode_queue, analysis_queue, thread_pool)) for _ in range(self.decoders)]
+            tasks += [asyncio.create_task(self.analyzer(analysis_queue)) for _ in range(self.workers)]
+            try:
+                await self.scanner(decode_queue, once)
+                # --once: drain what was queued, then stop
+                await decode_queue.join()
+                await analysis_queue.join()
+            finally:
+                for task in tasks:
+                    task.cancel()
+                await asyncio.gather(*tasks, return_exceptions=True)
+                self.process_pool.shutdown()
+                self.ledger.close()
+                if self.exporter is not None:
+                    self.exporter.close()
+
+    async def run_shared_memory(self, once=False):
+        """run() with decoder processes feeding the analyzers through a shared-memory ring."""
+        loop = asyncio.get_running_loop()
+        pipeline = FrameRingPipeline(
+            self.workers, self.decoders, queue_size=self.queue_size, target_size=self.target_size,
+            keep_regions=self.exporter is not None and self.exporter.include_regions,
+            keep_mask=self.exporter is not None and self.exporter.include_mask, preset=self.preset,
+        )
+
+        async def collector():
+            while True:
+                finished = await loop.run_in_executor(io_pool, pipeline.get_result, 0.5)
+                if finished is None:
+                    continue
+                key, path, result = finished
+                if not result.get("lost"):
+                    self.finish(key, path, result)
+                    continue
+                # Its process died: infrastructure failure, not a verdict on the file
+                self.attempts[key] = self.attempts.get(key, 0) + 1
+                if self.attempts[key] > POOL_RETRIES:
+                    self.leave_for_next_run(key, path)
+                else:
+                    await loop.run_in_executor(io_pool, pipeline.submit, key, path)
+
+        # Blocking queue calls run in threads: submit() (full job queue) and get_result()
+        with ThreadPoolExecutor(2) as io_pool:
+            collect = asyncio.create_task(collector())
+            try:
+                while True:
+                    for key, path in self.scan():
+                        self.pending.add(key)
+                        await loop.run_in_executor(io_pool, pipeline.submit, key, path) # Backpressure
+                    if once:
+                        break
+                    await asyncio.sleep(self.interval)
+                # --once: wait for what was queued, then stop
+                while self.pending:
+                    await asyncio.sleep(0.05)
+            finally:
+                collect.cancel()
+                await asyncio.gather(collect, return_exceptions=True)
+                await loop.run_in_executor(None, pipeline.close)
+                self.ledger.close()
+                if self.exporter is not None:
+                    self.exporter.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Watch a folder and analyze new pipe images")
+    parser.add_argument("directory")
+    parser.add_argument("--ledger", default=None, help="processed-files JSONL (default: <directory>/.processed.jsonl)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 2, help="analysis processes")
+    parser.add_argument("--decoders", type=int, default=2, help="decode threads (processes with --shared-memory)")
+    parser.add_argument("--shared-memory", action="store_true",
+                        help="decoder processes hand frames to the analyzers through a shared-memory ring")
+    parser.add_argument("--preset", default=None, choices=sorted(ANALYSIS_PRESETS),
+                        help=f"speed / quality preset (default {DEFAULT_PRESET})")
+    parser.add_argument("--queue-size", type=int, default=8, help="bounded queue capacity")
+    parser.add_argument("--interval", type=float, default=2.0, help="seconds between scans")
+    parser.add_argument("--settle", type=float, default=1.0, help="seconds a file must be unmodified")
+    parser.add_argument("--max-side", type=int, default=None, help="reduced-size decode for big photos")
+    parser.add_argument("--once", action="store_true", help="process the current backlog and exit")
+    parser.add_argument("--export", default=None, help="stream results to a .jsonl or .csv file (resumable)")
+    parser.add_argument("--export-regions", action="store_true", help="include region tables in the export")
+    parser.add_argument("--export-mask", action="store_true", help="include compact binary masks in the export")
+    parser.add_argument("--top-k", type=int, default=None, metavar="K",
+                        help="keep the K highest-priority results in a shard file (see rank_fleet.py)")
+    parser.add_argument("--top-k-file", default=None, help="shard file (default: <directory>/.top_k.jsonl)")
+    args = parser.parse_args()
+
+    target_size = (args.max_side, args.max_side * 3 // 4) if args.max_side else None
+    exporter = None
+    if args.export:
+        exporter = open_exporter(args.export, args.export_regions, args.export_mask)
+    watcher = WatchFolder(
+        args.directory, args.ledger, args.workers, args.decoders,
+        args.queue_size, args.interval, args.settle, target_size, exporter, args.top_k, args.top_k_file,
+        args.shared_memory, args.preset,
+    )
+    try:
+        asyncio.run(watcher.run(once=args.once))
+    except KeyboardInterrupt:
+        pass
+    print(f"Processed: {watcher.processed}, Failed: {watcher.failed}")
+    if watcher.pool_restarts or watcher.left_for_next_run:
+        print(f"Worker pool restarts: {watcher.pool_restarts}, left for the next run: {len(watcher.left_for_next_run)}")
+
+
+if __name__ == "__main__":
+    main()
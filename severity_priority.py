@@ -4,6 +4,8 @@
 # Python's `heapq` is standard library DSA.
 
 import heapq
+import json
+import os
 
 # Stores tuples: (-priority_score, pipe_id, defect_type)
 # We use negative score for Max-Heap behavior involved with Min-Heap heapq
@@ -24,3 +26,116 @@ def get_priority_list():
     sorted_list = sorted(priority_queue)
     # Convert back to positive score
     return [(pid, def_type, -score) for (score, pid, def_type) in sorted_list]
+
+
+# =========================================================
+# SHARDED TOP-K (Bounded Min-Heap per Worker + K-Way Merge)
+# =========================================================
+# The global heap above grows with every image and lives in ONE process.
+# For a fleet: every worker keeps only its own k best entries (min-heap of
+# size k, the root is the weakest entry and gets evicted), and the global
+# top-k is a streaming k-way merge of the per-worker lists (each sorted,
+# highest first). Memory: O(k) per worker, O(workers) for the merge,
+# independent of the number of images.
+#
+# Ranking order: priority_score descending, then pipe_id ascending (ties
+# resolve the same way on every worker, so merged output is deterministic).
+
+
+class _Descending:
+    """Wraps a value so that comparisons are reversed (for string tie-breaks in a min-heap)."""
+    __slots__ = ("value",)
+
+    def __init__(self, value):
+        self.value = value
+
+    def __lt__(self, other):
+        return self.value > other.value
+
+    def __eq__(self, other):
+        return self.value == other.value
+
+
+def rank_key(entry):
+    """Sort key of an entry dict: larger = ranks higher."""
+    return (entry["priority_score"], _Descending(str(entry["pipe_id"])))
+
+
+class TopK:
+    """
+    Bounded top-k of result entries. An entry is a dict with at least
+    "pipe_id" and "priority_score" (any other JSON-friendly keys are kept).
+    push() is O(log k); memory is k entries no matter how many are pushed.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self.heap = []    # (rank_key, seq, entry); root = weakest kept entry
+        self.seq = 0      # unique tie-break, entries themselves are never compared
+        self.pushed = 0
+
+    def __len__(self):
+        return len(self.heap)
+
+    def push(self, entry):
+        """Offers an entry; returns True if it is (currently) in the top-k."""
+        self.pushed += 1
+        item = (rank_key(entry), self.seq, entry)
+        self.seq += 1
+        if len(self.heap) < self.k:
+            heapq.heappush(self.heap, item)
+            return True
+        if self.k > 0 and self.heap[0][0] < item[0]:
+            heapq.heapreplace(self.heap, item)
+            return True
+        return False
+
+    def extend(self, entries):
+        for entry in entries:
+            self.push(entry)
+        return self
+
+    def items(self):
+        """Kept entries, highest priority first."""
+        return [entry for _, _, entry in sorted(self.heap, key=lambda item: item[0], reverse=True)]
+
+
+def merge_top_k(shards, k):
+    """
+    Global top-k from per-worker lists, each already sorted highest first
+    (TopK.items(), or a generator such as read_shard). Streaming k-way merge:
+    only the current head of every shard is held, and it stops after k entries.
+    Entries with a "key" already in the output (same image in two shards) are skipped.
+    """
+    top, seen = [], set()
+    for entry in heapq.merge(*shards, key=rank_key, reverse=True):
+        key = entry.get("key")
+        if key is not None:
+            if key in seen:
+                continue
+            seen.add(key)
+        top.append(entry)
+        if len(top) == k:
+            break
+    return top
+
+
+def write_shard(path, top_k):
+    """Writes a worker's top-k as JSON lines, highest first (input for merge_top_k)."""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        for entry in top_k.items():
+            f.write(json.dumps(entry) + "\n")
+    os.replace(tmp_path, path) # Readers never see a half-written shard
+
+
+def read_shard(path):
+    """Yields the entries of a shard (or any JSONL ledger / export) lazily, in file order."""
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue # Torn last line (ledgers / exports after a crash)
@@ -11,9 +11,20 @@ import streamlit as st
 from PIL import Image
 import numpy as np
 import pandas as pd
+import time
 
 from core.image_logic import process_image_logic
+from config import CLASSIFY_THRESHOLDS, QUICK_LOOK_MIN_AFFECTED, ANALYSIS_PRESETS, DEFAULT_PRESET
+from input_module import load_image_array
+from core.duplicate_index import DuplicateIndex, perceptual_hash
+from core.segments import SegmentTracker
+from core.quick_look import triage
 from ui.pdf_generator import generate_pdf
+from ui.results_view import (
+    DEFECT_TYPES, PAGE_SIZES, make_thumbnail, thresholds_key, view_indices,
+    page_count, page_slice, ascii_binary_map, summary_row, result_priority,
+    pack_mask, reclassify_stored, segment_summaries,
+)
 
 # ---------- STREAMLIT CONFIG ----------
 st.set_page_config(
@@ -57,6 +68,26 @@ if 'processed_data' not in st.session_state:
 if 'uploaded_file_names' not in st.session_state:
     st.session_state['uploaded_file_names'] = set()
 
+if 'duplicate_index' not in st.session_state:
+    st.session_state['duplicate_index'] = DuplicateIndex()
+
+if 'segment_tracker' not in st.session_state:
+    st.session_state['segment_tracker'] = SegmentTracker()
+
+# Render caches: re-classified results per threshold setting, the current
+# filtered/sorted view, per-result display blocks and per-segment summaries
+if 'reclassified' not in st.session_state:
+    st.session_state['reclassified'] = {}
+
+if 'view_cache' not in st.session_state:
+    st.session_state['view_cache'] = {}
+
+if 'block_cache' not in st.session_state:
+    st.session_state['block_cache'] = {}
+
+if 'segment_cache' not in st.session_state:
+    st.session_state['segment_cache'] = {}
+
 # ---------- SIDEBAR ----------
 with st.sidebar:
     st.title("🔧 Settings")
@@ -66,24 +97,123 @@ with st.sidebar:
     if st.button("🔄 Reset / Clear All", type="primary"):
         st.session_state['processed_data'] = []
         st.session_state['uploaded_file_names'] = set()
+        st.session_state['duplicate_index'] = DuplicateIndex()
+        st.session_state['segment_tracker'] = SegmentTracker()
+        st.session_state['reclassified'] = {}
+        st.session_state['view_cache'] = {}
+        st.session_state['block_cache'] = {}
+        st.session_state['segment_cache'] = {}
+        st.session_state.pop('pdf_report', None)
         st.rerun()
 
     st.markdown("---")
+
+    st.subheader("Analysis")
+    # Reduced-size decode (JPEG draft mode) for faster analysis of big photos
+    resolution_options = {
+        "Full Resolution": None,
+        "1600 x 1200": (1600, 1200),
+        "1024 x 768": (1024, 768),
+        "640 x 480": (640, 480),
+    }
+    resolution_label = st.selectbox("Analysis Resolution", list(resolution_options.keys()))
+    target_size = resolution_options[resolution_label]
+
+    # Speed / quality preset (ROI + validity sampling, pyramid level, gradient prefilter)
+    presets = list(ANALYSIS_PRESETS)
+    analysis_preset = st.selectbox("Analysis Preset", presets, index=presets.index(DEFAULT_PRESET),
+                                   help="fast: half-resolution pyramid and sparser sampling; thorough: denser sampling.")
+
+    # Split ONE image's analysis over several threads (row bands)
+    max_threads = os.cpu_count() or 1
+    analysis_threads = st.slider("Threads per Image", 1, max(2, max_threads), min(4, max_threads))
+
+    # Sampled estimate first; full analysis only if the affected area may reach the threshold
+    quick_triage = st.checkbox("Quick-Look Triage", value=False,
+                               help="Estimate the affected area from a pixel sample and skip the full analysis of clearly healthy images.")
+    triage_min_affected = QUICK_LOOK_MIN_AFFECTED
+    if quick_triage:
+        triage_min_affected = st.slider("Triage Threshold (Affected %)", 0.0, 20.0, float(QUICK_LOOK_MIN_AFFECTED), 0.1)
+
+    # Live classification thresholds: only classification + the global check
+    # are re-run on the stored region features (milliseconds, no re-upload)
+    threshold_controls = [
+        # key, label, min, max, step
+        ("soft_gradient", "Soft Edge Gradient <", 1.0, 60.0, 0.5),
+        ("very_soft_gradient", "Very Soft Gradient <", 1.0, 60.0, 0.5),
+        ("sharp_gradient", "Sharp Edge Gradient >", 1.0, 100.0, 0.5),
+        ("linear_aspect", "Linear Aspect Ratio >", 1.0, 10.0, 0.1),
+        ("soft_linear_aspect", "Rusty Crack Aspect Ratio >", 1.0, 10.0, 0.1),
+        ("diagonal_rectangularity", "Diagonal Rectangularity <", 0.0, 1.0, 0.01),
+        ("shadow_rectangularity", "Shadow Rectangularity >", 0.0, 1.0, 0.01),
+        ("green_margin", "Algae Green Margin", 0.0, 100.0, 1.0),
+        ("warm_margin", "Warm Red-Blue Margin", 0.0, 100.0, 1.0),
+        ("red_margin", "Rust Red Margin", 0.0, 100.0, 1.0),
+        ("rust_saturation", "Rust Saturation >", 0.0, 1.0, 0.01),
+        ("min_color_area", "Min Area for Color Rules", 0.0, 500.0, 1.0),
+        ("min_defect_area", "Min Defect Area (px)", 0.0, 1000.0, 1.0),
+        ("noise_fraction", "Noise Fraction", 0.0, 0.1, 0.001),
+    ]
+    # Near-duplicate shots reuse an earlier result instead of a full analysis
+    skip_duplicates = st.checkbox("Reuse results for near-duplicate images", value=True)
+    duplicate_distance = st.slider("Duplicate Distance (hash bits)", 0, 16, 4)
+    dup_index = st.session_state['duplicate_index']
+    if dup_index.lookups:
+        st.caption(f"Duplicates: {dup_index.duplicates} / {dup_index.lookups} uploads ({dup_index.duplicate_rate()*100:.1f}%)")
+
+    # Overlapping frames of one pipe segment: analyze only the new area of
+    # each frame and rank one merged severity per segment
+    group_segments = st.checkbox("Group frames into pipe segments", value=False)
+    segment_id_input = ""
+    if group_segments:
+        segment_id_input = st.text_input(
+            "Segment ID for next uploads",
+            help="Leave empty to group consecutive overlapping frames automatically."
+        ).strip()
+
+    with st.expander("Classification Thresholds"):
+        thresholds = {
+            key: st.slider(label, min_value, max_value, float(CLASSIFY_THRESHOLDS[key]), step, key=f"th_{key}")
+            for key, label, min_value, max_value, step in threshold_controls
+        }
+
+    st.markdown("---")
     
+    # Results as seen with the current thresholds. Every result remembers the
+    # thresholds it was classified with and is re-classified when they differ
+    # (once per threshold setting; later reruns only add the results uploaded since).
+    processed = st.session_state['processed_data']
+    t_key = thresholds_key(thresholds)
+    reclassified = st.session_state['reclassified']
+    if reclassified.get('key') != t_key:
+        reclassified.clear()
+        reclassified['key'] = t_key
+        reclassified['results'] = []
+    cached = reclassified['results']
+    cached.extend(res if res.get('thresholds_key') == t_key else reclassify_stored(res, thresholds)
+                  for res in processed[len(cached):])
+    results = cached
+
+    # Everything derived from the results is valid while this is unchanged
+    results_signature = (len(results), t_key)
+
     st.subheader("Reporting")
-    # 2. PDF Download
-    if st.session_state['processed_data']:
-        try:
-            pdf_path = generate_pdf(st.session_state['processed_data'])
-            with open(pdf_path, "rb") as f:
+    # 2. PDF Download (built on request, not on every rerun)
+    if results:
+        if st.button("📄 Prepare PDF Report"):
+            try:
+                st.session_state['pdf_report'] = (results_signature, generate_pdf(results))
+            except Exception as e:
+                st.error(f"PDF Error: {e}")
+        report = st.session_state.get('pdf_report')
+        if report and report[0] == results_signature:
+            with open(report[1], "rb") as f:
                 st.download_button(
-                    label="📄 Download PDF Report",
+                    label="⬇️ Download PDF Report",
                     data=f,
                     file_name="Pipeline_Analysis_Report.pdf",
                     mime="application/pdf"
                 )
-        except Exception as e:
-            st.error(f"PDF Error: {e}")
     else:
         st.info("Upload images to generate report.")
 
@@ -107,18 +237,52 @@ if uploaded_files:
             
             for file in new_files:
                 try:
-                    img = Image.open(file).convert("RGB")
-                    pixels = np.array(img)
-                    height, width, _ = pixels.shape
+                    pixels, width, height, decode_time = load_image_array(file, target_size)
+                    img = Image.fromarray(pixels)
                     pipe_id = f"PIPE_{pipe_count:03d}"
-                    
-                    # Process
-                    result = process_image_logic(pixels, width, height, pipe_id)
+
+                    # Near-duplicate check (perceptual hash + BK-tree lookup)
+                    image_hash = perceptual_hash(pixels)
+                    match = dup_index.find(image_hash, duplicate_distance) if skip_duplicates else None
+
+                    analysis_start = time.perf_counter()
+                    if match is not None:
+                        # Reuse the earlier analysis, linked to the original
+                        original = st.session_state['processed_data'][match[0]]
+                        result = dict(original)
+                        result['duplicate_of'] = original['pipe_id']
+                        result['duplicate_distance'] = match[1]
+                    elif group_segments:
+                        # Register to the segment's last frame, analyze only the new area
+                        tracker = st.session_state['segment_tracker']
+                        _, result = tracker.add_frame(pixels, file.name, segment_id_input or None, thresholds,
+                                                      workers=analysis_threads, config=analysis_preset,
+                                                      return_mask=True)
+                        pipe_id = result['segment_id']
+                        dup_index.add(image_hash, len(st.session_state['processed_data']))
+                    elif quick_triage:
+                        result = triage(pixels, width, height, pipe_id, triage_min_affected, thresholds,
+                                        workers=analysis_threads, config=analysis_preset, return_mask=True)
+                        dup_index.add(image_hash, len(st.session_state['processed_data']))
+                    else:
+                        # Process (the binary map is kept: cracks found by a later
+                        # threshold change are measured on it)
+                        result = process_image_logic(pixels, width, height, pipe_id, thresholds,
+                                                     workers=analysis_threads, config=analysis_preset,
+                                                     return_mask=True)
+                        dup_index.add(image_hash, len(st.session_state['processed_data']))
+                    analysis_time = time.perf_counter() - analysis_start
                     
                     # Add metadata
                     result['file_name'] = file.name
                     result['image_obj'] = img
+                    result['thumbnail'] = make_thumbnail(img)
                     result['pipe_id'] = pipe_id
+                    result['decode_time'] = decode_time
+                    result['analysis_time'] = analysis_time
+                    if match is None:
+                        result['thresholds_key'] = t_key
+                        pack_mask(result) # Session state keeps the encoded mask only
                     
                     st.session_state['processed_data'].append(result)
                     st.session_state['uploaded_file_names'].add(file.name)
@@ -132,47 +296,73 @@ if uploaded_files:
 
 st.markdown("---")
 
-# DISPLAY RESULTS (Linear Layout)
-if st.session_state['processed_data']:
+# DISPLAY RESULTS (Paginated Layout)
+if results:
     st.header("🔍 Analysis Results")
-    
-    # SORTING LOGIC: Local Sort
-    def calculate_priority(res):
-        status = res.get('final_defect', 'NORMAL')
-        affected = res.get('affected_percentage', 0)
-        
-        # Severity Map
-        severity = 0
-        if status == "CRACK": severity = 10
-        elif status == "CORROSION": severity = 5
-        elif status == "DAMP": severity = 2
-        elif status == "NORMAL" or status == "HEALTHY": severity = 1
-        elif status == "INVALID": severity = 0
-        
-        # Score = Severity * 1000 + Affected %
-        return (severity * 1000) + affected
-
-    # Sort by calculated priority desc
-    sorted_results = sorted(
-        st.session_state['processed_data'],
-        key=calculate_priority,
-        reverse=True
-    )
-            
-    # DISPLAY LOOP (Input Order)
+
+    f1, f2, f3 = st.columns([3, 1, 1])
+    defect_filter = f1.multiselect("Filter by Defect", DEFECT_TYPES)
+    order_label = f2.selectbox("Order", ["Upload Order", "Priority"])
+    page_size = f3.selectbox("Per Page", PAGE_SIZES)
+
+    # Filtered + ordered view, recomputed only when results / filter / order change
     # User requested: "image uploading part should be considered as the way the user inputs"
-    # So we display images in the order they were processed/uploaded.
-    for result in st.session_state['processed_data']:
+    # So upload order stays the default.
+    view_key = (results_signature, tuple(defect_filter), order_label)
+    view_cache = st.session_state['view_cache']
+    if view_cache.get('key') != view_key:
+        view_cache.clear()
+        view_cache['key'] = view_key
+        view_cache['indices'] = view_indices(results, defect_filter, "priority" if order_label == "Priority" else "upload")
+    indices = view_cache['indices']
+
+    pages = page_count(len(indices), page_size)
+    if st.session_state.get('results_page', 1) > pages:
+        st.session_state['results_page'] = pages
+    page = st.number_input(f"Page (of {pages})", min_value=1, max_value=pages, step=1, key='results_page')
+    page_indices = page_slice(indices, page, page_size)
+    if page_indices:
+        first = (page - 1) * page_size + 1
+        st.caption(f"Showing {first}-{first + len(page_indices) - 1} of {len(indices)} results ({len(results)} total)")
+    else:
+        st.info("No results match the filter.")
+
+    # DISPLAY LOOP (current page only)
+    # Text blocks are built once per result; only the current threshold
+    # setting's blocks are kept (a slider change starts over)
+    block_cache = st.session_state['block_cache']
+    if block_cache.get('key') != t_key:
+        block_cache.clear()
+        block_cache['key'] = t_key
+        block_cache['blocks'] = {}
+    blocks = block_cache['blocks']
+    for idx in page_indices:
+        result = results[idx]
+
+        block = blocks.get(idx)
+        if block is None:
+            block = {
+                "ascii_map": ascii_binary_map(result["binary_sample"]) if result["final_defect"] != "INVALID" else None,
+                "timing": (
+                    f"Decode: {result['decode_time']*1000:.0f} ms | "
+                    f"Analysis: {result['analysis_time']*1000:.0f} ms | "
+                    f"Size: {result['image_obj'].width} x {result['image_obj'].height}"
+                ) if 'decode_time' in result else None,
+            }
+            blocks[idx] = block
+
         with st.container():
             c1, c2 = st.columns([1, 2])
             
             # Image Column
             with c1:
-                st.image(result['image_obj'], caption=f"{result['pipe_id']} - {result['file_name']}", use_container_width=True)
+                st.image(result.get('thumbnail', result['image_obj']), caption=f"{result['pipe_id']} - {result['file_name']}", use_container_width=True)
             
             # Details Column
             with c2:
                 st.subheader(f"{result['pipe_id']} ({result['final_defect']})")
+                if 'segment_id' in result:
+                    st.caption(f"Frame {result['frame_index']} of segment {result['segment_id']} | New area analyzed: {result['analyzed_fraction']*100:.0f}%")
                 
                 # Status Badge
                 final_defect = result["final_defect"]
@@ -184,44 +374,64 @@ if st.session_state['processed_data']:
                     st.warning("🟡 Warning: Dampness/Algae")
                 elif final_defect == "INVALID":
                      st.error("⚠️ Invalid Image")
+                elif final_defect == "DEFERRED":
+                     st.info("⏳ Deferred: too complex for the per-image budget, marked for offline processing (not analyzed or ranked)")
                 else:
                     st.success("🟢 Normal / Healthy")
                 
                 st.write(f"**Explanation:** {result.get('explanation', 'No details.')}")
+                if 'quick_look' in result:
+                    look = result['quick_look']
+                    low, high = look['affected_percentage_ci']
+                    st.caption(f"Quick look: ~{look['affected_percentage']}% affected ({look['confidence']*100:.0f}% CI {low}-{high}%, {look['samples']} samples)"
+                               + (" | Estimate only" if result.get('estimated') else ""))
+                if 'duplicate_of' in result:
+                    st.info(f"Near-duplicate of {result['duplicate_of']} ({result['duplicate_distance']} bits). Result reused.")
                 
                 # Metrics
                 m1, m2, m3 = st.columns(3)
                 m1.metric("Suspicious Pixels", result["suspicious_pixels"])
                 m2.metric("Affected Area", f"{result['affected_percentage']}%")
                 m3.metric("Status", final_defect)
+                if block["timing"]:
+                    st.caption(block["timing"])
                 
                 # Binary Map DIRECT (No Expander)
-                if final_defect != "INVALID":
+                if block["ascii_map"] is not None:
                      st.caption("Binary Defect Map")
-                     binary_sample = result["binary_sample"]
-                     ascii_view = "\n".join(" ".join(str(c) for c in r) for r in binary_sample)
-                     st.code(ascii_view, language="text")
+                     st.code(block["ascii_map"], language="text")
         
         st.markdown("---")
 
     # TABULAR CONTENT (Bottom)
     st.header("📊 Tabular Summary")
     
-    # Create DataFrame
-    table_data = []
-    # FIX: Use sorted_results instead of original processed_data
-    for res in sorted_results:
-        table_data.append({
-            "Pipe ID": res['pipe_id'],
-            "File Name": res['file_name'],
-            "Status": res['final_defect'],
-            "Affected %": res['affected_percentage'],
-            "Suspicious Pixels": res['suspicious_pixels'],
-            "Explanation": res['explanation']
-        })
-    
-    df = pd.DataFrame(table_data)
-    st.dataframe(df)
+    # Filtered results by priority; the DataFrame is rebuilt only when the view changes
+    if 'table' not in view_cache:
+        by_priority = sorted(indices, key=lambda i: result_priority(results[i]), reverse=True)
+        view_cache['table'] = pd.DataFrame([summary_row(results[i]) for i in by_priority])
+    st.dataframe(view_cache['table'])
+
+    # SEGMENT RANKING (one merged severity per pipe segment)
+    tracker = st.session_state['segment_tracker']
+    if tracker.segments:
+        st.header("🧩 Segment Ranking")
+        segment_rows = []
+        segment_cache = st.session_state['segment_cache']
+        if segment_cache.get('key') != t_key:
+            segment_cache.clear()
+            segment_cache['key'] = t_key
+            segment_cache['segments'] = {}
+        for seg in segment_summaries(tracker, thresholds, segment_cache['segments']):
+            segment_rows.append({
+                "Segment": seg['pipe_id'],
+                "Frames": len(seg['frames']),
+                "Status": seg['final_defect'],
+                "Affected %": seg['affected_percentage'],
+                "Priority Score": seg['priority_score'],
+                "Explanation": seg['explanation']
+            })
+        st.dataframe(pd.DataFrame(segment_rows))
 
 
 else:
@@ -0,0 +1,114 @@
+from PIL import Image
+
+from core.exporters import decode_mask, encode_mask
+from core.image_logic import reclassify_result
+
+# =========================================================
+# RESULTS VIEW HELPERS (pagination, filtering, render cache)
+# =========================================================
+# Pure functions used by ui/app.py. The app keeps their outputs in session
+# state keyed by a "view signature", so a rerun that only changes the page
+# (or nothing) does not touch the other results.
+
+THUMBNAIL_SIZE = (360, 360)
+PAGE_SIZES = [10, 25, 50]
+DEFECT_TYPES = ["CRACK", "CORROSION", "DAMP", "HEALTHY", "INVALID", "DEFERRED"]
+
+
+def make_thumbnail(img, size=THUMBNAIL_SIZE):
+    """Small copy for the results list (the full image is kept for the PDF)."""
+    thumb = img.copy()
+    thumb.thumbnail(size, Image.BILINEAR)
+    return thumb
+
+
+def result_priority(res):
+    """Display sort key: severity first, affected % as tie-break."""
+    status = res.get('final_defect', 'NORMAL')
+    affected = res.get('affected_percentage', 0)
+
+    # Severity Map
+    severity = 0
+    if status == "CRACK": severity = 10
+    elif status == "CORROSION": severity = 5
+    elif status == "DAMP": severity = 2
+    elif status == "NORMAL" or status == "HEALTHY": severity = 1
+    elif status == "INVALID" or status == "DEFERRED": severity = 0
+
+    # Score = Severity * 1000 + Affected %
+    return (severity * 1000) + affected
+
+
+def thresholds_key(thresholds):
+    """Hashable form of a thresholds dict (for cache keys)."""
+    return tuple(sorted(thresholds.items()))
+
+
+def view_indices(results, defect_filter=None, order="upload"):
+    """
+    Indices of the results to show, filtered by final_defect and ordered
+    by upload order or by priority (highest first).
+    """
+    indices = [i for i, res in enumerate(results)
+               if not defect_filter or res.get('final_defect') in defect_filter]
+    if order == "priority":
+        # Stable: equal priorities keep upload order
+        indices.sort(key=lambda i: result_priority(results[i]), reverse=True)
+    return indices
+
+
+def page_count(total, page_size):
+    return max(1, -(-total // page_size))
+
+
+def page_slice(indices, page, page_size):
+    """Indices on a 1-based page."""
+    start = (page - 1) * page_size
+    return indices[start:start + page_size]
+
+
+def ascii_binary_map(binary_sample):
+    return "\n".join(" ".join(str(c) for c in r) for r in binary_sample)
+
+
+def summary_row(res):
+    return {
+        "Pipe ID": res['pipe_id'],
+        "File Name": res['file_name'],
+        "Status": res['final_defect'],
+        "Affected %": res['affected_percentage'],
+        "Suspicious Pixels": res['suspicious_pixels'],
+        "Explanation": res['explanation']
+    }
+
+
+def pack_mask(res):
+    """
+    Replaces the result's full-size "binary_map" (1 byte per pixel) with its
+    encoded form "mask" (core.exporters.encode_mask), the way results stay in
+    session state.
+    """
+    if 'binary_map' in res:
+        res['mask'] = encode_mask(res.pop('binary_map'))
+    return res
+
+
+def reclassify_stored(res, thresholds):
+    """reclassify_result for a stored result: its binary map is decoded from "mask"."""
+    binary_map = decode_mask(res['mask']) if 'mask' in res and 'region_table' in res else None
+    return reclassify_result(res, thresholds, binary_map)
+
+
+def segment_summaries(tracker, thresholds, cache):
+    """
+    tracker.summaries(thresholds), highest priority first. A segment's
+    summary is reused from `cache` (segment_id -> (frame count, summary),
+    kept by the caller for one threshold setting) until it gets a new frame.
+    """
+    summaries = []
+    for segment_id, segment in tracker.segments.items():
+        entry = cache.get(segment_id)
+        if entry is None or entry[0] != len(segment.frames):
+            entry = cache[segment_id] = (len(segment.frames), segment.summary(thresholds))
+        summaries.append(entry[1])
+    return sorted(summaries, key=lambda res: res["priority_score"], reverse=True)
@@ -0,0 +1,57 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from config import CLASSIFY_THRESHOLDS
+from core.batch import process_batch
+from core.image_logic import process_image_logic
+
+KEYS = ("final_defect", "explanation", "suspicious_pixels", "affected_percentage", "priority_score")
+CRACKY = {**CLASSIFY_THRESHOLDS, "sharp_gradient": 10, "linear_aspect": 1.5, "diagonal_rectangularity": 0.5}
+
+def same_result(a, b):
+    return (all(a.get(k) == b.get(k) for k in KEYS) and np.array_equal(a["region_table"], b["region_table"])
+            and np.array_equal(a.get("binary_map"), b.get("binary_map")))
+
+def verify():
+    print("--- START BATCHED ANALYSIS CHECK ---")
+    checks = []
+
+    kinds = ("crack", "corrosion", "damp", "healthy", "invalid", "checkerboard", "speckle", "crack")
+    frames = [synthetic_image(kind, 320, 240, i) for i, kind in enumerate(kinds)]
+    pipe_ids = [f"B_{i}" for i in range(len(frames))]
+
+    # Stacked frame stages + per-frame region stage = N single calls
+    for thresholds in (None, CRACKY):
+        single = [process_image_logic(frame, 320, 240, pipe_id, thresholds, return_mask=True,
+                                      time_budget=0, max_regions=0)
+                  for frame, pipe_id in zip(frames, pipe_ids)]
+        for name, batch_input in (("array", np.stack(frames)), ("list", frames)):
+            batch = process_batch(batch_input, pipe_ids, thresholds, return_mask=True, time_budget=0, max_regions=0)
+            checks.append((f"{name} of {len(frames)}, {'custom' if thresholds else 'default'} thresholds: "
+                           f"= single calls", all(same_result(b, s) for b, s in zip(batch, single))))
+        batch = process_batch(np.stack(frames), pipe_ids, thresholds, workers=3, return_mask=True,
+                              time_budget=0, max_regions=0)
+        checks.append((f"3 workers, {'custom' if thresholds else 'default'} thresholds: = single calls",
+                       all(same_result(b, s) for b, s in zip(batch, single))))
+
+    # A batch of one, and malformed input
+    one = process_batch(np.stack(frames[:1]), pipe_ids[:1], return_mask=True, time_budget=0, max_regions=0)[0]
+    checks.append(("batch of one = single call", same_result(one, process_image_logic(
+        frames[0], 320, 240, pipe_ids[0], return_mask=True, time_budget=0, max_regions=0))))
+    for name, args in (("gray stack", (np.zeros((2, 240, 320), np.uint8), ["a", "b"])),
+                       ("id count", (np.stack(frames[:2]), ["a"]))):
+        try:
+            process_batch(*args)
+            checks.append((f"{name}: ValueError", False))
+        except ValueError:
+            checks.append((f"{name}: ValueError", True))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END BATCHED ANALYSIS CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,55 @@
+import sys
+
+from benchmark_load import synthetic_image
+import numpy as np
+
+from core.image_logic import process_image_logic, reclassify_result
+
+KEYS = ("final_defect", "suspicious_pixels", "priority_score")
+
+def verify():
+    print("--- START PER-IMAGE GUARD CHECK ---")
+    checks = []
+
+    # Ordinary images never trip the default guard: same result as with the guard off
+    for kind in ("crack", "corrosion", "damp", "healthy"):
+        pixels = synthetic_image(kind, 320, 240, 1)
+        guarded = process_image_logic(pixels, 320, 240, "G")
+        reference = process_image_logic(pixels, 320, 240, "G", time_budget=0, max_regions=0)
+        checks.append((f"{kind}: default guard = guard off",
+                       "degraded" not in guarded and all(guarded[k] == reference[k] for k in KEYS)))
+
+    # 1-px checkerboard band: tens of thousands of regions
+    board = synthetic_image("checkerboard", 320, 240, 1)
+    full = process_image_logic(board, 320, 240, "B", time_budget=0, max_regions=0)
+    limit = len(full["region_table"]) // 4
+    print(f"  checkerboard: {len(full['region_table'])} regions unguarded, ceiling {limit}")
+
+    down = process_image_logic(board, 320, 240, "B", max_regions=limit, degrade="downsample")
+    checks.append(("downsample: flagged, full-frame totals",
+                   down["degraded"]["action"] == "downsampled" and down["total_pixels"] == 320 * 240
+                   and "Degraded (" in down["explanation"]))
+    again = reclassify_result(down)
+    checks.append(("downsample: reclassified with the same thresholds = unchanged",
+                   all(again[k] == down[k] for k in KEYS + ("explanation",))
+                   and np.array_equal(again["region_table"], down["region_table"])))
+    partial = process_image_logic(board, 320, 240, "B", max_regions=limit, degrade="partial")
+    checks.append(("partial: at most the ceiling of regions",
+                   partial["degraded"]["action"] == "partial" and len(partial["region_table"]) <= limit))
+    offline = process_image_logic(board, 320, 240, "B", max_regions=limit, degrade="offline")
+    checks.append(("offline: DEFERRED, marked (not queued)",
+                   offline["final_defect"] == "DEFERRED" and "marked for offline processing" in offline["explanation"]))
+
+    # A time budget too small for the region walk
+    timed = process_image_logic(board, 320, 240, "B", time_budget=1e-3, max_regions=0, degrade="partial")
+    checks.append(("time budget: partial result",
+                   timed.get("degraded", {}).get("reason") == "time_budget"
+                   and len(timed["region_table"]) < len(full["region_table"])))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END PER-IMAGE GUARD CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,57 @@
+import contextlib
+import io
+import itertools
+import os
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from benchmark_load import synthetic_image
+from calibrate_thresholds import OUTCOME_CODES, FeatureSet, extract_features, find_images, read_labels, sweep
+from core.image_logic import process_image_logic
+from input_module import load_image_array
+
+GRID = {"sharp_gradient": [10, 25, 40], "linear_aspect": [1.5, 3.5], "min_defect_area": [20, 50, 400]}
+SETTINGS = [dict(zip(GRID, values)) for values in itertools.product(*GRID.values())]
+
+def verify():
+    print("--- START CALIBRATION SWEEP CHECK ---")
+    checks = []
+
+    with tempfile.TemporaryDirectory() as root:
+        for kind, label in (("crack", "CRACK"), ("corrosion", "CORROSION"), ("damp", "DAMP"),
+                            ("healthy", "HEALTHY"), ("invalid", "INVALID")):
+            os.makedirs(os.path.join(root, label))
+            for seed in range(2):
+                Image.fromarray(synthetic_image(kind, 240, 180, seed)).save(os.path.join(root, label, f"{kind}_{seed}.png"))
+        paths = find_images(root)
+        cache = os.path.join(root, ".features.npz")
+        with contextlib.redirect_stdout(io.StringIO()):
+            features = FeatureSet(extract_features(paths, cache))
+            cached = FeatureSet(extract_features(paths, cache))
+            labels = read_labels(paths, root, None)
+        frames = [load_image_array(path)[:3] for path in paths]
+
+        # Every setting: vectorized prediction = full pipeline run with those thresholds
+        mismatches = 0
+        for setting in SETTINGS:
+            expected = [OUTCOME_CODES[process_image_logic(pixels, w, h, "C", setting)["final_defect"]]
+                        for pixels, w, h in frames]
+            mismatches += int(np.count_nonzero(features.predict(setting) != expected))
+        checks.append((f"{len(paths)} images x {len(SETTINGS)} settings: "
+                       f"sweep = pipeline ({mismatches} mismatches)", mismatches == 0))
+
+        checks.append(("cached features give the same predictions",
+                       all(np.array_equal(features.predict(s), cached.predict(s)) for s in SETTINGS)))
+        accuracies = [accuracy for _, accuracy, _ in sweep(features, labels, GRID)]
+        checks.append(("sweep accuracies in [0, 1]", len(accuracies) == len(SETTINGS) and all(0 <= a <= 1 for a in accuracies)))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END CALIBRATION SWEEP CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,55 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from config import CHANGE_MAX_FRACTION
+from core.change_detection import analyze_change
+from core.image_logic import process_image_logic
+
+KEYS = ("final_defect", "suspicious_pixels", "affected_percentage")
+
+def boxes(table):
+    return np.sort(table[["area", "min_row", "min_col", "max_row", "max_col"]])
+
+def verify():
+    print("--- START CHANGE DETECTION CHECK ---")
+    checks = []
+
+    for kind in ("crack", "corrosion", "damp"):
+        img = synthetic_image(kind, 640, 480, 1)
+        prior = process_image_logic(img, 640, 480, "P", return_mask=True)
+
+        # Re-inspection: one new crack, camera moved by a few pixels
+        new = img.copy()
+        new[300:304, 100:220] = 15
+        new = np.ascontiguousarray(np.roll(new, (5, -7), axis=(0, 1)))
+        result = analyze_change(new, 640, 480, "P", prior["binary_map"], prior["region_table"])
+        full = process_image_logic(new, 640, 480, "P")
+        change = result["change"]
+        checks.append((f"{kind}: crops give the full analysis' pixels + verdict "
+                       f"(re-analyzed {change['analyzed_fraction']:.0%}, {change['new']} new)",
+                       all(result[k] == full[k] for k in KEYS) and change["offset"] == (-5, 7)
+                       and change["new"] >= 1 and change["analyzed_fraction"] <= CHANGE_MAX_FRACTION))
+
+    # A change inside a region spanning most of the frame: one full analysis instead of crops
+    img = synthetic_image("crack", 640, 480, 1)
+    prior = process_image_logic(img, 640, 480, "P", return_mask=True)
+    table = prior["region_table"][~prior["region_table"]["is_joint"]]
+    biggest = table[np.argmax(table["area"])]
+    row, col = int(biggest["centroid_row"]), int(biggest["centroid_col"])
+    new = img.copy()
+    new[row - 20:row + 20, col - 20:col + 20] = 10
+    result = analyze_change(new, 640, 480, "P", prior["binary_map"], prior["region_table"])
+    full = process_image_logic(new, 640, 480, "P")
+    checks.append(("most of the frame changed: one full analysis, same regions",
+                   result["change"]["analyzed_fraction"] == 1.0 and all(result[k] == full[k] for k in KEYS)
+                   and np.array_equal(boxes(result["region_table"]), boxes(full["region_table"]))))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END CHANGE DETECTION CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
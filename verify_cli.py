@@ -0,0 +1,54 @@
+import contextlib
+import io
+import os
+import sys
+import tempfile
+
+from PIL import Image
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+from input_module import load_image_array
+from service.cli import analyze_path, main, start_worker, wait_for_worker, _request
+
+KEYS = ("final_defect", "suspicious_pixels", "affected_percentage", "priority_score")
+
+def verify():
+    print("--- START CLI CHECK ---")
+    failures = 0
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "PIPE_CLI.png")
+        Image.fromarray(synthetic_image("crack", 320, 240, 3)).save(path)
+        socket_arg = os.path.join(tmp, "worker.sock") if hasattr(os, "getuid") else "8799"
+
+        # Reference: the pipeline called directly
+        pixels, width, height, _ = load_image_array(path)
+        reference = process_image_logic(pixels, width, height, "PIPE_CLI")
+
+        cold = analyze_path(path)
+        start_worker(socket_arg, idle_timeout=10)
+        warm = _request(socket_arg, {"path": path}) if wait_for_worker(socket_arg) else None
+        for mode, result in (("cold", cold), ("warm", warm)):
+            ok = result is not None and all(result.get(k) == reference[k] for k in KEYS)
+            failures += not ok
+            print(f"[{'PASS' if ok else 'FAIL'}] {mode} result matches process_image_logic "
+                  f"({result and result.get('final_defect')})")
+
+        # A missing file is one ERROR line and exit code 1, cold and warm
+        for args in ([], ["--warm", "--socket", socket_arg]):
+            out = io.StringIO()
+            try:
+                with contextlib.redirect_stdout(out):
+                    code = main([os.path.join(tmp, "missing.jpg"), *args])
+                ok = code == 1 and out.getvalue().startswith("ERROR: FileNotFoundError")
+            except Exception as e:
+                print(f"  raised {type(e).__name__}: {e}")
+                ok = False
+            failures += not ok
+            print(f"[{'PASS' if ok else 'FAIL'}] missing file {'warm' if args else 'cold'}: {out.getvalue().strip()[:60]}")
+
+    print("--- END CLI CHECK ---")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
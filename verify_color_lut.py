@@ -0,0 +1,64 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from defect_detection import (DARK_PIXEL_RULES, RUST_LIKE_RULES, binary_map_rules, color_mask, exact_color_mask,
+                              rgb_to_binary_map_compact)
+
+# Reference: the original per-pixel rules, written out directly
+def binary_rule(r, g, b, dark_limit):
+    return ((r + g + b) / 3 < dark_limit) | ((r > 100) & (r > g + 20) & (r > b + 20))
+
+def dark_rule(r, g, b, _):
+    return (r < 80) & (g < 80) & (b < 80)
+
+def rust_rule(r, g, b, _):
+    return (r > g) & (r > b) & (r > 100)
+
+def cube_planes():
+    """Every 24-bit color, one red plane (256 x 256 colors) at a time."""
+    g, b = np.meshgrid(np.arange(256), np.arange(256), indexing="ij")
+    for red in range(256):
+        plane = np.empty((256, 256, 3), dtype=np.uint8)
+        plane[..., 0], plane[..., 1], plane[..., 2] = red, g, b
+        yield plane
+
+def matches_cube(rules, reference, dark_limit=None):
+    for plane in cube_planes():
+        r, g, b = (plane[..., c].astype(np.int16) for c in range(3))
+        expected = reference(r, g, b, dark_limit)
+        if not (np.array_equal(color_mask(plane, rules).astype(bool), expected)
+                and np.array_equal(exact_color_mask(plane, rules), expected)):
+            return False
+    return True
+
+def verify():
+    print("--- START COLOR LOOKUP TABLE CHECK ---")
+    checks = []
+
+    # Every color, every rule set: table + exact fallback = the per-pixel rules
+    # (fractional dark limits land inside table cells, integer ones on cell borders)
+    for dark_limit in (0, 1, 37.5, 64, 97.33333333333333, 128.25, 191.75, 256):
+        checks.append((f"binary-map rules, dark limit {dark_limit}: all 2^24 colors",
+                       matches_cube(binary_map_rules(dark_limit), binary_rule, dark_limit)))
+    checks.append(("dark pixel rules: all 2^24 colors", matches_cube(DARK_PIXEL_RULES, dark_rule)))
+    checks.append(("rust-like rules: all 2^24 colors", matches_cube(RUST_LIKE_RULES, rust_rule)))
+
+    # Whole images: lookup = exact band evaluation = the rules with the global baseline
+    for kind in ("crack", "corrosion", "damp", "healthy", "invalid", "speckle"):
+        pixels = synthetic_image(kind, 640, 480, 4)
+        r, g, b = (pixels[..., c].astype(np.int16) for c in range(3))
+        expected = binary_rule(r, g, b, pixels.sum(dtype=np.int64) / (3 * 640 * 480) * 0.75)
+        lut = rgb_to_binary_map_compact(pixels, 640, 480)
+        exact = rgb_to_binary_map_compact(pixels, 640, 480, lookup=False)
+        checks.append((f"{kind}: lookup = exact = per-pixel rules",
+                       np.array_equal(lut, exact) and np.array_equal(lut.astype(bool), expected)))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END COLOR LOOKUP TABLE CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,79 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from classification import DEFECT_CODES
+from core.band_labeling import label_runs
+from core.budget import ImageBudget
+from core.image_logic import process_image_logic
+from core.skeleton import measure_cracks, skeletonize, skeleton_metrics
+
+def reference_masks(binary_map, table):
+    """Reference: label the whole map once, region label L = component L - 1."""
+    rows, starts, ends, labels, _ = label_runs(binary_map != 0)
+    masks = {}
+    for i in np.flatnonzero(table["defect"] == DEFECT_CODES["CRACK"]):
+        row = table[i]
+        top, left = row["min_row"], row["min_col"]
+        mask = np.zeros((row["max_row"] - top + 1, row["max_col"] - left + 1), dtype=bool)
+        for r, s, e in zip(rows[labels == row["label"] - 1], starts[labels == row["label"] - 1], ends[labels == row["label"] - 1]):
+            mask[r - top, s - left:e - left] = True
+        masks[i] = mask
+    return masks
+
+def shape_metrics(draw):
+    mask = np.zeros((60, 60), dtype=bool)
+    draw(mask)
+    return skeleton_metrics(skeletonize(mask))
+
+def bar(m):
+    m[28:31, 5:55] = True
+
+def y_shape(m):
+    m[5:30, 28:31] = True
+    for k in range(25):
+        m[30 + k, 28 - k:31 - k] = True
+        m[30 + k, 28 + k:31 + k] = True
+
+def x_shape(m):
+    m[29:31, 5:55] = True
+    m[5:55, 29:31] = True
+
+def verify():
+    print("--- START CRACK SKELETON CHECK ---")
+    checks = []
+
+    # Known shapes: straight line, Y, X
+    length, branches = shape_metrics(bar)
+    checks.append((f"3 px bar: length {length:.1f} ~ 50, 1 branch", 44 <= length <= 50 and branches == 1))
+    checks.append(("Y: 3 branches", shape_metrics(y_shape)[1] == 3))
+    checks.append(("X: 4 branches", shape_metrics(x_shape)[1] == 4))
+
+    # Crop labeling gives the same region pixels as the whole-map reference
+    for seed in range(3):
+        pixels = synthetic_image("crack", 640, 480, seed)
+        result = process_image_logic(pixels, 640, 480, "C", return_mask=True)
+        table, binary_map = result["region_table"], result["binary_map"]
+        expected = table.copy()
+        for i, mask in reference_masks(binary_map, table).items():
+            skeleton = skeletonize(mask)
+            expected["skeleton_length"][i] = skeleton_metrics(skeleton)[0]
+        cracks = table["defect"] == DEFECT_CODES["CRACK"]
+        same = np.allclose(table["skeleton_length"][cracks], expected["skeleton_length"][cracks])
+        checks.append((f"crack seed {seed}: {cracks.sum()} crack(s) match whole-map labeling", bool(cracks.any()) and same))
+
+    # An expired budget leaves the cracks unmeasured (counted, not silently skipped)
+    table["skeleton_length"] = 0
+    budget = ImageBudget(seconds=1e-9, max_regions=0)
+    unmeasured = measure_cracks(binary_map, table, budget)
+    checks.append(("expired budget: cracks reported unmeasured",
+                   unmeasured == int(cracks.sum()) and not table["skeleton_length"].any()))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END CRACK SKELETON CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
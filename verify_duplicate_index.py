@@ -0,0 +1,52 @@
+import random
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.duplicate_index import DuplicateIndex, hamming_distance, perceptual_hash
+
+def brute_force(hashes, query, max_distance):
+    """Reference: linear scan, closest stored hash within max_distance (or None)."""
+    distances = [hamming_distance(query, h) for h in hashes]
+    best = min(distances)
+    return best if best <= max_distance else None
+
+def verify():
+    print("--- START DUPLICATE INDEX CHECK ---")
+    checks = []
+
+    # BK-tree lookups = linear scan, random hashes + near copies
+    rng = random.Random(11)
+    hashes = [rng.getrandbits(64) for _ in range(1500)]
+    hashes += [h ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64)) for h in hashes[:300]]
+    index = DuplicateIndex()
+    for i, h in enumerate(hashes):
+        index.add(h, i)
+    queries = [rng.getrandbits(64) for _ in range(200)] + [h ^ (1 << rng.randrange(64)) for h in hashes[::7]]
+    for max_distance in (0, 2, 4, 8, 16):
+        ok = True
+        for query in queries:
+            found, expected = index.find(query, max_distance), brute_force(hashes, query, max_distance)
+            if expected is None:
+                ok &= found is None
+            else:
+                # Ties: any item at the closest distance
+                ok &= found is not None and found[1] == expected and hamming_distance(query, hashes[found[0]]) == expected
+        checks.append((f"max distance {max_distance}: BK-tree = linear scan ({len(queries)} queries)", ok))
+
+    # Perceptual hash: re-uploads (also with another exposure) are near, other shots are not
+    for kind in ("crack", "corrosion", "damp"):
+        pixels = synthetic_image(kind, 640, 480, 0)
+        brighter = np.clip(pixels.astype(np.float32) * 1.1, 0, 255).astype(np.uint8)
+        near = hamming_distance(perceptual_hash(pixels), perceptual_hash(brighter))
+        far = hamming_distance(perceptual_hash(pixels), perceptual_hash(synthetic_image(kind, 640, 480, 1)))
+        checks.append((f"{kind}: brighter re-upload {near} bits, other shot {far} bits", near <= 4 < far))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END DUPLICATE INDEX CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
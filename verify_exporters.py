@@ -0,0 +1,86 @@
+import csv
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.change_detection import load_prior
+from core.exporters import CsvExporter, JsonlExporter, decode_mask
+from core.image_logic import process_image_logic
+from core.region_table import region_table_from_records
+
+SUMMARY = ("final_defect", "suspicious_pixels", "total_pixels", "priority_score", "explanation")
+REGION_COLUMNS = ("area", "min_row", "min_col", "max_row", "max_col", "defect")
+
+def verify():
+    print("--- START STREAMING EXPORT CHECK ---")
+    checks = []
+
+    results = {}
+    for i, kind in enumerate(("crack", "corrosion", "damp", "healthy")):
+        result = process_image_logic(synthetic_image(kind, 320, 240, i), 320, 240, f"PIPE_{i}", return_mask=True)
+        result["pipe_id"] = f"PIPE_{i}"
+        results[f"img_{i}"] = result
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # JSONL: summary, region table and mask read back = the results
+        path = os.path.join(tmp, "out.jsonl")
+        with JsonlExporter(path, include_regions=True, include_mask=True) as out:
+            for key, result in results.items():
+                out.write(key, result)
+        with open(path, encoding="utf-8") as f:
+            records = {rec["key"]: rec for rec in map(json.loads, f)}
+        checks.append(("jsonl: summaries", all(records[k][f] == r[f] for k, r in results.items() for f in SUMMARY)))
+        checks.append(("jsonl: region tables + masks round-trip",
+                       all(np.array_equal(region_table_from_records(records[k]["regions"]), r["region_table"])
+                           and np.array_equal(decode_mask(records[k]["mask"]), r["binary_map"])
+                           for k, r in results.items())))
+        prior_map, prior_table = load_prior(path, "PIPE_2")
+        checks.append(("jsonl: load_prior finds the pipe", np.array_equal(prior_map, results["img_2"]["binary_map"])
+                       and np.array_equal(prior_table, results["img_2"]["region_table"])))
+
+        # Resume after a crash mid-write: torn line dropped, exported keys skipped
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('{"key": "img_9", "final_de')
+        with JsonlExporter(path) as out:
+            resumed = len(out) == 4 and not out.write("img_0", results["img_0"]) and out.write("img_9", results["img_1"])
+        with open(path, encoding="utf-8") as f:
+            lines = [json.loads(line)["key"] for line in f]
+        checks.append(("jsonl: resume skips done keys, drops the torn line",
+                       resumed and lines == ["img_0", "img_1", "img_2", "img_3", "img_9"]))
+
+        # CSV: summary rows + region rows joined on key
+        path = os.path.join(tmp, "out.csv")
+        with CsvExporter(path, include_regions=True, include_mask=True) as out:
+            for key, result in results.items():
+                out.write(key, result)
+        with open(path, newline="", encoding="utf-8") as f:
+            rows = {row["key"]: row for row in csv.DictReader(f)}
+        ok = True
+        for key, result in results.items():
+            row = rows[key]
+            shape, _, data = row["mask"].partition(":")
+            mask = decode_mask({"shape": [int(n) for n in shape.split("x")], "data": data})
+            ok &= row["final_defect"] == result["final_defect"] and int(row["suspicious_pixels"]) == result["suspicious_pixels"]
+            ok &= np.array_equal(mask, result["binary_map"])
+        checks.append(("csv: summaries + masks", ok))
+        with open(os.path.splitext(path)[0] + "_regions.csv", newline="", encoding="utf-8") as f:
+            region_rows = list(csv.DictReader(f))
+        ok = len(region_rows) == sum(len(r["region_table"]) for r in results.values())
+        for key, result in results.items():
+            rows_of_key = [row for row in region_rows if row["key"] == key]
+            table = region_table_from_records(
+                [{**{c: int(row[c]) for c in REGION_COLUMNS[:-1]}, "defect": row["defect"]} for row in rows_of_key])
+            ok &= all(np.array_equal(table[c], result["region_table"][c]) for c in REGION_COLUMNS)
+        checks.append(("csv: region rows = region tables", ok))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END STREAMING EXPORT CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
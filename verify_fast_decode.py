@@ -0,0 +1,57 @@
+import io
+import sys
+
+import numpy as np
+from PIL import Image
+
+from input_module import load_image, load_image_array
+
+def encoded(img, fmt):
+    buffer = io.BytesIO()
+    img.save(buffer, format=fmt)
+    buffer.seek(0)
+    return buffer
+
+def verify():
+    print("--- START FAST DECODE CHECK ---")
+    rng = np.random.default_rng(7)
+    rgb = Image.fromarray(rng.integers(0, 256, (1200, 1600, 3), dtype=np.uint8))
+    images = {
+        "RGB": rgb,
+        "L": rgb.convert("L"),
+        "RGBA": rgb.convert("RGBA"),
+        "P": rgb.convert("P"),
+        "1": rgb.convert("1"),
+        "I;16": Image.fromarray(rng.integers(0, 256, (1200, 1600), dtype=np.uint16)),
+    }
+    failures = 0
+    for mode, img in images.items():
+        # Full size: same pixels as the reference PIL path
+        pixels, width, height, _ = load_image_array(encoded(img, "PNG"))
+        reference, ref_width, ref_height = load_image(encoded(img, "PNG"))
+        same = (width, height) == (ref_width, ref_height) and all(
+            tuple(pixels[r, c]) == reference[c, r] for r, c in ((0, 0), (600, 800), (1199, 1599)))
+
+        # Reduced size: no exception, covers the target, RGB uint8
+        try:
+            small, small_w, small_h, _ = load_image_array(encoded(img, "PNG"), (640, 480))
+            reduced = small.shape == (small_h, small_w, 3) and small.dtype == np.uint8 and small_w >= 640 and small_h >= 480
+        except Exception as e:
+            print(f"  {mode}: reduced decode raised {type(e).__name__}: {e}")
+            reduced = False
+
+        status = "PASS" if same and reduced else "FAIL"
+        failures += status == "FAIL"
+        print(f"[{status}] {mode}: full {width}x{height}, reduced {small_w if reduced else '-'}x{small_h if reduced else '-'}")
+
+    # JPEG draft mode: reduced decode covers the target
+    small, small_w, small_h, _ = load_image_array(encoded(rgb, "JPEG"), (640, 480))
+    ok = small_w >= 640 and small_h >= 480 and small_w < 1600
+    failures += not ok
+    print(f"[{'PASS' if ok else 'FAIL'}] JPEG draft decode: {small_w}x{small_h}")
+
+    print("--- END FAST DECODE CHECK ---")
+    return failures == 0
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
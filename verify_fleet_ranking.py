@@ -0,0 +1,65 @@
+import csv
+import os
+import random
+import sys
+import tempfile
+
+from rank_fleet import rank
+from severity_priority import TopK, merge_top_k, read_shard, write_shard
+
+def full_sort(entries, k):
+    """Reference: sort everything (score descending, pipe_id ascending), first of every key, cut at k."""
+    top, seen = [], set()
+    for entry in sorted(entries, key=lambda e: (-e["priority_score"], str(e["pipe_id"]))):
+        if entry.get("key") in seen:
+            continue
+        seen.add(entry.get("key"))
+        top.append(entry)
+    return top[:k]
+
+def ranking(entries):
+    return [(e["pipe_id"], e["priority_score"]) for e in entries]
+
+def verify():
+    print("--- START FLEET RANKING CHECK ---")
+    checks = []
+
+    # Shards with coarse scores (many ties) and images seen by two workers
+    rng = random.Random(5)
+    shards = [[{"pipe_id": f"PIPE_{rng.randrange(400):04d}", "key": f"w{w}_{i}",
+                "priority_score": rng.choice((0, 2000, 5000, 10000)) + rng.randrange(4)}
+               for i in range(rng.randrange(50, 300))] for w in range(5)]
+    for entry in shards[0][:40]:
+        shards[3].append({**entry, "priority_score": entry["priority_score"] - 1})
+    everything = [entry for shard in shards for entry in shard]
+
+    for k in (0, 1, 7, 50, 2000):
+        merged = merge_top_k([TopK(k).extend(shard).items() for shard in shards], k)
+        checks.append((f"k={k}: TopK per shard + k-way merge = full sort", ranking(merged) == ranking(full_sort(everything, k))))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # Shard files: written highest first, merged lazily from disk
+        paths = []
+        for w, shard in enumerate(shards):
+            paths.append(os.path.join(tmp, f"w{w}.top_k.jsonl"))
+            write_shard(paths[-1], TopK(20).extend(shard))
+        merged = merge_top_k([read_shard(path) for path in paths], 20)
+        checks.append(("shard files merged = full sort", ranking(merged) == ranking(full_sort(everything, 20))))
+
+        # rank_fleet over a JSONL shard and a CSV export
+        csv_path = os.path.join(tmp, "site.csv")
+        with open(csv_path, "w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, ["key", "pipe_id", "final_defect", "priority_score", "affected_percentage"])
+            writer.writeheader()
+            for entry in shards[4]:
+                writer.writerow({**entry, "final_defect": "CRACK", "affected_percentage": ""})
+        ranked = rank(paths[:4] + [csv_path], 20)
+        checks.append(("rank_fleet: jsonl shards + csv = full sort", ranking(ranked) == ranking(full_sort(everything, 20))))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END FLEET RANKING CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
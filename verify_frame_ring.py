@@ -0,0 +1,109 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+from PIL import Image
+
+from benchmark_load import synthetic_image
+from service.frame_ring import IDLE, FrameRingPipeline
+from service.watch_folder import WatchFolder, analyze_pixels, decode_file
+
+KEYS = ("final_defect", "explanation", "suspicious_pixels", "affected_percentage", "priority_score", "width", "height")
+
+def ledger(directory, shared_memory):
+    path = os.path.join(directory, f".processed_{shared_memory}.jsonl")
+    watcher = WatchFolder(directory, ledger_path=path, settle=0, workers=2, decoders=2, shared_memory=shared_memory)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(watcher.run(once=True))
+    with open(path, encoding="utf-8") as f:
+        return {record["file_name"]: record for record in map(json.loads, f)}
+
+def verify():
+    print("--- START SHARED-MEMORY FRAME RING CHECK ---")
+    checks = []
+
+    with tempfile.TemporaryDirectory() as inbox:
+        paths = []
+        for i, kind in enumerate(("crack", "corrosion", "damp", "healthy", "invalid", "speckle", "crack")):
+            width, height = (320, 240) if i % 3 else (240, 320) # Slots reused with another frame shape
+            pixels = synthetic_image(kind, width, height, i)
+            paths.append(os.path.join(inbox, f"pipe_{i}.{'npy' if i % 2 else 'png'}"))
+            if i % 2:
+                np.save(paths[-1], pixels)
+            else:
+                Image.fromarray(pixels).save(paths[-1])
+        big = os.path.join(inbox, "big.npy")
+        np.save(big, synthetic_image("healthy", 640, 480, 0))
+        broken = os.path.join(inbox, "broken.jpg")
+        with open(broken, "wb") as f:
+            f.write(b"not an image")
+
+        # Reference: decode + analyze in this process
+        expected = {}
+        for path in paths:
+            pixels, width, height, _ = decode_file(path, None)
+            pipe_id = os.path.splitext(os.path.basename(path))[0]
+            expected[path] = analyze_pixels(pixels, width, height, pipe_id, keep_regions=True, keep_mask=True)
+
+        # Fewer slots than frames, slot smaller than the big frame
+        with FrameRingPipeline(workers=2, decoders=2, slots=2, slot_pixels=320 * 240, queue_size=2,
+                               keep_regions=True, keep_mask=True) as pipeline:
+            for path in paths + [big, broken]:
+                pipeline.submit(path, path)
+            results = {}
+            for _ in range(len(paths) + 2):
+                message = pipeline.get_result(timeout=120)
+                if message is None:
+                    break
+                results[message[0]] = message[2]
+
+        checks.append(("every frame comes back once", sorted(results) == sorted(paths + [big, broken])))
+        checks.append(("ring results = direct analysis", all(
+            path in results and all(results[path].get(k) == ref.get(k) for k in KEYS)
+            and np.array_equal(results[path]["region_table"], ref["region_table"])
+            and results[path].get("mask") == ref.get("mask")
+            for path, ref in expected.items())))
+        checks.append(("frame larger than a slot: error result", "error" in results.get(big, {})))
+        checks.append(("undecodable file: error result", "error" in results.get(broken, {})))
+
+        # A process dies while holding a frame: its job is reported, the rest runs on restarted processes
+        for role, index in (("decoder", 0), ("analyzer", 1)):
+            with FrameRingPipeline(workers=1, decoders=1, slots=1, slot_pixels=320 * 320, poll=0.1) as pipeline:
+                for path in paths:
+                    pipeline.submit(path, path)
+                start = time.monotonic()
+                while pipeline.holdings[index] == IDLE and time.monotonic() - start < 30:
+                    time.sleep(0.0005)
+                pipeline.processes[index].kill()
+                finished = [pipeline.get_result(timeout=60) for _ in paths]
+                lost = [message for message in finished if message is not None and message[2].get("lost")]
+                ok = None not in finished and len(lost) == 1 and pipeline.restarts == 1 and all(
+                    all(result.get(k) == expected[path].get(k) for k in KEYS)
+                    for path, _, result in finished if not result.get("lost"))
+                if ok: # The lost file goes through on a retry
+                    pipeline.submit(lost[0][0], lost[0][1])
+                    again = pipeline.get_result(timeout=60)
+                    ok = again is not None and again[2].get("final_defect") == expected[lost[0][0]]["final_defect"]
+                checks.append((f"{role} killed mid-frame: job reported lost, others = direct analysis", ok))
+
+        # Watch folder: shared-memory mode = process-pool mode
+        os.remove(big)
+        pooled, shared = ledger(inbox, False), ledger(inbox, True)
+        checks.append(("watch folder ledger: shared memory = process pool",
+                       sorted(pooled) == sorted(shared) and len(shared) == len(paths) + 1 and all(
+                           all(shared[name].get(k) == record.get(k) for k in KEYS + ("error",))
+                           for name, record in pooled.items())))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END SHARED-MEMORY FRAME RING CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
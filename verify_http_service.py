@@ -0,0 +1,80 @@
+import http.client
+import io
+import json
+import os
+import signal
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+from service.http_server import make_server
+
+KEYS = ("final_defect", "suspicious_pixels", "affected_percentage", "priority_score")
+
+def png_bytes(pixels):
+    buffer = io.BytesIO()
+    Image.fromarray(pixels).save(buffer, format="PNG")
+    return buffer.getvalue()
+
+def post(port, path, body):
+    conn = http.client.HTTPConnection("127.0.0.1", port, timeout=120)
+    conn.request("POST", path, body=body)
+    response = conn.getresponse()
+    status, payload = response.status, response.read()
+    conn.close()
+    return status, json.loads(payload)
+
+def raw_post(port, content_length):
+    with socket.create_connection(("127.0.0.1", port), timeout=30) as sock:
+        sock.sendall(f"POST /analyze HTTP/1.0\r\nContent-Length: {content_length}\r\n\r\n".encode())
+        reply = sock.makefile("rb").read().decode("utf-8", "replace")
+    return int(reply.split()[1]), json.loads(reply.split("\r\n\r\n", 1)[1])
+
+def verify():
+    print("--- START HTTP SERVICE CHECK ---")
+    server, service = make_server("127.0.0.1", 0, max_body_bytes=2**20, workers=1, max_batch=4, batch_wait=0.2)
+    port = server.server_address[1]
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    checks = []
+    try:
+        frames = [synthetic_image(kind, 320, 240, 5) for kind in ("crack", "corrosion", "damp")]
+        references = [process_image_logic(f, 320, 240, f"P{i}") for i, f in enumerate(frames)]
+
+        # Concurrent requests of one size are micro-batched: same answers as single calls
+        with ThreadPoolExecutor(3) as clients:
+            answers = list(clients.map(lambda i: post(port, f"/analyze?pipe_id=P{i}", png_bytes(frames[i])), range(3)))
+        checks.append(("batched results match process_image_logic",
+                       all(s == 200 and all(a[k] == r[k] for k in KEYS) for (s, a), r in zip(answers, references))))
+
+        # Bad input is a 400 with a JSON error, never a dropped connection
+        checks.append(("max_side=abc -> 400", post(port, "/analyze?max_side=abc", png_bytes(frames[0]))[0] == 400))
+        checks.append(("undecodable body -> 400", post(port, "/analyze", b"not an image")[0] == 400))
+        checks.append(("bad Content-Length -> 400", raw_post(port, "abc")[0] == 400))
+        checks.append(("10 GB Content-Length -> 413 without reading the body", raw_post(port, 10 * 2**30)[0] == 413))
+
+        # A killed worker process breaks the pool; the service rebuilds it
+        for pid in list(service.pool._processes):
+            os.kill(pid, signal.SIGKILL)
+        time.sleep(1)
+        post(port, "/analyze?pipe_id=P0", png_bytes(frames[0])) # may fail: it can land on the broken pool
+        status, answer = post(port, "/analyze?pipe_id=P0", png_bytes(frames[0]))
+        checks.append(("service recovers after a worker crash",
+                       status == 200 and answer["final_defect"] == references[0]["final_defect"]))
+    finally:
+        server.shutdown()
+        server.server_close()
+        service.shutdown()
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END HTTP SERVICE CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
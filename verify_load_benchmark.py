@@ -0,0 +1,42 @@
+import sys
+
+import benchmark_load
+from benchmark_load import EXPECTED, build_workload, run_load, synthetic_image
+from core.image_logic import process_image_logic
+
+def verify():
+    print("--- START LOAD BENCHMARK CHECK ---")
+    checks = []
+
+    # Workload: deterministic, kinds only from the mix, sizes cycled
+    specs = build_workload(8, [(320, 240), (240, 320)], seed=3)
+    checks.append(("workload: same seed, same specs", specs == build_workload(8, [(320, 240), (240, 320)], seed=3)))
+    mixed = build_workload(20, [(320, 240)], mix={"crack": 1, "speckle": 1}, seed=3)
+    checks.append(("workload: kinds from the mix only", {s[0] for s in mixed} <= {"crack", "speckle"}))
+    checks.append(("workload: sizes cycled", [s[1:3] for s in specs[:2]] == [(320, 240), (240, 320)]))
+
+    # Worker batches = direct analysis of the same images
+    direct = [process_image_logic(synthetic_image(*spec), spec[1], spec[2], f"LOAD_{i:05d}")["final_defect"]
+              for i, spec in enumerate(specs)]
+    benchmark_load._init_worker(specs)
+    batch = benchmark_load._run_batch(range(len(specs)))
+    checks.append(("worker batch labels = direct analysis", [label for _, label, _, _ in batch] == direct))
+
+    # Report: every image accounted for, label rate = direct agreement with the intended kinds
+    labeled = [(spec[0], label) for spec, label in zip(specs, direct) if spec[0] in EXPECTED]
+    expected_rate = round(sum(EXPECTED[kind] == label for kind, label in labeled) / len(labeled), 3)
+    for workers, batch_size in ((1, 1), (2, 3)):
+        report = run_load(specs, workers, batch_size, rounds=2)
+        checks.append((f"{workers} workers, batch {batch_size}: {report['images']} images, "
+                       f"label rate {report['expected_label_rate']} (direct {expected_rate})",
+                       report["images"] == 2 * len(specs) and report["expected_label_rate"] == expected_rate
+                       and report["throughput_ips"] > 0
+                       and report["latency"]["p50_ms"] <= report["latency"]["p95_ms"]))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END LOAD BENCHMARK CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,43 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+from core.memory_profile import StageMemoryProfiler
+from defect_detection import compile_color_mask
+from profile_memory import synthetic_pipe
+
+KEYS = ("final_defect", "explanation", "suspicious_pixels", "affected_percentage", "priority_score")
+PEAK_LIMIT = 3.0 # x input
+
+def verify():
+    print("--- START LOW-MEMORY MODE CHECK ---")
+    checks = []
+
+    # Same answers as the reference (normal) pipeline
+    for kind in ("crack", "corrosion", "damp", "healthy", "invalid"):
+        pixels = synthetic_image(kind, 320, 240, 2)
+        normal = process_image_logic(pixels, 320, 240, "M")
+        low = process_image_logic(pixels, 320, 240, "M", low_memory=True)
+        same = (all(normal.get(k) == low.get(k) for k in KEYS)
+                and np.array_equal(normal["region_table"], low["region_table"]))
+        checks.append((f"{kind}: low-memory result = normal result", same))
+
+    # Peak traced memory, cold color-table cache, crack metrics on
+    for width, height in ((400, 300), (640, 480)):
+        pixels = synthetic_pipe(width, height)
+        compile_color_mask.cache_clear()
+        with StageMemoryProfiler(pixels.nbytes) as profiler:
+            process_image_logic(pixels, width, height, "PROFILE", low_memory=True, profiler=profiler,
+                                time_budget=0, max_regions=0)
+        ratio = profiler.peak_bytes() / pixels.nbytes
+        checks.append((f"{width}x{height}: peak {ratio:.2f}x input < {PEAK_LIMIT}x", ratio < PEAK_LIMIT))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END LOW-MEMORY MODE CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
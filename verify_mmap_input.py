@@ -0,0 +1,79 @@
+import os
+import sys
+import tempfile
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+from input_module import open_frame
+
+KEYS = ("final_defect", "explanation", "suspicious_pixels", "affected_percentage", "priority_score")
+
+def same_result(a, b):
+    return all(a.get(k) == b.get(k) for k in KEYS) and np.array_equal(a["region_table"], b["region_table"])
+
+def verify():
+    print("--- START MEMORY-MAPPED INPUT CHECK ---")
+    checks = []
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for kind in ("crack", "damp", "invalid"):
+            pixels = synthetic_image(kind, 320, 240, 5)
+            reference = process_image_logic(pixels, 320, 240, "M")
+
+            npy_path = os.path.join(tmp, f"{kind}.npy")
+            np.save(npy_path, pixels)
+            frame, width, height = open_frame(npy_path)
+            checks.append((f"{kind}: .npy frame is a file view, same result",
+                           not frame.flags.owndata and (width, height) == (320, 240)
+                           and same_result(process_image_logic(frame, width, height, "M"), reference)))
+
+            # Raw capture: 16-byte header, RGBX pixels
+            raw_path = os.path.join(tmp, f"{kind}.raw")
+            with open(raw_path, "wb") as f:
+                f.write(b"\0" * 16)
+                f.write(np.dstack([pixels, np.full((240, 320), 255, np.uint8)]).tobytes())
+            frame, width, height = open_frame(raw_path, 320, 240, channels=4, offset=16)
+            checks.append((f"{kind}: raw RGBX frame, same result",
+                           same_result(process_image_logic(frame, width, height, "M"), reference)))
+            checks.append((f"{kind}: raw frame, low-memory mode",
+                           same_result(process_image_logic(frame, width, height, "M", low_memory=True), reference)))
+
+        # Crop window = analysis of the same crop in memory
+        pixels = synthetic_image("corrosion", 640, 480, 5)
+        np.save(os.path.join(tmp, "big.npy"), pixels)
+        tile, width, height = open_frame(os.path.join(tmp, "big.npy"), crop=(100, 200, 240, 320))
+        reference = process_image_logic(np.ascontiguousarray(pixels[100:340, 200:520]), 320, 240, "M")
+        checks.append(("crop window = in-memory crop",
+                       (width, height) == (320, 240) and same_result(process_image_logic(tile, width, height, "M"), reference)))
+
+        try:
+            open_frame(os.path.join(tmp, "crack.raw"))
+            checks.append(("raw frame without a size is rejected", False))
+        except ValueError:
+            checks.append(("raw frame without a size is rejected", True))
+
+        # 16-bit sensor frame: rejected (no silent clipping to 255, no full copy)
+        np.save(os.path.join(tmp, "sensor16.npy"), pixels.astype(np.uint16) << 4)
+        try:
+            open_frame(os.path.join(tmp, "sensor16.npy"))
+            checks.append(("16-bit frame is rejected", False))
+        except ValueError:
+            checks.append(("16-bit frame is rejected", True))
+        try:
+            process_image_logic(pixels.astype(np.uint16) << 4, 640, 480, "M")
+            checks.append(("16-bit array is rejected by the analysis", False))
+        except ValueError:
+            checks.append(("16-bit array is rejected by the analysis", True))
+        wide = process_image_logic(pixels.astype(np.int64), 640, 480, "M")
+        checks.append(("8-bit values in a wider dtype = uint8 analysis",
+                       same_result(wide, process_image_logic(pixels, 640, 480, "M"))))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END MEMORY-MAPPED INPUT CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,36 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+
+KEYS = ("final_defect", "explanation", "suspicious_pixels", "affected_percentage", "priority_score")
+
+def same_result(a, b):
+    same_mask = ("binary_map" in a) == ("binary_map" in b) and np.array_equal(a.get("binary_map"), b.get("binary_map"))
+    return all(a.get(k) == b.get(k) for k in KEYS) and np.array_equal(a["region_table"], b["region_table"]) and same_mask
+
+def verify():
+    print("--- START INTRA-IMAGE PARALLELISM CHECK ---")
+    checks = []
+
+    # Row bands + thread pool = serial reference, incl. regions crossing band borders
+    for kind in ("crack", "corrosion", "damp", "healthy", "invalid", "speckle"):
+        pixels = synthetic_image(kind, 640, 480, 6)
+        serial = process_image_logic(pixels, 640, 480, "P", return_mask=True, time_budget=0, max_regions=0)
+        for workers in (2, 4):
+            parallel = process_image_logic(pixels, 640, 480, "P", return_mask=True, time_budget=0, max_regions=0,
+                                           workers=workers)
+            checks.append((f"{kind}: {workers} workers = serial", same_result(parallel, serial)))
+        low = process_image_logic(pixels, 640, 480, "P", return_mask=True, time_budget=0, max_regions=0,
+                                  workers=3, low_memory=True)
+        checks.append((f"{kind}: 3 workers + low memory = serial", same_result(low, serial)))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END INTRA-IMAGE PARALLELISM CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
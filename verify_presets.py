@@ -0,0 +1,84 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import EXPECTED, synthetic_image
+from config import ANALYSIS_PRESETS, DEFAULT_PRESET
+from core.analysis_config import AnalysisConfig, pyramid_level, resolve_config
+from core.batch import process_batch
+from core.budget import upscale_result
+from core.image_logic import process_image_logic, reclassify_result
+
+KEYS = ("final_defect", "explanation", "suspicious_pixels", "total_pixels", "affected_percentage", "priority_score")
+KINDS = ("crack", "corrosion", "damp", "healthy", "invalid")
+GUARD = {"time_budget": 0, "max_regions": 0}
+
+def same_result(a, b):
+    return (all(a.get(k) == b.get(k) for k in KEYS) and np.array_equal(a["region_table"], b["region_table"])
+            and np.array_equal(a.get("binary_map"), b.get("binary_map")))
+
+def raises(call):
+    try:
+        call()
+    except ValueError:
+        return True
+    return False
+
+def verify():
+    print("--- START ANALYSIS PRESET CHECK ---")
+    checks = []
+
+    # Every way of asking for the default is the default preset
+    default = AnalysisConfig()
+    checks.append(("None / name / {} / dict = default preset", default.preset == DEFAULT_PRESET and all(
+        resolve_config(c) == default for c in (None, DEFAULT_PRESET, {}, dict(ANALYSIS_PRESETS[DEFAULT_PRESET])))))
+    checks.append(("dict overrides on top of a preset",
+                   resolve_config({"preset": "fast", "edge_stride": 2}) == AnalysisConfig("fast").replace(edge_stride=2)))
+    checks.append(("unknown preset / knob: ValueError",
+                   raises(lambda: AnalysisConfig("fastest")) and raises(lambda: resolve_config({"stride": 2}))))
+
+    frames = {kind: synthetic_image(kind, 640, 480, 2) for kind in KINDS}
+    big = {kind: synthetic_image(kind, 1280, 960, 2) for kind in KINDS}
+
+    # Default preset = the pipeline without a config
+    checks.append((f"{DEFAULT_PRESET} = no config", all(same_result(
+        process_image_logic(pixels, 640, 480, "C", return_mask=True, config=DEFAULT_PRESET, **GUARD),
+        process_image_logic(pixels, 640, 480, "C", return_mask=True, **GUARD)) for pixels in frames.values())))
+
+    for preset in ANALYSIS_PRESETS:
+        for size, images in (("640x480", frames), ("1280x960", big)):
+            height, width = next(iter(images.values())).shape[:2]
+            single = [process_image_logic(pixels, width, height, f"C_{i}", return_mask=True, config=preset, **GUARD)
+                      for i, pixels in enumerate(images.values())]
+            # Batch parity per preset
+            batch = process_batch(np.stack(list(images.values())), [f"C_{i}" for i in range(len(images))],
+                                  return_mask=True, config=preset, **GUARD)
+            checks.append((f"{preset} {size}: batch = single calls", all(map(same_result, batch, single))))
+            # Intended labels of the synthetic kinds survive every preset (at the load benchmark size)
+            if images is frames:
+                labels = [r["final_defect"] for r in single]
+                checks.append((f"{preset} {size}: labels {labels}", labels == [EXPECTED[kind] for kind in images]))
+
+    # Fast preset on a big frame = analysis of the pyramid level, mapped back to full size
+    for kind, pixels in big.items():
+        result = process_image_logic(pixels, 1280, 960, "C", return_mask=True, config="fast", **GUARD)
+        level = process_image_logic(pyramid_level(pixels, 2), 640, 480, "C", return_mask=True,
+                                    config=AnalysisConfig("fast", pyramid_levels=0), **GUARD)
+        if "binary_map" not in result:
+            level.pop("binary_map", None)
+        reference = upscale_result(level, 2, 1280, 960)
+        checks.append((f"fast 1280x960 {kind}: = half-resolution analysis upscaled",
+                       result.get("pyramid_factor") == 2 and same_result(result, reference)))
+        # Area thresholds stay in analyzed pixels: unchanged thresholds, unchanged result
+        checks.append((f"fast 1280x960 {kind}: reclassified with the same thresholds = unchanged",
+                       same_result(reclassify_result(result), result)))
+    small = process_image_logic(frames["crack"], 640, 480, "C", config="fast", **GUARD)
+    checks.append(("fast 640x480: short side too small for a pyramid level", "pyramid_factor" not in small))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END ANALYSIS PRESET CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,48 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+from core.quick_look import quick_look, triage
+from defect_detection import rgb_to_binary_map_compact
+
+SEEDS = 100
+MIN_COVERAGE = 0.9 # nominal 95% intervals
+
+def verify():
+    print("--- START QUICK LOOK CHECK ---")
+    checks = []
+
+    # Interval coverage of the exact full-frame values over many samples
+    # ("sparse": 0.4% dark specks on a clean wall, close to the triage threshold)
+    sparse = np.clip(np.random.default_rng(1).normal(150, 4, (480, 640, 3)), 0, 255).astype(np.uint8)
+    sparse[np.random.default_rng(2).random((480, 640)) < 0.004] = 30
+    for kind in ("crack", "corrosion", "damp", "speckle", "sparse"):
+        pixels = sparse if kind == "sparse" else synthetic_image(kind, 640, 480, 0)
+        affected = rgb_to_binary_map_compact(pixels, 640, 480).mean() * 100
+        brightness = pixels.sum(dtype=np.int64) / pixels.size
+        estimates = [quick_look(pixels, seed=seed) for seed in range(SEEDS)]
+        covered = np.mean([lo <= affected <= hi for lo, hi in (e["affected_percentage_ci"] for e in estimates)])
+        covered_b = np.mean([lo <= brightness <= hi for lo, hi in (e["brightness_ci"] for e in estimates)])
+        checks.append((f"{kind}: affected {affected:.2f}% inside the CI in {covered:.0%} of samples, "
+                       f"brightness in {covered_b:.0%}", covered >= MIN_COVERAGE and covered_b >= MIN_COVERAGE))
+
+    # Triage: clean frames skipped, affected ones get the full analysis unchanged
+    clean = np.clip(np.random.default_rng(0).normal(150, 4, (480, 640, 3)), 0, 255).astype(np.uint8)
+    skipped = triage(clean, 640, 480, "Q", min_affected=0.5)
+    checks.append(("clean frame: skipped, estimated HEALTHY",
+                   skipped.get("estimated") and skipped["final_defect"] == "HEALTHY"))
+    pixels = synthetic_image("crack", 640, 480, 0)
+    full = process_image_logic(pixels, 640, 480, "Q")
+    result = triage(pixels, 640, 480, "Q", min_affected=0.5)
+    checks.append(("crack frame: full analysis", not result.get("estimated")
+                   and all(result[k] == full[k] for k in ("final_defect", "suspicious_pixels", "priority_score"))))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END QUICK LOOK CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,48 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from config import CLASSIFY_THRESHOLDS
+from core.image_logic import process_image_logic, reclassify_result
+
+KEYS = ("final_defect", "explanation", "affected_percentage", "priority_score")
+# Looser crack rules: regions of the default analysis become CRACK
+CRACKY = {**CLASSIFY_THRESHOLDS, "sharp_gradient": 10, "linear_aspect": 1.5, "diagonal_rectangularity": 0.5}
+
+def same_result(a, b):
+    return all(a[k] == b[k] for k in KEYS) and np.array_equal(a["region_table"], b["region_table"])
+
+def verify():
+    print("--- START LIVE RECLASSIFY CHECK ---")
+    checks = []
+
+    # Re-classified default result = full re-run with the new thresholds (incl. crack metrics)
+    for kind in ("crack", "corrosion", "damp", "healthy"):
+        pixels = synthetic_image(kind, 320, 240, 3)
+        base = process_image_logic(pixels, 320, 240, "R", return_mask=True)
+        for name, thresholds in (("looser crack rules", CRACKY), ("defaults", CLASSIFY_THRESHOLDS)):
+            rerun = process_image_logic(pixels, 320, 240, "R", thresholds)
+            checks.append((f"{kind}, {name}: reclassified = re-run ({rerun['final_defect']})",
+                           same_result(reclassify_result(base, thresholds), rerun)))
+        # ... and back: a result reclassified twice is the same as once
+        there = reclassify_result(base, CRACKY)
+        checks.append((f"{kind}: reclassified back = original",
+                       same_result(reclassify_result(there, CLASSIFY_THRESHOLDS), base)))
+
+    # Degraded (partial) results keep their note, DEFERRED ones stay deferred
+    board = synthetic_image("checkerboard", 320, 240, 1)
+    partial = process_image_logic(board, 320, 240, "B", max_regions=2000, degrade="partial")
+    again = reclassify_result(partial, CRACKY)
+    checks.append(("partial result keeps its degraded note",
+                   "Degraded (" in again["explanation"] and again["degraded"] == partial["degraded"]))
+    deferred = process_image_logic(board, 320, 240, "B", max_regions=2000, degrade="offline")
+    checks.append(("DEFERRED result unchanged", reclassify_result(deferred, CRACKY) is deferred))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END LIVE RECLASSIFY CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
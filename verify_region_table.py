@@ -0,0 +1,53 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from core.band_labeling import label_runs
+from core.image_logic import process_image_logic, count_defects, global_consistency
+from core.region_table import region_table_from_records, region_table_to_records
+
+def reference_boxes(binary_map):
+    """Reference: area + box of every 8-connected component (run labeling, raster order)."""
+    rows, starts, ends, labels, n = label_runs(binary_map != 0)
+    area = np.bincount(labels, weights=ends - starts, minlength=n).astype(np.int64)
+    top = np.full(n, binary_map.shape[0]); np.minimum.at(top, labels, rows)
+    bottom = np.zeros(n, dtype=np.int64); np.maximum.at(bottom, labels, rows)
+    left = np.full(n, binary_map.shape[1]); np.minimum.at(left, labels, starts)
+    right = np.zeros(n, dtype=np.int64); np.maximum.at(right, labels, ends - 1)
+    return np.stack([area, top, left, bottom, right], axis=1)
+
+def verify():
+    print("--- START REGION TABLE CHECK ---")
+    checks = []
+
+    for kind in ("crack", "corrosion", "damp", "healthy"):
+        pixels = synthetic_image(kind, 320, 240, 4)
+        result = process_image_logic(pixels, 320, 240, "T", return_mask=True)
+        table = result["region_table"]
+
+        # One row per connected component of the binary map, in discovery order
+        boxes = np.stack([table[f] for f in ("area", "min_row", "min_col", "max_row", "max_col")], axis=1)
+        same_regions = np.array_equal(boxes, reference_boxes(result["binary_map"]))
+        labels_ok = np.array_equal(table["label"], np.arange(1, len(table) + 1))
+        checks.append((f"{kind}: {len(table)} rows = connected components", same_regions and labels_ok))
+
+        # The summary fields follow from the table alone
+        defect_counts, max_defect_area, _ = count_defects(table)
+        final_defect, _, affected, priority = global_consistency(
+            defect_counts, max_defect_area, int(table["area"].sum()), result["total_pixels"])
+        checks.append((f"{kind}: summary derived from the table ({final_defect})",
+                       (final_defect, affected, priority)
+                       == (result["final_defect"], result["affected_percentage"], result["priority_score"])))
+
+        # Export records round-trip
+        checks.append((f"{kind}: records round-trip",
+                       np.array_equal(region_table_from_records(region_table_to_records(table)), table)))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END REGION TABLE CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
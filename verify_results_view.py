@@ -0,0 +1,70 @@
+import random
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from config import CLASSIFY_THRESHOLDS
+from core.image_logic import process_image_logic, reclassify_result
+from core.segments import SegmentTracker
+from ui.results_view import (DEFECT_TYPES, page_count, page_slice, result_priority, view_indices,
+                             pack_mask, reclassify_stored, segment_summaries)
+
+CRACKY = {**CLASSIFY_THRESHOLDS, "sharp_gradient": 10, "linear_aspect": 1.5, "diagonal_rectangularity": 0.5}
+
+def verify():
+    print("--- START RESULTS VIEW CHECK ---")
+    checks = []
+
+    rng = random.Random(7)
+    results = [{"final_defect": rng.choice(DEFECT_TYPES), "affected_percentage": rng.choice([0.0, 1.5, 12.0, 40.0])}
+               for _ in range(137)]
+
+    for defect_filter in ([], ["CRACK"], ["DAMP", "HEALTHY"]):
+        for order in ("upload", "priority"):
+            # Reference: filter the full list, sort it (stable), show everything
+            reference = [i for i, res in enumerate(results) if not defect_filter or res["final_defect"] in defect_filter]
+            if order == "priority":
+                reference = sorted(reference, key=lambda i: -result_priority(results[i]))
+            indices = view_indices(results, defect_filter, order)
+            for page_size in (10, 25, 50):
+                pages = [page_slice(indices, page, page_size) for page in range(1, page_count(len(indices), page_size) + 1)]
+                ok = sum(pages, []) == reference and all(0 < len(p) <= page_size for p in pages if reference)
+                checks.append((f"filter {defect_filter or 'none'}, {order} order, {page_size}/page: pages = full view", ok))
+
+    checks.append(("empty view: one (empty) page", page_count(0, 10) == 1 and page_slice([], 1, 10) == []))
+
+    # Stored results keep the encoded mask; re-classification = with the full map
+    full = process_image_logic(synthetic_image("crack", 640, 480, 2), 640, 480, "P1", return_mask=True)
+    reference = reclassify_result(full, CRACKY)
+    stored = pack_mask(dict(full))
+    again = reclassify_stored(stored, CRACKY)
+    checks.append(("stored result: encoded mask only", "binary_map" not in stored and "mask" in stored))
+    checks.append(("reclassify from the encoded mask = from the full map",
+                   again["final_defect"] == reference["final_defect"]
+                   and np.array_equal(again["region_table"], reference["region_table"])))
+
+    # Segment summaries are reused until the segment gets a new frame
+    tracker, cache = SegmentTracker(), {}
+    for kind, segment_id in (("damp", "A"), ("corrosion", "B")):
+        tracker.add_frame(synthetic_image(kind, 320, 240, 1), f"{kind}.png", segment_id)
+    first = segment_summaries(tracker, CRACKY, cache)
+    same = segment_summaries(tracker, CRACKY, cache)
+    tracker.add_frame(synthetic_image("crack", 320, 240, 4), "crack.png", "A")
+    after = segment_summaries(tracker, CRACKY, cache)
+    reference = tracker.summaries(CRACKY)
+    checks.append(("segment summaries: cached until a new frame, = tracker.summaries",
+                   all(a is b for a, b in zip(first, same))
+                   and [(s["pipe_id"], s["final_defect"], s["priority_score"], len(s["frames"])) for s in after]
+                   == [(s["pipe_id"], s["final_defect"], s["priority_score"], len(s["frames"])) for s in reference]
+                   and cache["B"][1] is next(s for s in first if s["pipe_id"] == "B")))
+
+    for name, ok in checks:
+        if not ok:
+            print(f"[FAIL] {name}")
+    print(f"[{'PASS' if all(ok for _, ok in checks) else 'FAIL'}] {len(checks)} view / page / cache checks")
+    print("--- END RESULTS VIEW CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
@@ -0,0 +1,82 @@
+import sys
+
+import numpy as np
+
+from benchmark_load import synthetic_image
+from classification import DEFECT_CODES
+from core.image_logic import process_image_logic
+from core.segments import SegmentTracker, new_area_rects, registration_gray
+
+BOX = ("area", "min_row", "min_col", "max_row", "max_col")
+
+def two_frames(img):
+    """Frames at rows 0:360 and 80:440 of a 480 x 480 image."""
+    return np.ascontiguousarray(img[0:360]), np.ascontiguousarray(img[80:440])
+
+def boxes(table):
+    return sorted(tuple(int(row[f]) for f in BOX) for row in table)
+
+def verify():
+    print("--- START PIPE SEGMENT CHECK ---")
+    checks = []
+
+    # New strip thresholded like the whole frame: same pixels + regions as the full analysis
+    for kind in ("damp", "corrosion"):
+        img = synthetic_image(kind, 480, 480, 0)
+        first, second = two_frames(img)
+        tracker = SegmentTracker()
+        tracker.add_frame(first, "f1")
+        segment, result = tracker.add_frame(second, "f2")
+        full = process_image_logic(second, 480, 360, "F", return_mask=True)
+        (top, left, h, w), = new_area_rects(360, 480, *result["frame_offset"], margin=registration_gray(second)[1])
+        same_pixels = result["suspicious_pixels"] == int(full["binary_map"][top:top + h, left:left + w].sum())
+        # Regions not cut by the strip edge (frame coordinates on both sides)
+        strip, reference = result["region_table"], full["region_table"]
+        same_regions = boxes(strip[strip["min_row"] > top]) == boxes(reference[reference["min_row"] > top])
+        checks.append((f"{kind}: strip = full analysis in the strip ({result['suspicious_pixels']} px)",
+                       same_pixels and same_regions))
+
+        whole = process_image_logic(np.ascontiguousarray(img[0:440]), 480, 440, "W")
+        checks.append((f"{kind}: segment verdict = full analysis ({whole['final_defect']})",
+                       segment.summary()["final_defect"] == whole["final_defect"]))
+
+    # Analysis options reach the frame analyses: first frame = per-frame result with the same preset / threads
+    img = synthetic_image("damp", 1280, 1280, 3)
+    first, second = np.ascontiguousarray(img[0:960]), np.ascontiguousarray(img[200:1160])
+    options = {"config": "fast", "workers": 2, "return_mask": True}
+    tracker = SegmentTracker()
+    _, result = tracker.add_frame(first, "f1", **options)
+    full = process_image_logic(first, 1280, 960, "F", **options)
+    checks.append(("options: first frame = process_image_logic with the same preset / workers",
+                   result.get("pyramid_factor") == full.get("pyramid_factor") == 2
+                   and all(result[k] == full[k] for k in ("final_defect", "suspicious_pixels", "priority_score"))
+                   and np.array_equal(result["binary_map"], full["binary_map"])))
+    _, result = tracker.add_frame(second, "f2", **options)
+    covered = result["binary_map"].any(axis=1)
+    checks.append(("options: next frame's mask = its analyzed strip only",
+                   result["binary_map"].shape == (960, 1280) and int(result["binary_map"].sum()) == result["suspicious_pixels"]
+                   and not covered[:700].any()))
+
+    # A crack crossing the overlap is one region of the segment, not one per frame
+    img = synthetic_image("damp", 480, 480, 0).copy()
+    img[150:390, 60:63] = 20
+    tracker = SegmentTracker()
+    tracker.add_frame(two_frames(img)[0], "f1")
+    segment, result = tracker.add_frame(two_frames(img)[1], "f2")
+    table = segment.summary()["region_table"]
+    whole = process_image_logic(np.ascontiguousarray(img[0:440]), 480, 440, "W")["region_table"]
+    cracks = table[table["defect"] == DEFECT_CODES["CRACK"]]
+    expected = whole[whole["defect"] == DEFECT_CODES["CRACK"]]
+    checks.append((f"crossing crack: merged into 1 region ({result['continued_regions']} continued)",
+                   result["continued_regions"] >= 1 and len(cracks) == len(expected) == 1
+                   and cracks["min_row"][0] == expected["min_row"][0]
+                   # up to the 3 registration-margin rows (seen by both frames) x 5 px width
+                   and abs(int(cracks["area"][0]) - int(expected["area"][0])) <= 3 * 5))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END PIPE SEGMENT CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)
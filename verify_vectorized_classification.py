@@ -0,0 +1,47 @@
+import numpy as np
+from classification import classify_region, classify_regions, DEFECT_CODES
+
+def random_features(rng, n):
+    # Integer-valued features clustered around the rule thresholds,
+    # plus a slice of float colors/gradients to exercise int() truncation.
+    area = rng.integers(1, 400, n)
+    bbox_w = rng.integers(1, 80, n)
+    bbox_h = rng.integers(1, 80, n)
+    colors = rng.integers(0, 256, (n, 3))
+    rect = rng.choice([0.1, 0.21, 0.22, 0.23, 0.5, 0.6, 0.61, 0.8, 1.0], n)
+    grad = rng.choice([0, 5, 7.9, 8, 10, 14.9, 15, 20, 25, 25.1, 40], n).astype(np.float64)
+
+    float_rows = slice(n // 2, n)
+    colors = colors.astype(np.float64)
+    colors[float_rows] += rng.random((n - n // 2, 3))
+    grad[float_rows] = rng.random(n - n // 2) * 40
+    return area, bbox_w, bbox_h, colors, rect, grad
+
+def verify():
+    print("--- START VECTORIZED CLASSIFICATION PARITY ---")
+    rng = np.random.default_rng(42)
+    n = 50000
+    area, bbox_w, bbox_h, colors, rect, grad = random_features(rng, n)
+
+    vector_codes = classify_regions(area, bbox_w, bbox_h, colors, rect, grad)
+
+    mismatches = 0
+    for i in range(n):
+        scalar = classify_region(
+            area[i], bbox_w[i], bbox_h[i], tuple(colors[i]), rect[i], grad[i]
+        )
+        if DEFECT_CODES[scalar] != vector_codes[i]:
+            mismatches += 1
+            if mismatches <= 5:
+                print(f"Mismatch at {i}: scalar={scalar}, vector={vector_codes[i]}")
+
+    counts = np.bincount(vector_codes, minlength=len(DEFECT_CODES))
+    print(f"Class distribution (NORMAL, DAMP, CORROSION, CRACK): {counts.tolist()}")
+    if mismatches == 0: print(f"[PASS] {n} random feature vectors match")
+    else: print(f"[FAIL] {mismatches}/{n} mismatches")
+
+    print("--- END VECTORIZED CLASSIFICATION PARITY ---")
+    return mismatches == 0
+
+if __name__ == "__main__":
+    verify()
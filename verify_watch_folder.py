@@ -0,0 +1,94 @@
+import asyncio
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+
+import numpy as np
+from PIL import Image
+
+from benchmark_load import synthetic_image
+from core.image_logic import process_image_logic
+from input_module import load_image_array
+from service.watch_folder import WatchFolder
+
+KEYS = ("final_defect", "suspicious_pixels", "priority_score")
+
+class WorkerCrash(WatchFolder):
+    """Kills one worker process of the pool after the first finished file."""
+    crashed = False
+
+    def finish(self, key, path, result):
+        super().finish(key, path, result)
+        if not self.crashed:
+            self.crashed = True
+            self.process_pool.submit(os._exit, 1)
+
+def run_once(directory, watcher_class=WatchFolder, **options):
+    watcher = watcher_class(directory, settle=0, **options)
+    with contextlib.redirect_stdout(io.StringIO()):
+        asyncio.run(watcher.run(once=True))
+    return watcher
+
+def ledger_lines(directory):
+    with open(os.path.join(directory, ".processed.jsonl"), encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+def verify():
+    print("--- START WATCH FOLDER CHECK ---")
+    checks = []
+
+    with tempfile.TemporaryDirectory() as inbox:
+        expected = {}
+        for i, kind in enumerate(("crack", "corrosion", "damp", "healthy", "invalid", "crack")):
+            pixels = synthetic_image(kind, 320, 240, i)
+            if i % 2:
+                path = os.path.join(inbox, f"pipe_{i}.npy")
+                np.save(path, pixels)
+                reference = process_image_logic(pixels, 320, 240, "W")
+            else:
+                path = os.path.join(inbox, f"pipe_{i}.png")
+                Image.fromarray(pixels).save(path)
+                decoded, width, height, _ = load_image_array(path)
+                reference = process_image_logic(decoded, width, height, "W")
+            expected[os.path.basename(path)] = reference
+        with open(os.path.join(inbox, "broken.jpg"), "wb") as f:
+            f.write(b"not an image")
+
+        # Small queues: backpressure on every stage, same results as direct calls
+        watcher = run_once(inbox, workers=2, decoders=2, queue_size=1)
+        records = {line["file_name"]: line for line in ledger_lines(inbox)}
+        checks.append(("every file recorded once (6 analyzed, 1 failed)",
+                       len(ledger_lines(inbox)) == 7 and (watcher.processed, watcher.failed) == (6, 1)))
+        checks.append(("ledger results = direct analysis",
+                       all(all(records[name].get(k) == ref.get(k) for k in KEYS) for name, ref in expected.items())))
+        checks.append(("undecodable file: error record", "error" in records["broken.jpg"]))
+
+        # Crash mid-write (torn last line), then one new file: only that one is analyzed
+        with open(os.path.join(inbox, ".processed.jsonl"), "a", encoding="utf-8") as f:
+            f.write('{"key": "torn')
+        np.save(os.path.join(inbox, "pipe_new.npy"), synthetic_image("damp", 320, 240, 9))
+        watcher = run_once(inbox, workers=1, decoders=1)
+        checks.append(("restart after a torn ledger line: only the new file", watcher.processed == 1))
+        watcher = run_once(inbox, workers=1, decoders=1)
+        checks.append(("second restart: nothing analyzed again",
+                       watcher.processed + watcher.failed == 0 and len(ledger_lines(inbox)) == 8))
+
+    # A worker process dies mid-run: pool rebuilt, remaining files analyzed (not recorded as failed)
+    with tempfile.TemporaryDirectory() as inbox:
+        for i in range(6):
+            np.save(os.path.join(inbox, f"pipe_{i}.npy"), synthetic_image("crack", 320, 240, i))
+        watcher = run_once(inbox, WorkerCrash, workers=2, decoders=1, queue_size=1)
+        checks.append((f"worker crash: {watcher.pool_restarts} pool restart(s), every file analyzed",
+                       watcher.pool_restarts >= 1 and (watcher.processed, watcher.failed) == (6, 0)
+                       and all("error" not in line for line in ledger_lines(inbox))))
+
+    for name, ok in checks:
+        print(f"[{'PASS' if ok else 'FAIL'}] {name}")
+    print("--- END WATCH FOLDER CHECK ---")
+    return all(ok for _, ok in checks)
+
+if __name__ == "__main__":
+    sys.exit(0 if verify() else 1)